@@ -0,0 +1,6 @@
+"""Offline benchmarks for the scrapetools helpers.
+
+Run them from the `code` folder so that `scrapetools` can be imported, e.g.:
+
+    python -m benchmarks.bench_fetch
+"""
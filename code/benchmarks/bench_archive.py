@@ -0,0 +1,106 @@
+"""A year of daily directory snapshots in a `PageArchive`: size on disk, and extracting from it again.
+
+Each day, every page of a synthetic directory (26 A-Z index pages and
+`--per-letter` records per letter) is archived as if fetched that day, with
+`--change-rate` of the record pages changed since the day before. For each
+codec this reports
+
+* the time to archive `--days` days, the size of the pages fetched and of
+  the pack file;
+* the time to open the archive again (reading its index);
+* the time to read `--reads` pages picked at random;
+* the time to run `parse_record` over every record page of every day
+  (`archive.pages`), and over each distinct page once;
+* the peak memory of the process.
+
+    python -m benchmarks.bench_archive [--days 365] [--per-letter 10] [--change-rate 0.01]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import random # module for generating random numbers
+import resource # module for measuring the memory used by this process (Linux/macOS)
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+from datetime import date, timedelta # modules for working with dates
+
+from scrapetools import PageArchive, parse_record
+from scrapetools.archive import default_codec
+
+from .fixtures import directory_site
+
+
+def snapshots(days, per_letter, change_rate, seed=0):
+    # yields (day, {path: html}) with a few record pages changed each day
+    rng = random.Random(seed)
+    pages = directory_site(10199, per_letter=per_letter)
+    records = sorted(path for path in pages if path.startswith("/directory_record/"))
+    first = date(2024, 6, 5)
+    for n in range(days):
+        day = (first + timedelta(days=n)).isoformat()
+        for path in rng.sample(records, int(len(records) * change_rate)):
+            pages[path] = pages[path].replace("</dl>", '<dt class="definition__heading">Updated</dt><dd class="definition__content">{}</dd></dl>'.format(day), 1)
+        yield day, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365, help="daily snapshots")
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    parser.add_argument("--change-rate", type=float, default=0.01, help="share of record pages that change each day")
+    parser.add_argument("--reads", type=int, default=2000, help="random single-page reads")
+    args = parser.parse_args()
+
+    codecs = ["zstd", "zlib"] if default_codec() == "zstd" else ["zlib"]
+    for codec in codecs:
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            with PageArchive(folder, codec=codec) as archive:
+                for day, pages in snapshots(args.days, args.per_letter, args.change_rate):
+                    fetched = day + "T06:00:00+00:00"
+                    for path, html in pages.items():
+                        archive.add("https://www.edinburgh.gov.uk" + path, html, fetched=fetched)
+            written = time.perf_counter() - start
+
+            start = time.perf_counter()
+            archive = PageArchive(folder, readonly=True)
+            opened = time.perf_counter() - start
+            stats = archive.stats()
+            print("{}: {} days, {} fetches of {} distinct pages; {:.1f} MB fetched -> {:.1f} MB of pack ({:.0f}x smaller) + {:.1f} MB of index".format(
+                codec, args.days, stats["fetches"], stats["bodies"], stats["fetched_bytes"] / 1e6, stats["pack_bytes"] / 1e6,
+                stats["fetched_bytes"] / stats["pack_bytes"], os.path.getsize(os.path.join(folder, "pages.jsonl")) / 1e6))
+            print("  archive every day     {:7.2f}s  ({:.0f} fetches/s)".format(written, stats["fetches"] / written))
+            print("  open it again         {:7.2f}s".format(opened))
+
+            entries = archive.entries()
+            sample = random.Random(1).sample(entries, min(args.reads, len(entries)))
+            start = time.perf_counter()
+            for page in sample:
+                archive.text(page)
+            elapsed = time.perf_counter() - start
+            print("  {} random reads     {:7.2f}s  ({:.0f} us a page)".format(len(sample), elapsed, elapsed / len(sample) * 1e6))
+
+            start = time.perf_counter()
+            extracted = 0
+            for page, html in archive.pages():
+                if "/directory_record/" in page.url:
+                    parse_record(html)
+                    extracted += 1
+            elapsed = time.perf_counter() - start
+            print("  extract every fetch   {:7.2f}s  ({} record pages, {:.0f} pages/s)".format(elapsed, extracted, extracted / elapsed))
+
+            start = time.perf_counter()
+            parsed = {}
+            for page in entries:
+                if "/directory_record/" in page.url and page.digest not in parsed:
+                    parsed[page.digest] = parse_record(archive.text(page))
+            elapsed = time.perf_counter() - start
+            print("  extract each page once{:7.2f}s  ({} distinct record pages)".format(elapsed, len(parsed)))
+            archive.close()
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("peak memory: {:.0f} MB".format(peak / 1024 if os.uname().sysname == "Linux" else peak / 1024 ** 2))
+
+
+if __name__ == "__main__":
+    main()
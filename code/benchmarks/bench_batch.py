@@ -0,0 +1,98 @@
+"""Re-extracting stored pages with `reextract`: pages per second, overall and per worker, as processes are added.
+
+`--pages` distinct synthetic record pages are written to a `PageArchive`
+(and, with `--files`, also as a folder of `.html` files). `parse_record` is
+then run over all of them with `--workers` processes in turn (0: in the main
+process), writing JSON Lines, and once more writing Parquet. For each run
+this reports the time taken, the pages per second overall and of the
+slowest and fastest worker, and the speed-up and efficiency compared with
+one worker (close to 100% means the run scales linearly with cores; it
+cannot go past the number of cores this machine has).
+
+    python -m benchmarks.bench_batch [--pages 20000] [--workers 0,1,2,4] [--parser lxml] [--files]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import random # module for generating random numbers
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from scrapetools import PageArchive, parse_record, reextract
+
+from .bench_dedupe import record_fields
+from .fixtures import record_page
+
+
+def default_workers():
+    # 0, then 1, 2, 4, ... up to the number of cores
+    counts = [0, 1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != (os.cpu_count() or 1):
+        counts.append(os.cpu_count())
+    return counts
+
+
+def build(folder, pages, files, seed=0):
+    # `pages` distinct record pages in an archive, and optionally as files
+    rng = random.Random(seed)
+    archive = os.path.join(folder, "archive")
+    with PageArchive(archive) as pack:
+        for i in range(pages):
+            html = record_page("Community Space {}".format(i + 1), record_fields(i, rng))
+            url = "https://www.edinburgh.gov.uk/directory_record/{}/community-space-{}".format(100000 + i, i + 1)
+            pack.add(url, html, fetched="2024-06-05T06:00:00+00:00")
+            if files:
+                path = os.path.join(folder, "files", str(i // 1000), "{}.html".format(i))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(html)
+    return archive
+
+
+def show(label, report, single):
+    rates = [stats["pages_per_second"] for stats in report["workers"].values()]
+    workers = len(rates)
+    line = "{:<22} {:7.2f}s {:7.0f} pages/s  per worker {:5.0f}-{:5.0f}".format(label, report["seconds"], report["pages_per_second"], min(rates), max(rates))
+    if single is not None:
+        speedup = report["pages_per_second"] / single
+        line += "  {:4.1f}x ({:3.0f}% of linear)".format(speedup, 100 * speedup / workers)
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20000, help="distinct stored pages")
+    parser.add_argument("--workers", default=None, help="comma-separated process counts (default: 0, 1, 2, 4, ... up to the number of cores)")
+    parser.add_argument("--parser", default=None, help="HTML parser for parse_record (default: the fastest installed)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="pages handed to a worker at a time")
+    parser.add_argument("--files", action="store_true", help="also read the pages from a folder of .html files")
+    args = parser.parse_args()
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else default_workers()
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        archive = build(folder, args.pages, args.files)
+        print("{} pages stored in {:.1f}s; {} cores".format(args.pages, time.perf_counter() - start, os.cpu_count()))
+        output = os.path.join(folder, "records.jsonl")
+
+        sources = [("archive", archive)] + ([("files", os.path.join(folder, "files"))] if args.files else [])
+        for name, source in sources:
+            single = None
+            for workers in counts:
+                report = reextract(source, parse_record, output, workers=workers, parser=args.parser, chunk_size=args.chunk_size)
+                assert report["records"] == args.pages, report
+                if workers == 1:
+                    single = report["pages_per_second"]
+                show("{}, {} {}".format(name, workers, "worker" if workers == 1 else "workers") if workers else "{}, main process".format(name),
+                     report, single if workers > 1 else None)
+
+        report = reextract(archive, parse_record, os.path.join(folder, "records.parquet"), workers=max(counts), parser=args.parser, chunk_size=args.chunk_size)
+        show("archive -> Parquet", report, None)
+        print("Parquet file {:.1f} MB, JSON Lines {:.1f} MB".format(
+            os.path.getsize(os.path.join(folder, "records.parquet")) / 1e6, os.path.getsize(output) / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Repeat scrapes of a directory with and without the conditional-GET `HTTPCache`.
+
+Crawls the same directory on several "days"; between days a few record pages
+change. With the cache, unchanged pages are answered with `304 Not Modified`
+and read back from disk.
+
+    python -m benchmarks.bench_cache [--days 3] [--changes 5]
+"""
+
+import argparse # module for reading command line options
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from scrapetools import DirectoryCrawler, HTTPCache, ScrapeClient
+
+from .fixtures import directory_site, record_page
+from .localserver import LocalServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=3, help="number of repeat scrapes")
+    parser.add_argument("--changes", type=int, default=5, help="record pages changed between scrapes")
+    parser.add_argument("--per-letter", type=int, default=3, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the server waits before answering")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    records = sorted(path for path in pages if path.startswith("/directory_record/"))
+
+    with LocalServer(pages, latency=args.latency) as server, tempfile.TemporaryDirectory() as folder:
+        cache = HTTPCache(folder)
+        for day in range(1, args.days + 1):
+            if day > 1:
+                for path in records[:args.changes]:
+                    server.set_page(path, record_page("Changed on day {}".format(day), {"Address": path}))
+
+            results = {}
+            for label, use_cache in [("no cache", False), ("HTTPCache", True)]:
+                bytes_before = server.bytes_sent
+                hits_before = cache.hits
+                with ScrapeClient(cache=cache if use_cache else None) as client:
+                    start = time.perf_counter()
+                    results[label] = DirectoryCrawler([10199], client=client, base=server.url).crawl()
+                    elapsed = time.perf_counter() - start
+                print("day {} {:<10} {:>9,} bytes sent {:>4} pages from cache {:>6.2f}s".format(
+                    day, label, server.bytes_sent - bytes_before, cache.hits - hits_before if use_cache else 0, elapsed))
+            assert results["no cache"] == results["HTTPCache"], "cached results differ"
+
+        print("cache: {}".format(cache.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Time to crawl and parse a directory's record pages live, while recording to a `Cassette`, and replaying from it.
+
+The local server waits `--latency` seconds before each answer, as a real
+website would. Replaying makes no requests at all, so rerunning the parsing
+code costs only the parsing. The recorded responses are also exported as a
+WARC file, and the cassette's size on disk is compared with the pages'.
+
+    python -m benchmarks.bench_cassette [--per-letter 10] [--latency 0.05]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from scrapetools import Cassette, ScrapeClient, crawl, parse_record
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def folder_size(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the server waits before answering")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    paths = sorted(path for path in pages if path.startswith("/directory_record/"))
+    print("{} record pages, {}s latency".format(len(paths), args.latency))
+
+    with LocalServer(pages, latency=args.latency) as server, tempfile.TemporaryDirectory() as folder:
+        urls = [server.url + path for path in paths]
+        cassette_folder = os.path.join(folder, "cassette")
+        reference = None
+        for mode in ["off", "record", "replay", "replay"]:
+            cassette = Cassette(cassette_folder, mode=mode)
+            before = len(server.requests)
+            with ScrapeClient(cassette=cassette) as client:
+                start = time.perf_counter()
+                results = crawl(urls, parse_record, get=client.get, parse_workers=0)
+                elapsed = time.perf_counter() - start
+            records = [page.data for page in results]
+            reference = records if reference is None else reference
+            print("{:<8} {:7.3f}s  {:8.1f} pages/s  {:4d} requests to the server  same records: {}".format(
+                mode, elapsed, len(urls) / elapsed, len(server.requests) - before, records == reference))
+
+        size = sum(len(pages[path]) for path in paths)
+        print("pages {:.1f} MB; cassette {:.1f} MB on disk ({} distinct bodies)".format(
+            size / 1e6, folder_size(cassette_folder) / 1e6, cassette.stats()["bodies"]))
+        warc = os.path.join(folder, "records.warc.gz")
+        count = cassette.export_warc(warc)
+        print("WARC export: {} records, {:.1f} MB".format(count, os.path.getsize(warc) / 1e6))
+
+
+if __name__ == "__main__":
+    main()
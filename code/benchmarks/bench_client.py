@@ -0,0 +1,58 @@
+"""Bare `requests.get` vs a shared `ScrapeClient` against a local https server.
+
+Requests every A-Z index page and record page of a directory (as Example 2
+does) and reports the connections the server accepted and the total time.
+
+    python -m benchmarks.bench_client [--latency 0.01]
+"""
+
+import argparse # module for reading command line options
+import time # module for working with time
+
+import requests # module for requesting urls
+
+from scrapetools import ScrapeClient
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def run(label, pages, latency, fetch):
+    with LocalServer(pages, latency=latency, tls=True) as server:
+        urls = [server.url + path for path in sorted(pages)]
+        start = time.perf_counter()
+        fetch(urls, server.cafile)
+        elapsed = time.perf_counter() - start
+    print("{:<22} {:>5} requests {:>5} connections {:>7.2f}s".format(label, len(urls), server.connections, elapsed))
+
+
+def bare(urls, cafile):
+    for url in urls:
+        requests.get(url, verify=cafile)
+
+
+def pooled(urls, cafile):
+    with ScrapeClient(verify=cafile) as client:
+        for url in urls:
+            client.get(url)
+
+
+def pooled_concurrent(urls, cafile):
+    with ScrapeClient(verify=cafile) as client:
+        client.fetch_all(urls, per_host=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the server waits before answering")
+    parser.add_argument("--per-letter", type=int, default=3, help="records listed under each letter")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    run("requests.get", pages, args.latency, bare)
+    run("ScrapeClient.get", pages, args.latency, pooled)
+    run("ScrapeClient.fetch_all", pages, args.latency, pooled_concurrent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Parse time and storage with and without a `ContentStore`, when many addresses serve the same pages.
+
+Each of `--records` synthetic record pages is served at `--aliases`
+addresses (as when a record is listed under several directories), each copy
+with its own breadcrumb and a footer that changes on every request. A few
+`--twins` are copies of a record with its opening hours changed: near
+duplicates.
+Every address is crawled with `parse_record` (using `--parser`), and each
+page's record is written to a JSON Lines file unless it is a duplicate; the
+time spent parsing is taken from `Timings`:
+
+* without a store: every address is parsed and saved;
+* with `ContentStore()`: only identical bodies count as the same page, so the
+  changing footers defeat it;
+* with `ContentStore(strip=True, near_threshold=0.8)`, hashing pages without
+  their navigation and footer: each distinct record is parsed and saved once,
+  and the twins are flagged as near duplicates;
+* the same store again, as on the next day: nothing is parsed.
+
+    python -m benchmarks.bench_dedupe [--records 200] [--aliases 4] [--twins 10] [--parser html.parser]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import random # module for generating random numbers
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+from functools import partial # module for fixing some arguments of a function
+
+from scrapetools import ContentStore, JSONLinesWriter, ScrapeClient, Timings, iter_crawl, parse_record
+
+from .fixtures import record_page
+from .localserver import LocalServer
+
+STREETS = ["High Street", "Leith Walk", "Dalry Road", "Morningside Road", "Easter Road", "Gorgie Road", "Ferry Road", "Lothian Road"]
+ACCESS = ["Step-free access and an accessible toilet", "Ramp at the side entrance; hearing loop at reception", "Lift to all floors; accessible parking nearby"]
+
+
+def alias_page(name, fields, alias):
+    # the same record with a breadcrumb for the directory it was reached from, and a footer that differs on every copy
+    page = record_page(name, fields)
+    page = page.replace('<nav class="breadcrumb"><a href="/">Home</a></nav>', '<nav class="breadcrumb"><a href="/">Home</a> &gt; <a href="/directory/{0}">Directory {0}</a></nav>'.format(10199 + alias))
+    return page.replace("</footer>", "<p>Page generated in {} ms</p></footer>".format(37 * (alias + 1) % 101))
+
+
+def record_fields(i, rng):
+    return {
+        "Address": "{} {}, Edinburgh".format(rng.randint(1, 300), rng.choice(STREETS)),
+        "Postcode": "EH{} {}{}{}".format(rng.randint(1, 17), rng.randint(1, 9), rng.choice("ABDEFGHJLNPRSTW"), rng.choice("ABDEFGHJLNPRSTW")),
+        "Telephone": "0131 {} {}".format(rng.randint(200, 699), rng.randint(1000, 9999)),
+        "Email": "space{}@edinburgh.gov.uk".format(i + 1),
+        "Opening hours": "Monday to Friday {}am to {}pm, Saturday {}am to {}pm".format(rng.randint(8, 10), rng.randint(4, 8), rng.randint(9, 11), rng.randint(1, 3)),
+        "Accessibility": rng.choice(ACCESS),
+    }
+
+
+def build(records, aliases, twins, seed=0):
+    rng = random.Random(seed)
+    pages = {}
+    for i in range(records):
+        name = "Community Space {}".format(i + 1)
+        fields = record_fields(i, rng)
+        for alias in range(aliases):
+            pages["/directory_record/{}/{}".format(i, alias)] = alias_page(name, fields, alias)
+        if i < twins:
+            fields = dict(fields, **{"Opening hours": fields["Opening hours"][:-3] + "5pm"}) # open later on Saturdays
+            pages["/directory_record/{}/twin".format(i)] = alias_page(name, fields, 0)
+    return pages
+
+
+def run(server, folder, label, store, parse, parse_workers):
+    records = os.path.join(folder, label.replace(" ", "-") + ".jsonl")
+    paths = sorted(server.pages)
+    saved = 0
+    timings = Timings()
+    with ScrapeClient() as client, JSONLinesWriter(records) as sink:
+        start = time.perf_counter()
+        for page in iter_crawl([server.url + path for path in paths], parse, get=client.get, parse_workers=parse_workers, timings=timings, dedupe=store):
+            if not page.duplicate:
+                saved += 1
+                sink.write(page.data)
+        elapsed = time.perf_counter() - start
+    parsing = timings.summary().get("parse", {"count": 0, "total": 0.0})
+    return elapsed, parsing["count"], parsing["total"], saved, os.path.getsize(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200, help="distinct record pages")
+    parser.add_argument("--aliases", type=int, default=4, help="addresses serving each record page")
+    parser.add_argument("--twins", type=int, default=10, help="records with a near-duplicate twin")
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds the server waits before answering")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parsing processes (0: parse in the main process)")
+    parser.add_argument("--parser", default=None, help="HTML parser for parse_record (default: the fastest installed)")
+    args = parser.parse_args()
+    parse = partial(parse_record, parser=args.parser) if args.parser else parse_record
+
+    pages = build(args.records, args.aliases, args.twins)
+    print("{} addresses, {} distinct records ({} near-duplicate twins)".format(len(pages), args.records + args.twins, args.twins))
+
+    with LocalServer(pages, latency=args.latency) as server, tempfile.TemporaryDirectory() as folder:
+        exact = ContentStore(os.path.join(folder, "exact.sqlite"))
+        stripped = ContentStore(os.path.join(folder, "stripped.sqlite"), strip=True, near_threshold=0.8)
+        for label, store in [("no store", None), ("exact hashes", exact), ("stripped hashes", stripped), ("stripped, next day", stripped)]:
+            elapsed, parsed, parsing, saved, size = run(server, folder, label, store, parse, args.parse_workers)
+            print("{:<19} {:6.2f}s  {:4d} pages parsed in {:5.2f}s  {:4d} records saved ({:6.1f} kB){}".format(
+                label, elapsed, parsed, parsing, saved, size / 1000,
+                "" if store is None else "  {} distinct pages in the store".format(store.stats()["pages"])))
+        near = stripped.near_duplicates()
+        print("near duplicates flagged: {} (of {} twins), e.g. {}".format(len(near), args.twins, near[0] if near else None))
+        exact.close()
+        stripped.close()
+
+
+if __name__ == "__main__":
+    main()
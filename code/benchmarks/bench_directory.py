@@ -0,0 +1,47 @@
+"""Two directories crawled one after another vs together with `DirectoryCrawler`.
+
+The second directory also lists every record of the first (as when a library
+is also a warm space), so crawling them together saves those requests.
+
+    python -m benchmarks.bench_directory [--per-letter 3] [--latency 0.01]
+"""
+
+import argparse # module for reading command line options
+import time # module for working with time
+
+from scrapetools import DirectoryCrawler, ScrapeClient
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=3, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the server waits before answering")
+    args = parser.parse_args()
+
+    libraries = directory_site(10199, per_letter=args.per_letter)
+    pages = dict(libraries, **directory_site(10258, per_letter=args.per_letter, also_lists=libraries))
+
+    results = {}
+    with LocalServer(pages, latency=args.latency) as server:
+        for label, groups in [("one directory at a time", [[10199], [10258]]), ("DirectoryCrawler", [[10199, 10258]])]:
+            requests_before, connections_before = len(server.requests), server.connections
+            with ScrapeClient() as client:
+                start = time.perf_counter()
+                details = {}
+                for ids in groups:
+                    details.update(DirectoryCrawler(ids, client=client, base=server.url).crawl())
+                elapsed = time.perf_counter() - start
+            results[label] = details
+            print("{:<24} {:>5} requests {:>5} connections {:>6.2f}s".format(
+                label, len(server.requests) - requests_before, server.connections - connections_before, elapsed))
+
+    first, second = results.values()
+    assert first == second, "the two approaches found different details"
+    print("records: " + ", ".join("{} in {}".format(len(v), k) for k, v in second.items()))
+
+
+if __name__ == "__main__":
+    main()
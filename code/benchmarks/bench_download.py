@@ -0,0 +1,70 @@
+"""Peak memory of `f.write(response.content)` vs the streaming `download_file`.
+
+Serves a large file from a local server and downloads it in a fresh process
+for each method, reporting that process's peak memory (resident set size).
+
+    python -m benchmarks.bench_download [--size-mb 200]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import pathlib # module for working with file paths
+import resource # module for measuring the resources used by a process (not on Windows)
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from .localserver import LocalServer
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the `code` folder
+
+
+def child(method, url, outfile):
+    """Download `url` with `method` and print the seconds taken and peak memory in MB."""
+    import requests # module for requesting urls
+    from scrapetools import download_file
+
+    start = time.perf_counter()
+    if method == "content":
+        response = requests.get(url)
+        with open(outfile, "wb") as f:
+            f.write(response.content)
+    else:
+        download_file(url, outfile, progress=None)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # kilobytes on Linux
+    print("{} {}".format(elapsed, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=200, help="size of the file to download")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = pathlib.Path(folder) / "publicextract.charity.zip"
+        with open(source, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        with LocalServer({"/data/txt/publicextract.charity.zip": source}) as server:
+            url = server.url + "/data/txt/publicextract.charity.zip"
+            print("{} MB file".format(args.size_mb))
+            for method, label in [("content", "f.write(response.content)"), ("stream", "download_file")]:
+                outfile = os.path.join(folder, method + ".zip")
+                result = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_download", "--child", method, url, outfile],
+                    cwd=CODE, check=True, capture_output=True, text=True,
+                )
+                elapsed, peak = map(float, result.stdout.split())
+                assert os.path.getsize(outfile) == source.stat().st_size, "incomplete download"
+                print("{:<26} peak memory {:>7.1f} MB {:>6.2f}s {:>7.1f} MB/s".format(label, peak, elapsed, args.size_mb / elapsed))
+
+
+if __name__ == "__main__":
+    main()
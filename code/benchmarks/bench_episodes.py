@@ -0,0 +1,101 @@
+"""The whole Desert Island Discs archive: a serial loop vs `EpisodeCrawler`.
+
+A synthetic copy of the episode list (`--pages` listing pages of
+`--per-page` episodes, and the page of every episode) is served from a local
+server with `--latency` seconds per request. A loop in the style of the
+examples requests a listing page, then each of its episodes, one after
+another with `requests.get` and `BeautifulSoup`; it is timed on the first
+`--serial-pages` listing pages and its time for the whole archive estimated
+from them. `EpisodeCrawler` then collects the whole archive, and its episode
+table is checked against the loop's episodes.
+
+Both are also estimated for a real website that takes `--real-latency`
+seconds to answer each request.
+
+    python -m benchmarks.bench_episodes [--pages 300] [--per-page 10] [--latency 0.05] [--per-host 8]
+"""
+
+import argparse # module for reading command line options
+import time # module for working with time
+
+import requests # module for requesting urls
+from bs4 import BeautifulSoup as soup # module for parsing web pages
+
+from scrapetools import EpisodeCrawler, ScrapeClient
+
+from .fixtures import DESERT_ISLAND_DISCS_PATH, desert_island_discs_site
+from .localserver import LocalServer
+
+
+def serial_loop(base, pages):
+    # one listing page at a time, then each of its episodes, as in the examples
+    episodes = []
+    for page in range(1, pages + 1):
+        response = requests.get(base + DESERT_ISLAND_DISCS_PATH + ("?page={}".format(page) if page > 1 else ""))
+        listing = soup(response.text, "html.parser")
+        for item in listing.find_all("div", class_="programme--episode"):
+            url = base + item.find("a", class_="br-blocklink__link").get("href")
+            details = soup(requests.get(url).text, "html.parser")
+            episodes.append({
+                "url": url,
+                "title": item.find("span", class_="programme__title").text.strip(),
+                "artists": [artist.text.strip() for artist in details.find_all("span", class_="artist")],
+            })
+    return episodes
+
+
+def minutes(seconds):
+    return "{:.1f} hours".format(seconds / 3600) if seconds >= 3600 else "{:.1f} minutes".format(seconds / 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300, help="listing pages in the archive")
+    parser.add_argument("--per-page", type=int, default=10, help="episodes on each listing page")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the server waits before answering")
+    parser.add_argument("--serial-pages", type=int, default=3, help="listing pages the serial loop is timed on")
+    parser.add_argument("--io-workers", type=int, default=16, help="download threads of the crawler")
+    parser.add_argument("--per-host", type=int, default=8, help="requests the crawler has in flight at once")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parsing processes (0: parse in the main process)")
+    parser.add_argument("--real-latency", type=float, default=1.0, help="seconds a real website takes per request, for the estimates")
+    args = parser.parse_args()
+
+    pages, total = desert_island_discs_site(args.pages, args.per_page)
+    requests_needed = args.pages + total
+    print("{} listing pages, {} episodes: {} requests; {}s latency".format(args.pages, total, requests_needed, args.latency))
+
+    with LocalServer(pages, latency=args.latency) as server:
+        start = time.perf_counter()
+        sample = serial_loop(server.url, args.serial_pages)
+        serial = time.perf_counter() - start
+        per_request = serial / (args.serial_pages + len(sample))
+        serial_total = per_request * requests_needed
+        print("serial loop     {:7.2f}s for {} pages ({:.0f} ms a request) -> {} for the archive (estimated)".format(
+            serial, args.serial_pages + len(sample), per_request * 1000, minutes(serial_total)))
+
+        before = len(server.requests)
+        with ScrapeClient(pool_maxsize=args.io_workers) as client:
+            crawler = EpisodeCrawler(client=client, base=server.url, io_workers=args.io_workers, per_host=args.per_host, parse_workers=args.parse_workers)
+            start = time.perf_counter()
+            episodes = crawler.crawl()
+            elapsed = time.perf_counter() - start
+        made = len(server.requests) - before
+        print("EpisodeCrawler  {:7.2f}s for {} requests ({:.0f} a second) -> {:.1f}x faster".format(
+            elapsed, made, made / elapsed, serial_total / elapsed))
+
+    table = crawler.table(episodes)
+    assert len(table) == total, "the crawler found {} of {} episodes".format(len(table), total)
+    assert table["position"].tolist() == list(range(1, total + 1))
+    for row, episode in zip(table.itertuples(), sample):
+        assert (row.url, row.title, row.artists) == (episode["url"], episode["title"], "; ".join(episode["artists"])), row.url
+    print("episode table: {} rows x {} columns, the first {} identical to the serial loop's".format(len(table), len(table.columns), len(sample)))
+
+    # at `--real-latency` a request, the serial loop waits for every request in turn; the crawler for `--per-host` at a time
+    overhead = max(0.0, per_request - args.latency)
+    print("at {}s a request: serial loop about {}, EpisodeCrawler at least {}".format(
+        args.real_latency, minutes(requests_needed * (args.real_latency + overhead)),
+        minutes(max(elapsed, requests_needed * args.real_latency / args.per_host))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Serial vs concurrent requests for the 26 A-Z index pages of a directory.
+
+    python -m benchmarks.bench_fetch [--latency 0.1] [--per-host 8]
+"""
+
+import argparse # module for reading command line options
+import string # module for working with ASCII and other strings
+import time # module for working with time
+
+import requests # module for requesting urls
+
+from scrapetools import fetch_all
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the server waits before answering")
+    parser.add_argument("--per-host", type=int, default=8, help="concurrent requests allowed per host")
+    args = parser.parse_args()
+
+    with LocalServer(directory_site(10199), latency=args.latency) as server:
+        base = server.url + "/directory/10199/a-to-z/"
+        urls = [base + l for l in string.ascii_uppercase]
+
+        start = time.perf_counter()
+        serial = [requests.get(url) for url in urls]
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = fetch_all(urls, max_workers=args.per_host, per_host=args.per_host)
+        concurrent_time = time.perf_counter() - start
+
+    assert [r.text for r in serial] == [r.text for r in concurrent], "results differ between runs"
+
+    print("{} pages, {:.2f}s server latency".format(len(urls), args.latency))
+    print("serial:     {:6.2f}s".format(serial_time))
+    print("concurrent: {:6.2f}s (per_host={}, {:.1f}x faster)".format(concurrent_time, args.per_host, serial_time / concurrent_time))
+
+
+if __name__ == "__main__":
+    main()
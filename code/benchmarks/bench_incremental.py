@@ -0,0 +1,74 @@
+"""Full re-scrape vs `DirectoryCrawler.crawl_incremental` after a few changes.
+
+Day 1 crawls a directory and saves a snapshot. Before day 2 one record is
+added, one removed and one renamed; day 2 is then crawled in full and
+incrementally, and the request counts compared. Day 2 is then crawled
+incrementally once more with the B index page missing, which must not
+change the records or the delta.
+
+    python -m benchmarks.bench_incremental [--per-letter 10]
+"""
+
+import argparse # module for reading command line options
+import tempfile # module for creating temporary files and folders
+
+from scrapetools import DirectoryCrawler, ScrapeClient, parse_index
+
+from .fixtures import directory_site, index_page, record_page
+from .localserver import LocalServer
+
+
+def change_directory(server, directory_id):
+    """Add a record under Z, remove the first record under A and rename the first under C."""
+    def index_path(letter):
+        return "/directory/{}/a-to-z/{}".format(directory_id, letter)
+
+    def listing(letter):
+        return [(org["org_name"], org["org_url"]) for org in parse_index(server.pages[index_path(letter)].decode("utf-8"))]
+
+    server.set_page(index_path("A"), index_page(listing("A")[1:]))
+
+    renamed = [("C Renamed Space", href) if i == 0 else (name, href) for i, (name, href) in enumerate(listing("C"))]
+    server.set_page(renamed[0][1], record_page("C Renamed Space", {"Address": "1 New Street"}))
+    server.set_page(index_path("C"), index_page(renamed))
+
+    href = "/directory_record/999/z-new-space"
+    server.set_page(href, record_page("Z New Space", {"Address": "2 New Street"}))
+    server.set_page(index_path("Z"), index_page(listing("Z") + [("Z New Space", href)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    args = parser.parse_args()
+
+    with LocalServer(directory_site(10199, per_letter=args.per_letter)) as server, tempfile.TemporaryDirectory() as folder:
+        with ScrapeClient() as client:
+            crawler = DirectoryCrawler([10199], client=client, base=server.url, parse_workers=0)
+            crawler.save(crawler.crawl(), folder, "2024-06-05")
+            print("day 1 full crawl:        {:>5} requests".format(len(server.requests)))
+
+            change_directory(server, 10199)
+
+            before = len(server.requests)
+            full = crawler.crawl()
+            print("day 2 full crawl:        {:>5} requests".format(len(server.requests) - before))
+
+            before = len(server.requests)
+            details, deltas = crawler.crawl_incremental(folder)
+            print("day 2 incremental crawl: {:>5} requests".format(len(server.requests) - before))
+
+            # an index page that cannot be requested must not make its organisations look removed
+            index_b = server.pages.pop("/directory/10199/a-to-z/B")
+            missing, missing_deltas = crawler.crawl_incremental(folder)
+            server.set_page("/directory/10199/a-to-z/B", index_b)
+
+    assert details == full, "incremental crawl differs from full crawl"
+    assert sorted(obs["org_url"] for obs in missing[10199]) == sorted(obs["org_url"] for obs in full[10199]), "organisations under a missing index page were dropped"
+    assert missing_deltas == deltas, "a missing index page changed the delta"
+    delta = deltas[10199]
+    print("delta: {} added, {} removed, {} changed".format(len(delta["added"]), len(delta["removed"]), len(delta["changed"])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Cold-load time and peak memory of `pd.read_csv` vs the Parquet register.
+
+The synthetic register is extracted to a tab-delimited file and converted
+once with `convert_register`. Each load then runs in a fresh process, so that
+nothing is already cached in memory and its peak memory (resident set size)
+can be measured: the whole text file with `pd.read_csv`, the whole Parquet
+dataset, and only a few columns of the registered charities.
+
+    python -m benchmarks.bench_parquet [--rows 500000]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import resource # module for measuring the resources used by a process (not on Windows)
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+import zipfile # module for compressing/decompressing files
+
+from .fixtures import register_zip
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the `code` folder
+
+COLUMNS = ["registered_charity_number", "charity_name", "latest_income"]
+FILTERS = [("charity_registration_status", "==", "Registered")]
+
+
+def child(method, path):
+    """Load the register with `method` and print rows, columns, seconds and peak memory in MB."""
+    import pandas as pd # module for working with dataframes
+    from scrapetools import convert_register, load_register
+
+    start = time.perf_counter()
+    if method == "convert":
+        zip_path, folder = path.split(os.pathsep)
+        again = convert_register(zip_path, folder, last_modified="Wed, 05 Jun 2024 01:00:00 GMT")
+        print(again, time.perf_counter() - start)
+        return
+    if method == "csv":
+        df = pd.read_csv(path, delimiter="\t", on_bad_lines="skip")
+    elif method == "parquet":
+        df = load_register(path)
+    else:
+        df = load_register(path, columns=COLUMNS, filters=FILTERS)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # kilobytes on Linux
+    print(len(df), len(df.columns), elapsed, peak)
+
+
+def folder_size(folder):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(folder) for name in names)
+
+
+def run(method, path):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_parquet", "--child", method, path],
+        cwd=CODE, check=True, capture_output=True, text=True,
+    )
+    return result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000, help="rows in the synthetic register")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        zip_path = register_zip(os.path.join(folder, "ccew-register-of-charities.zip"), rows=args.rows)
+        with zipfile.ZipFile(zip_path, "r") as download_zip:
+            download_zip.extractall(folder)
+        text_file = os.path.join(folder, "publicextract.charity.txt")
+        parquet_folder = os.path.join(folder, "register-parquet")
+
+        # convert in child processes too: a child started from a large parent reports the parent's peak memory
+        times = []
+        for _ in range(2):
+            result = run("convert", zip_path + os.pathsep + parquet_folder)
+            times.append(result.split())
+        print("{:,} rows: {:.1f} MB text, {:.1f} MB Parquet".format(args.rows, os.path.getsize(text_file) / 1e6, folder_size(parquet_folder) / 1e6))
+        print("conversion {:.2f}s once; {:.3f}s to skip it for the same Last-Modified (converted again: {})".format(float(times[0][1]), float(times[1][1]), times[1][0]))
+
+        for method, path, label in [
+            ("csv", text_file, "pd.read_csv"),
+            ("parquet", parquet_folder, "load_register"),
+            ("pushdown", parquet_folder, "load_register(3 cols, Registered)"),
+        ]:
+            rows, columns, elapsed, peak = run(method, path).split()
+            print("{:<34} {:>9} rows {:>3} cols  peak memory {:>7.1f} MB {:>6.2f}s".format(
+                label, rows, columns, float(peak), float(elapsed)))
+
+
+if __name__ == "__main__":
+    main()
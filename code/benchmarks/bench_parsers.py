@@ -0,0 +1,88 @@
+"""Pages per second parsing stored record pages with each HTML parser.
+
+The record pages of a synthetic directory are written to a folder, as if
+saved from an earlier scrape (or use `--corpus` to point at a folder of your
+own saved .html pages), then each page is parsed with `parse_record` using
+each installed parser. The parsers must all extract the same details, and
+must agree on lookups from an element that itself matches (`NESTED_LOOKUPS`):
+only the elements below it are searched.
+
+    python -m benchmarks.bench_parsers [--per-letter 20] [--corpus folder]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from scrapetools import PARSERS, get_parser, parse_record
+
+from .fixtures import directory_site
+
+NESTED_PAGE = '<div class="a"><div class="a b"><ul><li>one</li><li>two<ul><li>three</li></ul></li></ul></div></div>'
+
+
+def nested_lookups(name):
+    """What each lookup finds from an element that matches the lookup itself, with the parser `name`."""
+    root = get_parser(name).parse(NESTED_PAGE)
+    outer = root.find("div", "a")
+    li = root.find("li")
+    return {
+        "outer.find_all(div, a)": [node.get("class") for node in outer.find_all("div", "a")],
+        "outer.find(div, a)": outer.find("div", "a").get("class"),
+        "li.find(li)": li.find("li"),
+        "li.find_all(li)": [node.text for node in root.find_all("li")[1].find_all("li")],
+    }
+
+
+def save_corpus(folder, per_letter):
+    pages = directory_site(10199, per_letter=per_letter)
+    for path, html in pages.items():
+        if path.startswith("/directory_record/"):
+            with open(os.path.join(folder, path.rsplit("/", 1)[1] + ".html"), "w", encoding="utf-8") as f:
+                f.write(html)
+
+
+def load_corpus(folder):
+    pages = []
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith(".html"):
+            with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                pages.append(f.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=20, help="records listed under each letter")
+    parser.add_argument("--corpus", help="folder of saved record pages (.html) to parse instead")
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = load_corpus(args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            save_corpus(folder, args.per_letter)
+            pages = load_corpus(folder)
+    print("{} record pages, {:.1f} KB on average".format(len(pages), sum(len(html) for html in pages) / len(pages) / 1e3))
+
+    expected = None
+    for name in reversed(PARSERS): # slowest (and always installed) first
+        try:
+            get_parser(name)
+        except ImportError as e:
+            print("{:<12} skipped: {}".format(name, e))
+            continue
+        start = time.perf_counter()
+        results = [parse_record(html, parser=name) for html in pages]
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = results
+        assert results == expected, "{} extracted different details".format(name)
+        lookups = nested_lookups(name)
+        assert lookups == nested_lookups("html.parser"), "{} searched outside the element: {}".format(name, lookups)
+        print("{:<12} {:6.2f}s {:8.1f} pages/s".format(name, elapsed, len(pages) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Parse time and memory per page with and without a target region.
+
+Each record page and A-Z index page of a synthetic directory is parsed with
+each installed parser, first as a whole page and then with only the target
+element (`partial=True`). Memory is the peak of Python allocations while
+parsing one page, measured with `tracemalloc`. lxml builds its tree outside Python's
+allocator and selectolax reserves a fixed-size block per document, so for
+them the amount of markup handed to the parser is the better guide.
+
+    python -m benchmarks.bench_partial [--per-letter 10]
+"""
+
+import argparse # module for reading command line options
+import time # module for working with time
+import tracemalloc # module for measuring memory allocated by Python
+
+from scrapetools import PARSERS, get_parser, parse_index, parse_record
+from scrapetools.extract import INDEX_TARGET, RECORD_TARGET
+from scrapetools.parsers import target_region
+
+from .fixtures import directory_site
+
+
+def measure(parse, pages, **kwargs):
+    """Return (results, seconds per page, average peak KB per page)."""
+    start = time.perf_counter()
+    results = [parse(html, **kwargs) for html in pages]
+    seconds = (time.perf_counter() - start) / len(pages)
+
+    peaks = []
+    for html in pages[:50]: # tracemalloc slows parsing down, so it is measured separately on a sample
+        tracemalloc.start()
+        parse(html, **kwargs)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return results, seconds, sum(peaks) / len(peaks) / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    args = parser.parse_args()
+
+    site = directory_site(10199, per_letter=args.per_letter)
+    kinds = [
+        ("record", parse_record, RECORD_TARGET, [html for path, html in sorted(site.items()) if path.startswith("/directory_record/")]),
+        ("index", parse_index, INDEX_TARGET, [html for path, html in sorted(site.items()) if "/a-to-z/" in path]),
+    ]
+    for kind, parse, target, pages in kinds:
+        whole = sum(len(html) for html in pages) / len(pages) / 1e3
+        region = sum(len(target_region(html, target)) for html in pages) / len(pages) / 1e3
+        print("{} {} pages: {:.1f} KB of markup each, {:.1f} KB in the target region".format(len(pages), kind, whole, region))
+        for name in reversed(PARSERS):
+            try:
+                get_parser(name)
+            except ImportError as e:
+                print("  {:<12} skipped: {}".format(name, e))
+                continue
+            full_results, full_seconds, full_kb = measure(parse, pages, parser=name, partial=False)
+            part_results, part_seconds, part_kb = measure(parse, pages, parser=name, partial=True)
+            assert part_results == full_results, "{} extracted different data from the target region".format(name)
+            print("  {:<12} whole page {:8.3f} ms {:8.1f} KB   target only {:8.3f} ms {:8.1f} KB   ({:.1f}x faster)".format(
+                name, full_seconds * 1e3, full_kb, part_seconds * 1e3, part_kb, full_seconds / part_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Fetch-then-parse loop vs the two-stage `crawl` pipeline for record pages.
+
+    python -m benchmarks.bench_pipeline [--per-letter 10] [--latency 0.02]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import time # module for working with time
+
+from scrapetools import ScrapeClient, crawl, parse_record
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the server waits before answering")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    paths = sorted(path for path in pages if path.startswith("/directory_record/"))
+
+    with LocalServer(pages, latency=args.latency) as server:
+        urls = [server.url + path for path in paths]
+        timings = {}
+
+        with ScrapeClient() as client:
+            start = time.perf_counter()
+            serial = []
+            for url in urls:
+                response = client.get(url)
+                serial.append(parse_record(response.text))
+            timings["serial loop"] = time.perf_counter() - start
+
+        for label, parse_workers in [("crawl, parse in-process", 0), ("crawl, {} parse processes".format(os.cpu_count()), None)]:
+            with ScrapeClient() as client:
+                start = time.perf_counter()
+                results = crawl(urls, parse_record, get=client.get, parse_workers=parse_workers)
+                timings[label] = time.perf_counter() - start
+            assert [r.data for r in results] == serial, "results differ from the serial loop"
+
+    print("{} record pages, {:.2f}s server latency".format(len(urls), args.latency))
+    for label, elapsed in timings.items():
+        print("{:<28} {:6.2f}s {:8.1f} pages/s".format(label, elapsed, len(urls) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Single-stream vs ranged, parallel downloads, and resuming an interrupted one.
+
+The local server is limited to `--bandwidth-mb` MB/s per connection, as
+many file hosts are, which is what several connections at once get around.
+
+    python -m benchmarks.bench_ranged [--size-mb 100] [--segment-mb 8] [--workers 4]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import pathlib # module for working with file paths
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+import requests # module for requesting urls
+
+from scrapetools import ScrapeClient, download_file, download_ranged, file_checksum
+
+from .localserver import LocalServer
+
+
+class Interrupted(requests.ConnectionError):
+    pass
+
+
+def interrupt_after(get, requests_allowed):
+    """Wrap `get` so that it fails once `requests_allowed` requests have been made."""
+    count = {"n": 0}
+
+    def failing_get(url, **kwargs):
+        count["n"] += 1
+        if count["n"] > requests_allowed:
+            raise Interrupted("simulated dropped connection")
+        return get(url, **kwargs)
+    return failing_get
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=100, help="size of the file to download")
+    parser.add_argument("--segment-mb", type=int, default=8, help="size of each ranged request")
+    parser.add_argument("--workers", type=int, default=4, help="ranged requests made at once")
+    parser.add_argument("--bandwidth-mb", type=float, default=50, help="server bandwidth per connection, MB/s")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = pathlib.Path(folder) / "publicextract.charity.zip"
+        with open(source, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+        checksum = file_checksum(source)
+        outfile = os.path.join(folder, "download.zip")
+        options = dict(segment_size=args.segment_mb * 1024 * 1024, max_workers=args.workers, checksum=checksum, progress=None)
+
+        for ranges in (True, False):
+            bandwidth = int(args.bandwidth_mb * 1024 * 1024)
+            with LocalServer({"/publicextract.charity.zip": source}, ranges=ranges, bandwidth=bandwidth) as server, ScrapeClient() as client:
+                url = server.url + "/publicextract.charity.zip"
+                if ranges:
+                    start = time.perf_counter()
+                    download_file(url, outfile, get=client.get, progress=None)
+                    print("{:<40} {:>6.2f}s".format("single stream", time.perf_counter() - start))
+
+                start = time.perf_counter()
+                download_ranged(url, outfile, get=client.get, **options)
+                label = "ranged, {} workers".format(args.workers) if ranges else "ranged, server without range support"
+                print("{:<40} {:>6.2f}s".format(label, time.perf_counter() - start))
+                os.remove(outfile)
+
+        with LocalServer({"/publicextract.charity.zip": source}) as server, ScrapeClient() as client:
+            url = server.url + "/publicextract.charity.zip"
+            segments = -(-args.size_mb // args.segment_mb)
+            try:
+                download_ranged(url, outfile, get=interrupt_after(client.get, 1 + segments // 2), **dict(options, max_workers=1))
+            except Interrupted:
+                pass
+            sent_before = server.bytes_sent
+            download_ranged(url, outfile, get=client.get, **options)
+            print("interrupted half way, then resumed: {:.1f} of {} MB downloaded again, checksum verified".format(
+                (server.bytes_sent - sent_before) / 1024 / 1024, args.size_mb))
+
+
+if __name__ == "__main__":
+    main()
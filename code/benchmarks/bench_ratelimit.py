@@ -0,0 +1,53 @@
+"""Throughput and 429s for unthrottled vs rate-limited requests to a protective server.
+
+The local server handles `--capacity` requests at once before slowing down,
+and answers more than `--server-rate` requests per second with
+`429 Too Many Requests` and a `Retry-After` header. The A-Z index and record
+pages of a synthetic directory are requested with `client.fetch_all` (8
+threads) by a plain `ScrapeClient` and by clients with a `RateLimiter`, set
+below and above the server's limit (above it, the limiter has to find the
+limit from the 429s).
+
+    python -m benchmarks.bench_ratelimit [--per-letter 10] [--server-rate 40] [--limiter-rates 35 80]
+"""
+
+import argparse # module for reading command line options
+import time # module for working with time
+
+from scrapetools import RateLimiter, ScrapeClient
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the server waits before answering")
+    parser.add_argument("--capacity", type=int, default=4, help="requests the server handles at once before slowing down")
+    parser.add_argument("--server-rate", type=float, default=40, help="requests per second the server allows")
+    parser.add_argument("--limiter-rates", type=float, nargs="+", default=[35, 80], help="requests per second the RateLimiter allows")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    paths = sorted(pages)
+    print("{} pages; server: {:.0f} requests/s allowed, slows down beyond {} at once".format(len(paths), args.server_rate, args.capacity))
+
+    for rate in [None] + args.limiter_rates:
+        label = "no limiter" if rate is None else "limiter {:.0f}/s".format(rate)
+        with LocalServer(pages, latency=args.latency, capacity=args.capacity, rate_limit=args.server_rate) as server:
+            limiter = RateLimiter(rate=rate, burst=4, max_concurrency=8) if rate is not None else None
+            with ScrapeClient(rate_limiter=limiter, max_retries=5, backoff_factor=0.5) as client:
+                start = time.perf_counter()
+                responses = client.fetch_all([server.url + path for path in paths], max_workers=8, per_host=8)
+                elapsed = time.perf_counter() - start
+            ok = sum(response is not None and response.status_code==200 for response in responses)
+            print("{:<16} {:6.2f}s {:6.1f} pages/s  {:4d}/{} pages ok  {:4d} requests  {:4d} answered 429".format(
+                label, elapsed, ok / elapsed, ok, len(paths), len(server.requests), server.throttled))
+            if limiter is not None:
+                for host, state in limiter.metrics().items():
+                    print("  {}: {}".format(host, state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Peak memory of extracting + `pd.read_csv` vs `RegisterReader` chunks.
+
+Both approaches count the rows of a synthetic register; each runs in a fresh
+process so that its peak memory (resident set size) can be measured.
+
+    python -m benchmarks.bench_register [--rows 500000] [--chunksize 100000]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import resource # module for measuring the resources used by a process (not on Windows)
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from .fixtures import register_zip
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the `code` folder
+
+
+def child(method, zip_path, chunksize):
+    """Count the rows with `method` and print rows, bad lines, seconds and peak memory in MB."""
+    import zipfile # module for compressing/decompressing files
+    import pandas as pd # module for working with dataframes
+    from scrapetools import RegisterReader
+
+    start = time.perf_counter()
+    if method == "extract":
+        folder = os.path.dirname(zip_path)
+        with zipfile.ZipFile(zip_path, "r") as download_zip:
+            download_zip.extractall(folder)
+        df = pd.read_csv(os.path.join(folder, "publicextract.charity.txt"), delimiter="\t", on_bad_lines="skip")
+        rows, bad = len(df), "?"
+    else:
+        register = RegisterReader(zip_path, chunksize=int(chunksize))
+        rows = sum(len(chunk) for chunk in register)
+        bad = register.bad_lines
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # kilobytes on Linux
+    print(rows, bad, elapsed, peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000, help="rows in the synthetic register")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows per RegisterReader chunk")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        zip_path = register_zip(os.path.join(folder, "ccew-register-of-charities.zip"), rows=args.rows)
+        print("{:,} rows, {:.1f} MB zip".format(args.rows, os.path.getsize(zip_path) / 1e6))
+        for method, label in [("extract", "extract + pd.read_csv"), ("chunks", "RegisterReader")]:
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_register", "--child", method, zip_path, str(args.chunksize)],
+                cwd=CODE, check=True, capture_output=True, text=True,
+            )
+            rows, bad, elapsed, peak = result.stdout.split()
+            print("{:<22} {:>9} rows {:>3} bad lines reported  peak memory {:>7.1f} MB {:>6.2f}s".format(
+                label, rows, bad, float(peak), float(elapsed)))
+
+
+if __name__ == "__main__":
+    main()
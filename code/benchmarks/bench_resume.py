@@ -0,0 +1,98 @@
+"""Kill a crawl partway through, resume it from its `Frontier`, and count requests.
+
+A child process crawls a synthetic directory with a `DirectoryCrawler` that
+records its progress in a frontier. As soon as it has recorded `--kill-after`
+pages as finished, the child kills itself without warning (as when a kernel
+is restarted), so the kill always lands partway through the crawl, however
+fast the machine. A second run with the same frontier then finishes the
+crawl. No page that the first run finished may be requested again: the only
+repeats allowed are the pages that were in flight when it was killed.
+
+    python -m benchmarks.bench_resume [--per-letter 10] [--kill-after 150]
+"""
+
+import argparse # module for reading command line options
+import collections # module for counting things
+import os # module for navigating your machine (e.g., file directories)
+import signal # module for sending signals to processes
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+
+from scrapetools import DirectoryCrawler, Frontier, ScrapeClient
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the `code` folder
+
+
+class KillingFrontier(Frontier):
+    """A `Frontier` whose process kills itself once `kill_after` pages have been finished."""
+
+    def __init__(self, path, kill_after):
+        super().__init__(path)
+        self.kill_after = kill_after
+        self.finished = 0
+
+    def finish(self, url, status_code, data):
+        super().finish(url, status_code, data)
+        self.finished += 1
+        if self.finished >= self.kill_after:
+            os.kill(os.getpid(), signal.SIGKILL)
+
+
+def run_crawl(base, frontier_path, kill_after=None):
+    """Crawl directory 10199 at `base`, recording progress in the frontier at `frontier_path`.
+
+    With `kill_after`, the process is killed once that many pages have been finished.
+    """
+    frontier = Frontier(frontier_path) if kill_after is None else KillingFrontier(frontier_path, int(kill_after))
+    with ScrapeClient(max_retries=0) as client, frontier:
+        crawler = DirectoryCrawler([10199], client=client, base=base, parse_workers=0, frontier=frontier)
+        return crawler.crawl()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the server waits before answering")
+    parser.add_argument("--kill-after", type=int, default=150, help="pages finished before the first run is killed")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_crawl(*args.child)
+        return
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    if not 0 < args.kill_after < len(pages):
+        parser.error("--kill-after must be between 1 and {}, the number of pages less one".format(len(pages) - 1))
+    with LocalServer(pages, latency=args.latency) as server, tempfile.TemporaryDirectory() as folder:
+        frontier_path = os.path.join(folder, "crawl.sqlite")
+        child = subprocess.run([sys.executable, "-m", "benchmarks.bench_resume", "--child", server.url, frontier_path, str(args.kill_after)], cwd=CODE)
+        assert child.returncode == -signal.SIGKILL, "the first run was not killed (exit status {})".format(child.returncode)
+        first = list(server.requests)
+
+        with Frontier(frontier_path) as frontier:
+            finished = {url[len(server.url):] for url, _ in frontier.results()}
+        assert len(finished) >= args.kill_after, "the first run was killed before it had finished {} pages".format(args.kill_after)
+        pending = len(pages) - len(finished)
+        assert pending > 0, "the first run finished every page before it was killed: nothing was left to resume"
+        server.requests.clear()
+        details = run_crawl(server.url, frontier_path)
+        second = list(server.requests)
+
+    repeated = collections.Counter(path for path in second if path in set(first))
+    assert not finished & set(second), "pages finished before the kill were requested again"
+    assert all(count == 1 for count in repeated.values()), "a page was requested more than once by the resumed run"
+    assert len(details[10199]) == 26 * args.per_letter, "the resumed crawl is missing records"
+    print("{} pages in the directory".format(len(pages)))
+    print("first run killed after   {:4d} requests, {} pages finished and saved, {} still to do".format(len(first), len(finished), pending))
+    print("resumed run made         {:4d} requests".format(len(second)))
+    print("pages requested by both: {:4d} (in flight when the first run was killed)".format(len(repeated)))
+    print("total requests           {:4d} for {} pages; a full restart would have made {}".format(
+        len(first) + len(second), len(pages), len(first) + len(pages)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Records saved and pages lost when crawling a flaky website, with and without a retry policy and failure ledger.
+
+The local server answers a random `--error-rate` of requests with
+`503 Service Unavailable` and holds back a random `--stall-rate` of them
+until the client times out. A few record pages have been removed (404) and a
+few have lost their details list, so no amount of retrying helps them. The
+record pages of a synthetic directory are crawled with `parse_record`:
+
+* as in Example 2, without a ledger: the first page without a details list
+  stops the crawl;
+* with a `FailureLedger`, by a client that does not retry: every transient
+  fault loses a record;
+* with a `FailureLedger`, by a client retrying through the connection pool
+  (`max_retries`, no jitter);
+* with a `FailureLedger`, by a client with a `RetryPolicy`.
+
+    python -m benchmarks.bench_retry [--per-letter 10] [--error-rate 0.1] [--stall-rate 0.03]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+from collections import Counter # module for counting things
+
+from scrapetools import FailureLedger, RetryPolicy, ScrapeClient, crawl, parse_record, read_jsonl
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+BROKEN_PAGE = "<!DOCTYPE html><html><head><title>Under maintenance</title></head><body><p>Please try again later.</p></body></html>"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of requests answered with a 503")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="share of requests held back until the client times out")
+    parser.add_argument("--removed", type=int, default=3, help="record pages that have been removed (404)")
+    parser.add_argument("--broken", type=int, default=3, help="record pages without a details list")
+    parser.add_argument("--timeout", type=float, default=0.5, help="seconds the client waits for an answer")
+    parser.add_argument("--attempts", type=int, default=4, help="attempts per page allowed by the retry policy")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    paths = sorted(path for path in pages if path.startswith("/directory_record/"))
+    removed = paths[:args.removed]
+    broken = paths[args.removed:args.removed + args.broken]
+    for path in removed:
+        del pages[path]
+    for path in broken:
+        pages[path] = BROKEN_PAGE
+    print("{} record pages: {} removed, {} without a details list; {:.0%} of answers are 503s, {:.0%} time out".format(
+        len(paths), len(removed), len(broken), args.error_rate, args.stall_rate))
+
+    scenarios = [
+        ("no ledger", dict(max_retries=3, backoff_factor=0.1), False),
+        ("no retries", dict(max_retries=0), True),
+        ("pool retries", dict(max_retries=3, backoff_factor=0.1), True),
+        ("RetryPolicy", dict(retry=RetryPolicy(max_attempts=args.attempts, backoff=0.1)), True),
+    ]
+    with tempfile.TemporaryDirectory() as folder:
+        for label, options, ledgered in scenarios:
+            ledger = FailureLedger(os.path.join(folder, label.replace(" ", "-") + "-failures.jsonl")) if ledgered else None
+            with LocalServer(pages, latency=0.01, error_rate=args.error_rate, stall_rate=args.stall_rate,
+                             stall=args.timeout * 2, seed=1) as server, ScrapeClient(timeout=args.timeout, **options) as client:
+                urls = [server.url + path for path in paths]
+                start = time.perf_counter()
+                try:
+                    results = crawl(urls, parse_record, get=client.get, parse_workers=0, failures=ledger)
+                    stopped = None
+                except Exception as error:
+                    results = []
+                    stopped = error
+                elapsed = time.perf_counter() - start
+            saved = sum(page.data is not None for page in results)
+            most = max(Counter(server.requests).values())
+            print("{:<13} {:6.2f}s  {:4d}/{} records saved  {:4d} requests (at most {} for one page)  {:3d} 503s  {:3d} timeouts".format(
+                label, elapsed, saved, len(paths), len(server.requests), most, server.errors, server.stalls))
+            if stopped is not None:
+                print("  crawl stopped by {}: {}".format(type(stopped).__name__, stopped))
+            if ledger is not None:
+                ledger.close()
+                entries = list(read_jsonl(ledger.path))
+                print("  ledger: {} pages {}".format(len(entries), ledger.summary()))
+                print("  attempts per failed page: {}".format(dict(sorted(Counter(entry["attempts"] for entry in entries).items()))))
+                lost = len(entries) - len(removed) - len(broken)
+                print("  lost to transient faults: {}".format(lost))
+
+
+if __name__ == "__main__":
+    main()
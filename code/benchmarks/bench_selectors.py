@@ -0,0 +1,138 @@
+"""Element lookups on parsed pages: `find`/`find_all` as in the examples vs compiled selectors and an `ElementIndex`.
+
+Three synthetic pages are parsed once, outside the timings:
+
+* the Mary's Meals page, looked up as in the Example 1 exercise (the `div`
+  with its long class string, then its paragraphs);
+* a council A-Z index page, looked up as in Example 2 (`ul` "list
+  list--record", then its items);
+* a Desert Island Discs listing page of `--episodes` episodes, with
+  `len(LISTING_LOOKUPS)` different lookups on the same page, as when taking
+  several fields from every episode.
+
+Each set of lookups is timed on each page with
+
+* BeautifulSoup's own `find`/`find_all` (html.parser), as the examples call them;
+* the nodes of each parser in `scrapetools.parsers`, with the classes of
+  each element split on every comparison as before ("split each time", lxml
+  only) and with the remembered class sets (`class_tokens`);
+* an `ElementIndex` of the page (with each parser): built and then looked
+  up, and looked up again on the same page.
+
+Each is the best of 5 rounds of `--repeat` runs.
+
+Elements found are counted too: BeautifulSoup compares a class string of
+several classes character for character, so a lookup that gives the classes
+in another order (as `("div", "programme--episode programme")` does) finds
+nothing, while class sets find every episode.
+
+    python -m benchmarks.bench_selectors [--episodes 100] [--repeat 50]
+"""
+
+import argparse # module for reading command line options
+import time # module for working with time
+
+from bs4 import BeautifulSoup as soup # module for parsing web pages
+
+from scrapetools import ElementIndex, get_parser
+
+from .fixtures import MARYS_MEALS_CLASS, episode_listing_page, episode_pid, index_page, marys_meals_page
+
+LISTING_LOOKUPS = [
+    ("div", "programme--episode programme"),
+    ("span", "programme__title"),
+    ("p", "programme__synopsis"),
+    ("a", "br-blocklink__link"),
+    ("nav", "pagination"),
+    ("li", "pagination__next"),
+    ("a", "menu__link"),
+    ("div", "br-masthead__title"),
+]
+
+
+def pages(episodes):
+    return {
+        "Mary's Meals": marys_meals_page(),
+        "A-Z index": index_page([("Community Space {}".format(i), "/directory_record/{}".format(i)) for i in range(25)]),
+        "listing": episode_listing_page(1, 300, [(episode_pid(i), "Guest {}".format(i)) for i in range(episodes)]),
+    }
+
+
+def lookups(page, find, find_all):
+    # the lookups each example makes on a page, as calls to `find`/`find_all`; returns the number of elements found
+    if page == "Mary's Meals":
+        div = find("div", MARYS_MEALS_CLASS)
+        return 0 if div is None else len(div.find_all("p"))
+    if page == "A-Z index":
+        ul = find("ul", "list list--record")
+        return 0 if ul is None else len(ul.find_all("li"))
+    return sum(len(find_all(tag, class_)) for tag, class_ in LISTING_LOOKUPS)
+
+
+def split_each_time(root):
+    # the lxml nodes' lookups as they were: the classes of every element split again for each comparison
+    from scrapetools.parsers import LxmlNode
+
+    def find_all(tag, class_=None):
+        return [
+            LxmlNode(element) for element in root.element.iterdescendants(tag)
+            if class_ is None or (element.get("class") is not None and set(class_.split()) <= set(element.get("class").split()))
+        ]
+
+    def find(tag, class_=None):
+        found = find_all(tag, class_)
+        return found[0] if found else None
+    return find, find_all
+
+
+def timed(repeat, run, rounds=5):
+    # the best of `rounds` rounds, each running the lookups `repeat` times
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            found = run()
+        seconds = (time.perf_counter() - start) / repeat
+        best = seconds if best is None else min(best, seconds)
+    return best, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--episodes", type=int, default=100, help="episodes on the listing page")
+    parser.add_argument("--repeat", type=int, default=50, help="times each set of lookups is run in each of 5 rounds (the best round is shown)")
+    args = parser.parse_args()
+
+    print("{:<14}{:<40}{:>12}{:>8}".format("page", "lookups", "us a set", "found"))
+    for page, html in pages(args.episodes).items():
+        rows = []
+        bs = soup(html, "html.parser")
+        rows.append(("BeautifulSoup find/find_all", lambda: lookups(page, lambda tag, class_: bs.find(tag, class_=class_), lambda tag, class_: bs.find_all(tag, class_=class_))))
+        for name in ("html.parser", "lxml", "selectolax"):
+            try:
+                node_parser = get_parser(name)
+            except ImportError:
+                continue
+            root = node_parser.parse(html)
+            if name == "lxml":
+                rows.append(("lxml nodes, split each time", lambda find_all=split_each_time(root): lookups(page, *find_all)))
+            rows.append(("{} nodes, class sets".format(name), lambda root=root: lookups(page, root.find, root.find_all)))
+            rows.append(("{} ElementIndex, build + look up".format(name), lambda node_parser=node_parser, root=root: lookups(page, *_index(node_parser, root))))
+            index = ElementIndex(node_parser, root)
+            rows.append(("{} ElementIndex, look up again".format(name), lambda index=index: lookups(page, index.find, index.find_all)))
+
+        baseline = None
+        for label, run in rows:
+            seconds, found = timed(args.repeat, run)
+            baseline = baseline or seconds
+            print("{:<14}{:<40}{:>12.1f}{:>8}   {:5.1f}x".format(page, label, seconds * 1e6, found, baseline / seconds))
+        print()
+
+
+def _index(node_parser, root):
+    index = ElementIndex(node_parser, root)
+    return index.find, index.find_all
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Peak memory of collecting records for `json.dump` vs a `JSONLinesWriter`.
+
+Both write the same synthetic directory records, each in a fresh process so
+that its peak memory (resident set size) can be measured. The writer is then
+timed under each fsync policy.
+
+    python -m benchmarks.bench_sink [--records 200000]
+"""
+
+import argparse # module for reading command line options
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import resource # module for measuring the resources used by a process (not on Windows)
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from .fixtures import RECORD_FIELDS
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the `code` folder
+
+
+def record(i):
+    name = "Community Space {}".format(i)
+    obs = {key: "{} for {}".format(key, name) for key in RECORD_FIELDS}
+    obs["org_name"] = name
+    obs["org_url"] = "https://www.edinburgh.gov.uk/directory_record/{}/community-space-{}".format(i, i)
+    return obs
+
+
+def child(method, folder, records, fsync):
+    """Write `records` records with `method`; print seconds and peak memory in MB."""
+    from scrapetools import JSONLinesWriter
+
+    records = int(records)
+    outfile = os.path.join(folder, "coe-library-spaces.json")
+    start = time.perf_counter()
+    if method == "dump":
+        org_details = []
+        for i in range(records):
+            org_details.append(record(i))
+        with open(outfile, "w", encoding="utf-8") as f:
+            json.dump(org_details, f)
+    else:
+        with JSONLinesWriter(os.path.join(folder, "coe-library-spaces.jsonl"), fsync=fsync) as sink:
+            for i in range(records):
+                sink.write(record(i))
+        if method == "finalize":
+            sink.finalize(outfile, remove=True)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # kilobytes on Linux
+    print(elapsed, peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200_000, help="records to write")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    runs = [
+        ("dump", "never", "list + json.dump"),
+        ("finalize", "flush", "JSONLinesWriter + finalize"),
+        ("jsonl", "never", "JSONLinesWriter fsync=never"),
+        ("jsonl", "flush", "JSONLinesWriter fsync=flush"),
+        ("jsonl", "always", "JSONLinesWriter fsync=always"),
+    ]
+    print("{:,} records".format(args.records))
+    for method, fsync, label in runs:
+        records = args.records if fsync != "always" else args.records // 20 # one fsync per record is slow
+        with tempfile.TemporaryDirectory() as folder:
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_sink", "--child", method, folder, str(records), fsync],
+                cwd=CODE, check=True, capture_output=True, text=True,
+            )
+        elapsed, peak = map(float, result.stdout.split())
+        print("{:<30} peak memory {:>7.1f} MB {:>10,.0f} records/s".format(label, peak, records / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cost of recording `Timings`, and the summary table and trace they produce for a crawl.
+
+The record pages of a synthetic directory are crawled from a local server
+with `iter_crawl` and saved with a `JSONLinesWriter`, as in Example 2: first
+without timings, then with `Timings()` and with `Timings(trace=True)`. Each
+run is repeated and the best time is kept, so the difference is the cost of
+recording. The table from the last run is printed, and its trace written to
+`--trace` (open it at https://ui.perfetto.dev).
+
+    python -m benchmarks.bench_timings [--per-letter 20] [--repeat 3] [--tls] [--trace trace.json]
+"""
+
+import argparse # module for reading command line options
+import os # module for navigating your machine (e.g., file directories)
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+
+from scrapetools import JSONLinesWriter, ScrapeClient, Timings, iter_crawl, parse_record
+
+from .fixtures import directory_site
+from .localserver import LocalServer
+
+
+def run(server, paths, folder, timings, parse_workers):
+    records = os.path.join(folder, "records.jsonl")
+    if os.path.exists(records):
+        os.remove(records)
+    with ScrapeClient(verify=server.cafile or True, timings=timings) as client, JSONLinesWriter(records, timings=timings) as sink:
+        start = time.perf_counter()
+        for page in iter_crawl([server.url + path for path in paths], parse_record, get=client.get,
+                               parse_workers=parse_workers, timings=timings):
+            sink.write(page.data)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-letter", type=int, default=20, help="records listed under each letter")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the server waits before answering")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each kind; the fastest is reported")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parsing processes (0: parse in the main process)")
+    parser.add_argument("--tls", action="store_true", help="serve over https (needs openssl), to see the handshakes")
+    parser.add_argument("--trace", default=None, help="where to write the Chrome trace of the last run")
+    args = parser.parse_args()
+
+    pages = directory_site(10199, per_letter=args.per_letter)
+    paths = sorted(path for path in pages if path.startswith("/directory_record/"))
+    print("{} record pages, {}s latency{}".format(len(paths), args.latency, ", over https" if args.tls else ""))
+
+    with LocalServer(pages, latency=args.latency, tls=args.tls) as server, tempfile.TemporaryDirectory() as folder:
+        baseline = None
+        for label, make in [("no timings", lambda: None), ("Timings()", Timings), ("Timings(trace=True)", lambda: Timings(trace=True))]:
+            best = None
+            for _ in range(args.repeat):
+                timings = make()
+                elapsed = run(server, paths, folder, timings, args.parse_workers)
+                best = elapsed if best is None else min(best, elapsed)
+            baseline = best if baseline is None else baseline
+            print("{:<20} {:6.3f}s  {:7.1f} pages/s  {:+5.1f}%".format(label, best, len(paths) / best, (best / baseline - 1) * 100))
+
+    print()
+    print(timings.table())
+    trace = args.trace or os.path.join(tempfile.gettempdir(), "scrapetools-trace.json")
+    print("\n{} trace events written to {}".format(timings.save_trace(trace), trace))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Synthetic copies of the pages scraped in the examples.
+
+The markup mirrors the City of Edinburgh Council directory pages closely
+enough for the extraction code in Example 2 to run against it unchanged, and
+the httpbin.org and Mary's Meals pages closely enough for Example 1, and the
+BBC's Desert Island Discs episode list closely enough for Challenge 1.
+`offline_sites` puts all of them, and the register zip, at the paths they
+have on the real websites, ready for one `LocalServer`.
+"""
+
+import os # module for navigating your machine (e.g., file directories)
+import pathlib # module for working with file paths
+import string # module for working with ASCII and other strings
+
+RECORD_FIELDS = ["Address", "Postcode", "Telephone", "Email", "Opening hours", "Accessibility"]
+
+
+def boilerplate(links=120):
+    """Site-wide navigation and footer, which make up most of a real council page."""
+    items = "".join(
+        '<li class="menu__item"><a class="menu__link" href="/service/{0}">Council service {0}</a></li>'.format(i)
+        for i in range(links)
+    )
+    return (
+        '<header class="site-header"><nav class="menu"><ul class="menu__list">{}</ul></nav></header>'
+        '<footer class="site-footer"><p>City of Edinburgh Council, Waverley Court, 4 East Market Street, Edinburgh EH8 8BG</p></footer>'
+    ).format(items)
+
+
+def index_page(records):
+    """Render an A-Z index page listing `records` (a list of (name, href) pairs)."""
+    items = "\n".join(
+        '<li class="list__item"><a class="list__link" href="{}">{}</a></li>'.format(href, name)
+        for name, href in records
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>A to Z</title></head><body>"
+        '<main id="main-content"><h1>A to Z</h1>'
+        '<ul class="list list--record">\n{}\n</ul>'
+        "</main>{}</body></html>"
+    ).format(items, boilerplate())
+
+
+def record_page(name, fields):
+    """Render a directory record page with `fields` (a dict) as a definition list."""
+    rows = "\n".join(
+        '<dt class="definition__heading">{}</dt><dd class="definition__content">{}</dd>'.format(key, value)
+        for key, value in fields.items()
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>{0}</title></head><body>"
+        '<nav class="breadcrumb"><a href="/">Home</a></nav>'
+        '<main id="main-content"><h1>{0}</h1>'
+        '<dl class="list list--definition definition">\n{1}\n</dl>'
+        "</main>{2}</body></html>"
+    ).format(name, rows, boilerplate())
+
+
+def directory_site(directory_id, per_letter=3, also_lists=None):
+    """Build the pages of one directory: 26 A-Z index pages plus their records.
+
+    `also_lists` is another site built by this function whose records should
+    also appear in this directory's index (as when a library is also a warm
+    space). Returns a dict mapping each path to its HTML, ready for `LocalServer`.
+    """
+    pages = {}
+    shared = {}
+    for path, html in (also_lists or {}).items():
+        if path.startswith("/directory_record/"):
+            name = html.split("<title>")[1].split("</title>")[0]
+            shared.setdefault(name[0], []).append((name, path))
+            pages[path] = html
+
+    for letter in string.ascii_uppercase:
+        records = list(shared.get(letter, []))
+        for i in range(per_letter):
+            name = "{} Community Space {}".format(letter, i + 1)
+            record_id = "{}{:02d}{:02d}".format(directory_id, ord(letter) - 64, i)
+            href = "/directory_record/{}/{}".format(record_id, name.lower().replace(" ", "-"))
+            fields = {key: "{} for {}".format(key, name) for key in RECORD_FIELDS}
+            pages[href] = record_page(name, fields)
+            records.append((name, href))
+        pages["/directory/{}/a-to-z/{}".format(directory_id, letter)] = index_page(records)
+    return pages
+
+
+REGISTER_COLUMNS = [
+    "date_of_extract", "organisation_number", "registered_charity_number", "linked_charity_number",
+    "charity_name", "charity_type", "charity_registration_status", "date_of_registration", "date_of_removal",
+    "charity_reporting_status", "latest_acc_fin_period_start_date", "latest_acc_fin_period_end_date",
+    "latest_income", "latest_expenditure", "charity_contact_address1", "charity_contact_address2",
+    "charity_contact_address3", "charity_contact_address4", "charity_contact_address5", "charity_contact_postcode",
+    "charity_contact_phone", "charity_contact_email", "charity_contact_web", "charity_company_registration_number",
+    "charity_insolvent", "charity_in_administration", "charity_previously_excepted", "charity_is_cdf_or_cif",
+    "charity_is_cio", "cio_is_dissolved", "date_cio_dissolution_notice", "charity_activities",
+    "charity_gift_aid", "charity_has_land",
+]
+
+
+def register_row(i, rng):
+    """One line of a synthetic publicextract.charity.txt (as a list of strings)."""
+    removed = rng.random() < 0.4
+    income = "" if rng.random() < 0.1 else "{:.0f}".format(rng.lognormvariate(11, 2))
+    values = {
+        "date_of_extract": "2024-06-01 00:00:00",
+        "organisation_number": str(i),
+        "registered_charity_number": str(200000 + i),
+        "linked_charity_number": "0",
+        "charity_name": "THE {} COMMUNITY TRUST".format(rng.choice(["ABERDEEN", "BRISTOL", "CARDIFF", "DERBY", "EXETER"]) + str(i)),
+        "charity_type": rng.choice(["Other", "Trust", "CIO", "Charitable company", "Previously excepted"]),
+        "charity_registration_status": "Removed" if removed else "Registered",
+        "date_of_registration": "19{:02d}-{:02d}-{:02d} 00:00:00".format(rng.randint(60, 99), rng.randint(1, 12), rng.randint(1, 28)),
+        "date_of_removal": "2015-03-31 00:00:00" if removed else "",
+        "charity_reporting_status": rng.choice(["Submission Received", "Submission Overdue", "Recently Registered"]),
+        "latest_income": income,
+        "latest_expenditure": income,
+        "charity_contact_address1": "{} High Street".format(rng.randint(1, 200)),
+        "charity_contact_postcode": "AB{} {}CD".format(rng.randint(1, 99), rng.randint(1, 9)),
+        "charity_contact_email": "info@charity{}.org.uk".format(i),
+        "charity_insolvent": "False",
+        "charity_in_administration": "False",
+        "charity_is_cio": rng.choice(["True", "False"]),
+        "charity_activities": "The charity provides support, advice and activities for people living in the local area. " * rng.randint(1, 3),
+        "charity_gift_aid": rng.choice(["True", "False", ""]),
+        "charity_has_land": rng.choice(["True", "False", ""]),
+    }
+    return [values.get(column, "") for column in REGISTER_COLUMNS]
+
+
+def register_zip(path, rows=100_000, bad_every=50_000, seed=0, compress=True):
+    """Write a zip holding a synthetic publicextract.charity.txt of `rows` rows.
+
+    Every `bad_every`-th line has an extra field, like the badly formed lines
+    in the real register. At about 600 bytes a row, 500,000 rows make a file of
+    roughly 300 MB before compression. The synthetic rows repeat themselves
+    far more than real ones and compress to a few percent of that; with
+    `compress=False` the file is stored as it is, for a zip as large as the text.
+    """
+    import random # module for generating random numbers
+    import zipfile # module for compressing/decompressing files
+
+    rng = random.Random(seed)
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(path, "w", compression) as z, z.open("publicextract.charity.txt", "w", force_zip64=True) as f:
+        f.write(("﻿" + "\t".join(REGISTER_COLUMNS) + "\r\n").encode("utf-8"))
+        for i in range(1, rows + 1):
+            row = register_row(i, rng)
+            if bad_every and i % bad_every == 0:
+                row.append("stray field")
+            f.write(("\t".join(row) + "\r\n").encode("utf-8"))
+    return path
+
+
+MARYS_MEALS_CLASS = (
+    "coh-wysiwyg ssa-component coh-component ssa-component-instance-b659e133-d541-41a7-8fdc-a10d2a24b61a "
+    "coh-component-instance-b659e133-d541-41a7-8fdc-a10d2a24b61a"
+)
+MARYS_MEALS_PDF = "/sites/mmi/files/2022-05/Our_Impact_Story_Marys_Meals_Impact_Assessment_Report.pdf"
+REGISTER_ZIP = "/data/txt/publicextract.charity.zip"
+
+
+def httpbin_html():
+    """The page at https://httpbin.org/html: a heading and a long passage of Moby-Dick."""
+    sentence = (
+        "Availing himself of the mild, summer-cool weather that now reigned in these latitudes, "
+        "and in preparation for the peculiarly active pursuits shortly to be anticipated, Perth, "
+        "the begrimed, blistered old blacksmith, had not removed his portable forge to the hold again. "
+    )
+    return (
+        "<!DOCTYPE html><html><head></head><body>"
+        "<h1>Herman Melville - Moby-Dick</h1>"
+        "<div><p>{}</p></div>"
+        "</body></html>"
+    ).format(sentence * 20)
+
+
+def marys_meals_page(paragraphs=6):
+    """The Mary's Meals "Our impact" page, with the paragraphs under "Assessing our impact"."""
+    text = "".join(
+        "<p>Paragraph {} of our impact assessment: children who receive Mary's Meals are more likely to attend school.</p>".format(i + 1)
+        for i in range(paragraphs)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Our impact | Mary's Meals</title></head><body>"
+        '<main><h1>Our impact</h1><h2>Assessing our impact</h2><div class="{}">{}'
+        '<p><a href="{}">Read our impact assessment report</a></p></div></main>{}</body></html>'
+    ).format(MARYS_MEALS_CLASS, text, MARYS_MEALS_PDF, boilerplate())
+
+
+DESERT_ISLAND_DISCS_PATH = "/programmes/b006qnmr/episodes/player"
+DISC_ARTISTS = ["Nina Simone", "Johann Sebastian Bach", "The Beatles", "Ella Fitzgerald", "Kate Bush", "Bob Marley", "Maria Callas", "David Bowie"]
+
+
+def episode_pid(number):
+    """The programme id of the `number`-th episode, in the style of the BBC's (e.g. "m001z2k9")."""
+    return "m{:07x}".format(0x1000000 + number)
+
+
+def episode_listing_page(page, last, episodes):
+    """Render page `page` of `last` of the episode list, with `episodes` (a list of (pid, guest) pairs)."""
+    items = "\n".join(
+        '<div class="programme programme--radio programme--episode block-link">'
+        '<h2 class="programme__titles"><a class="br-blocklink__link block-link__target" href="/programmes/{0}">'
+        '<span class="programme__title gamma"><span>{1}</span></span></a></h2>'
+        '<p class="programme__synopsis text--subtle centi"><span>{1} chooses the eight records, book and luxury to take to the island.</span></p>'
+        "</div>".format(pid, guest)
+        for pid, guest in episodes
+    )
+    links = ['<li class="pagination__page{}">{}</li>'.format(
+        " pagination__page--current" if number == page else "",
+        "<span>{}</span>".format(number) if number == page else '<a href="?page={0}">{0}</a>'.format(number),
+    ) for number in sorted({1, max(1, page - 1), page, min(last, page + 1), last})]
+    if page < last:
+        links.append('<li class="pagination__next"><a href="?page={}"><span>Next</span></a></li>'.format(page + 1))
+    return (
+        "<!DOCTYPE html><html><head><title>Desert Island Discs - Available now - BBC Sounds</title></head><body>"
+        '<div class="br-masthead__title"><a href="/programmes/b006qnmr">Desert Island Discs</a></div>'
+        '<main>{}<nav class="pagination"><ol class="nav">{}</ol></nav></main>{}</body></html>'
+    ).format(items, "".join(links), boilerplate())
+
+
+def episode_page(pid, guest, number):
+    """Render the page of one episode: its description, broadcast date and the eight artists played."""
+    tracks = "".join(
+        '<div class="segment__track"><h3><span class="artist">{}</span></h3>'
+        '<p class="no-margin"><span property="name">Track {}</span></p></div>'.format(DISC_ARTISTS[(number + i) % len(DISC_ARTISTS)], i + 1)
+        for i in range(8)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>BBC Radio 4 - Desert Island Discs, {0}</title></head><body>"
+        '<div class="br-masthead__title"><a href="/programmes/b006qnmr">Desert Island Discs</a></div>'
+        '<main><h1 class="no-margin">{0}</h1>'
+        '<div class="synopsis-toggle__long"><p>{0} shares the soundtrack of their life with Lauren Laverne.</p>\n'
+        "<p>Episode {1} of the archive, with the eight records, the book and the luxury they would take to the island.</p></div>"
+        '<div class="broadcast-event__time beta" content="{2}">Sunday 11:15</div>'
+        '<ul class="segments-list">{3}</ul></main>{4}</body></html>'
+    ).format(guest, number, "20{:02d}-{:02d}-{:02d}T11:15:00+01:00".format(24 - number // 52 % 25, number % 12 + 1, number % 28 + 1), tracks, boilerplate())
+
+
+def desert_island_discs_site(pages=300, per_page=10):
+    """Build the Desert Island Discs episode list: `pages` listing pages of `per_page` episodes, plus each episode's page.
+
+    Returns (pages for `LocalServer`, the number of episodes).
+    """
+    site = {}
+    number = 0
+    for page in range(1, pages + 1):
+        episodes = []
+        for _ in range(per_page):
+            number += 1
+            pid = episode_pid(number)
+            guest = "Castaway {}".format(number)
+            episodes.append((pid, guest))
+            site["/programmes/" + pid] = episode_page(pid, guest, number)
+        path = DESERT_ISLAND_DISCS_PATH + ("?page={}".format(page) if page > 1 else "")
+        site[path] = episode_listing_page(page, pages, episodes)
+    return site, number
+
+
+def offline_sites(folder, per_letter=10, register_rows=500_000, compress=False, pdf_mb=2):
+    """The pages of Examples 1 and 2, at their paths on the real websites; returns pages for `LocalServer`.
+
+    httpbin.org/html, the Mary's Meals page and its report (`pdf_mb` MB of
+    filler), the Libraries directory (10199) with `per_letter` records per
+    letter, and a register zip of `register_rows` rows. The zip is written to
+    `folder` and reused while its name (which includes the settings) matches,
+    as it takes a while to build.
+    """
+    pages = directory_site(10199, per_letter=per_letter)
+    pages["/html"] = httpbin_html()
+    pages["/what-we-do/our-impact"] = marys_meals_page()
+    pages[MARYS_MEALS_PDF] = b"%PDF-1.4\n" + b"0" * (pdf_mb * 1024 * 1024)
+    path = os.path.join(folder, "publicextract-{}-rows{}.zip".format(register_rows, "" if compress else "-stored"))
+    if not os.path.exists(path):
+        register_zip(path + ".tmp", rows=register_rows, compress=compress)
+        os.replace(path + ".tmp", path)
+    pages[REGISTER_ZIP] = pathlib.Path(path)
+    return pages
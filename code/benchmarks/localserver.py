@@ -0,0 +1,323 @@
+"""A local stand-in web server for benchmarking the scrapers offline.
+
+    with LocalServer(pages, latency=0.05) as server:
+        requests.get(server.url + "/directory/10199/a-to-z/A")
+
+`pages` maps a path (e.g. "/directory/10199/a-to-z/A") to the text or bytes
+served for it, or to a `pathlib.Path` of a file on disk (served in chunks, so
+large files need not fit in memory); any other path returns a 404. `latency` is the number of seconds the
+server waits before answering, mimicking the round-trip to a real website;
+`bandwidth` (bytes per second, per connection) throttles how fast bodies are
+sent, as many real servers do.
+
+With `tls=True` the server speaks https using a throwaway self-signed
+certificate; pass `server.cafile` as `verify=` when requesting from it.
+`server.connections` counts the TCP connections the server has accepted.
+
+Every page is sent with an `ETag` and a `Last-Modified` header, and
+conditional requests for an unchanged page get a `304 Not Modified`.
+Requests with a `Range: bytes=first-last` header get a `206 Partial Content`
+unless the server was started with `ranges=False`. Use
+`server.set_page(path, body)` to change a page while the server is running.
+
+To mimic a website that protects itself, `capacity` is the number of
+requests the server handles at once before each answer slows down in
+proportion, and `rate_limit` the requests per second it allows (on average,
+with bursts of up to `rate_limit`); requests over the limit get a
+`429 Too Many Requests` with `Retry-After: <retry_after>`, counted in
+`server.throttled`.
+
+To mimic a flaky website, a random `error_rate` of the answers are
+`503 Service Unavailable` (counted in `server.errors`), and a random
+`stall_rate` of them are held back for `stall` seconds first, long enough
+for the client to time out (counted in `server.stalls`). `seed` makes the
+faults the same from run to run.
+"""
+
+import contextlib # module for building context managers
+import hashlib # module for creating fingerprints (hashes) of data
+import mimetypes # module for guessing file types from their names
+
+import os # module for navigating your machine (e.g., file directories)
+import pathlib # module for working with file paths
+import random # module for generating random numbers
+import socket # module for low-level network connections
+import ssl # module for encrypted (https) connections
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+import threading # module for running code in parallel threads
+import time # module for working with time
+from email.utils import formatdate, parsedate_to_datetime # modules for http dates
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # modules for serving web pages
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server.owner
+        server.record(self.path)
+        if server.throttle():
+            self.send_response(429)
+            self.send_header("Retry-After", str(server.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        fault = server.fault()
+        if fault == "error":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if fault == "stall":
+            time.sleep(server.stall)
+        with server.busy() as active:
+            if server.latency:
+                # beyond its capacity the server slows down, as requests queue for its workers
+                time.sleep(server.latency * max(1.0, active / server.capacity) if server.capacity else server.latency)
+            self._answer(server)
+
+    def _answer(self, server):
+        body = server.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if isinstance(body, pathlib.Path):
+            size = body.stat().st_size
+            etag = '"{}"'.format(hashlib.sha1("{}-{}".format(size, body.stat().st_mtime).encode("utf-8")).hexdigest()[:16])
+            content_type = mimetypes.guess_type(body.name)[0] or "application/octet-stream"
+        else:
+            size = len(body)
+            etag = '"{}"'.format(hashlib.sha1(body).hexdigest()[:16])
+            content_type = "text/html; charset=utf-8"
+        modified = server.modified[self.path]
+        if self._not_modified(etag, modified):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        first, last = 0, size - 1
+        wanted = self._range(size) if server.ranges else None
+        if wanted is not None:
+            first, last = wanted
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(first, last, size))
+        else:
+            self.send_response(200)
+        length = last + 1 - first
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(modified, usegmt=True))
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if isinstance(body, pathlib.Path):
+            with open(body, "rb") as f:
+                f.seek(first)
+                self._send(f.read, length)
+        else:
+            view = memoryview(body)[first:last + 1]
+            position = [0]
+
+            def read(n):
+                chunk = view[position[0]:position[0] + n]
+                position[0] += len(chunk)
+                return chunk
+            self._send(read, length)
+        server.sent(length)
+
+    def _send(self, read, length):
+        # write `length` bytes from `read`, no faster than the server's bandwidth allows
+        bandwidth = self.server.owner.bandwidth
+        chunk_size = min(64 * 1024, bandwidth) if bandwidth else 1024 * 1024
+        start = time.perf_counter()
+        sent = 0
+        while sent < length:
+            chunk = read(min(chunk_size, length - sent))
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if bandwidth:
+                ahead = sent / bandwidth - (time.perf_counter() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def _range(self, size):
+        # (first, last) for a single "bytes=first-last" range within the body, otherwise None
+        value = self.headers.get("Range", "")
+        if not value.startswith("bytes=") or "," in value:
+            return None
+        first, _, last = value[len("bytes="):].partition("-")
+        if not first.isdigit() or int(first) >= size:
+            return None
+        return int(first), min(int(last), size - 1) if last.isdigit() else size - 1
+
+    def _not_modified(self, etag, modified):
+        if "If-None-Match" in self.headers:
+            return self.headers["If-None-Match"] == etag
+        if "If-Modified-Since" in self.headers:
+            try:
+                return int(modified) <= parsedate_to_datetime(self.headers["If-Modified-Since"]).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format, *args):
+        pass # keep benchmark output readable
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            super().handle_error(request, client_address) # clients hanging up mid-download are expected
+
+    def get_request(self):
+        request, address = super().get_request()
+        request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # send headers and body without waiting for an ACK
+        self.owner.connected()
+        if self.owner.tls_context is not None:
+            # the handshake happens on first read, in the thread serving the request
+            request = self.owner.tls_context.wrap_socket(request, server_side=True, do_handshake_on_connect=False)
+        return request, address
+
+
+def _self_signed_certificate(folder):
+    """Create a certificate for 127.0.0.1 with openssl; returns (certfile, keyfile)."""
+    certfile = os.path.join(folder, "cert.pem")
+    keyfile = os.path.join(folder, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", keyfile, "-out", certfile],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
+
+
+class LocalServer:
+    """Serves `pages` from a background thread on a free local port."""
+
+    def __init__(self, pages, latency=0.0, tls=False, ranges=True, bandwidth=None, capacity=None, rate_limit=None, retry_after=1,
+                 error_rate=0.0, stall_rate=0.0, stall=2.0, seed=None):
+        self.pages = {}
+        self.modified = {}
+        for path, body in pages.items():
+            self.set_page(path, body)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.tls = tls
+        self.ranges = ranges
+        self.tls_context = None
+        self.cafile = None
+        self.requests = [] # paths requested, in order of arrival
+        self.connections = 0
+        self.bytes_sent = 0 # page bodies only, not headers
+        self.capacity = capacity
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.throttled = 0
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.errors = 0
+        self.stalls = 0
+        self._random = random.Random(seed)
+        self.active = 0
+        self._allowance = float(rate_limit or 0)
+        self._allowance_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._tempdir = None
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return "{}://{}:{}".format("https" if self.tls else "http", host, port)
+
+    def set_page(self, path, body):
+        self.pages[path] = body.encode("utf-8") if isinstance(body, str) else body # bytes or a pathlib.Path
+        self.modified[path] = time.time()
+
+    def record(self, path):
+        with self._lock:
+            self.requests.append(path)
+
+    def throttle(self):
+        """True if this request is over the rate limit (a token bucket refilled at `rate_limit` per second)."""
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate_limit, self._allowance + (now - self._allowance_at) * self.rate_limit)
+            self._allowance_at = now
+            if self._allowance < 1:
+                self.throttled += 1
+                return True
+            self._allowance -= 1
+            return False
+
+    def fault(self):
+        """"error", "stall" or None: whether to fail this request on purpose."""
+        if not (self.error_rate or self.stall_rate):
+            return None
+        with self._lock:
+            draw = self._random.random()
+            if draw < self.error_rate:
+                self.errors += 1
+                return "error"
+            if draw < self.error_rate + self.stall_rate:
+                self.stalls += 1
+                return "stall"
+            return None
+
+    @contextlib.contextmanager
+    def busy(self):
+        with self._lock:
+            self.active += 1
+            active = self.active
+        try:
+            yield active
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def sent(self, size):
+        with self._lock:
+            self.bytes_sent += size
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def start(self):
+        if self.tls:
+            self._tempdir = tempfile.TemporaryDirectory()
+            self.cafile, keyfile = _self_signed_certificate(self._tempdir.name)
+            self.tls_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.tls_context.load_cert_chain(self.cafile, keyfile)
+        self._httpd = _Server(("127.0.0.1", 0), _Handler)
+        self._httpd.owner = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,220 @@
+"""Run every scraping scenario against a local stand-in of the real websites and save the results as JSON.
+
+The examples request httpbin.org, www.marysmeals.org, www.edinburgh.gov.uk
+and the Charity Commission's file store, so timing them measures the
+internet as much as the code. This suite serves synthetic copies of those
+pages (see `benchmarks.fixtures.offline_sites`) from one `LocalServer`, at
+the paths they have on the real websites, with a chosen latency, bandwidth
+and error rate, and runs the scenarios:
+
+* "pages" - Example 1: request and read httpbin.org/html and the Mary's
+  Meals page (with `MARYS_MEALS_SPEC`), one after another;
+* "index_crawl" - the 26 A-Z index pages of a directory, with
+  `client.fetch_all` and `parse_index`;
+* "detail_crawl" - every record page of the directory, with `crawl` and
+  `parse_record`;
+* "large_download" - the register zip, with `download_file`;
+* "register_parsing" - counting the rows of the register zip with
+  `RegisterReader`.
+
+Each scenario runs `--repeat` times. The results (the best and median time
+of each scenario, its throughput and its counts) are written to `--output`
+along with the settings, the git commit and the machine, so that runs can be
+compared over time; `--compare` reports each scenario against an earlier
+results file and exits with status 1 if any is more than `--tolerance`
+slower.
+
+    python -m benchmarks.suite [--scenarios pages index_crawl] [--latency 0.02] [--bandwidth 20000000]
+                               [--error-rate 0.05] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse # module for reading command line options
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import platform # module for describing the machine
+import statistics # module for averages
+import subprocess # module for running other programs
+import sys # module for interacting with the Python interpreter
+import tempfile # module for creating temporary files and folders
+import time # module for working with time
+from datetime import datetime as dt # module for working with dates and time
+
+from scrapetools import (
+    FailureLedger, RegisterReader, RetryPolicy, ScrapeClient, compile_spec, crawl, download_file, parse_index,
+    parse_record,
+)
+from scrapetools.spec import MARYS_MEALS_SPEC
+
+from .fixtures import REGISTER_ZIP, offline_sites
+from .localserver import LocalServer
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the `code` folder
+
+
+def scenario_pages(server, client, folder, args):
+    marys_meals = compile_spec(MARYS_MEALS_SPEC)
+    pages = 0
+    paragraphs = 0
+    for _ in range(args.page_repeats):
+        response = client.get(server.url + "/html")
+        pages += response.status_code==200
+        response = client.get(server.url + "/what-we-do/our-impact")
+        if response.status_code==200:
+            pages += 1
+            paragraphs += len(marys_meals.extract(response.text)["paragraphs"])
+    return {"pages": pages, "paragraphs": paragraphs}
+
+
+def scenario_index_crawl(server, client, folder, args):
+    urls = [server.url + "/directory/10199/a-to-z/" + letter for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"]
+    organisations = 0
+    pages = 0
+    for response in client.fetch_all(urls, per_host=4):
+        if response is not None and response.status_code==200: # None: the request failed even after retries
+            pages += 1
+            organisations += len(parse_index(response.text))
+    return {"pages": pages, "organisations": organisations}
+
+
+def scenario_detail_crawl(server, client, folder, args):
+    urls = [server.url + path for path in server.pages if path.startswith("/directory_record/")]
+    with FailureLedger(os.path.join(folder, "detail-crawl-failures.jsonl")) as ledger:
+        results = crawl(urls, parse_record, get=client.get, parse_workers=args.parse_workers, failures=ledger)
+    return {"pages": sum(page.data is not None for page in results), "failures": len(ledger)}
+
+
+def scenario_large_download(server, client, folder, args):
+    outfile = os.path.join(folder, "publicextract.charity.zip")
+    download_file(server.url + REGISTER_ZIP, outfile, get=client.get, progress=None)
+    size = os.path.getsize(outfile)
+    os.remove(outfile)
+    return {"bytes": size, "megabytes": size / 1e6}
+
+
+def scenario_register_parsing(server, client, folder, args):
+    register = RegisterReader(str(server.pages[REGISTER_ZIP]), chunksize=100_000)
+    rows = sum(len(chunk) for chunk in register)
+    return {"rows": rows, "bad_lines": register.bad_lines}
+
+
+SCENARIOS = {
+    "pages": (scenario_pages, "pages"),
+    "index_crawl": (scenario_index_crawl, "pages"),
+    "detail_crawl": (scenario_detail_crawl, "pages"),
+    "large_download": (scenario_large_download, "megabytes"),
+    "register_parsing": (scenario_register_parsing, "rows"),
+} # name: (function, the count its throughput is measured in)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CODE, check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(name, server, folder, args):
+    function, unit = SCENARIOS[name]
+    times = []
+    counts = None
+    requests = 0
+    for _ in range(args.repeat):
+        before = len(server.requests)
+        with ScrapeClient(retry=RetryPolicy(backoff=0.05), timeout=args.timeout) as client:
+            start = time.perf_counter()
+            counts = function(server, client, folder, args)
+            times.append(time.perf_counter() - start)
+        requests = len(server.requests) - before
+    best = min(times)
+    return dict(
+        counts,
+        seconds=times,
+        best=best,
+        median=statistics.median(times),
+        throughput=counts[unit] / best,
+        throughput_unit="{} per second".format(unit),
+        requests=requests,
+    )
+
+
+def compare(results, baseline_path, tolerance):
+    """Print each scenario's best time against the same scenario in `baseline_path`; returns the names that got slower."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    slower = []
+    print("\ncompared with {} (commit {}):".format(baseline_path, baseline.get("git_commit")))
+    changed = sorted(
+        key for key, value in results["settings"].items()
+        if key not in ("scenarios", "repeat", "tolerance") and baseline.get("settings", {}).get(key, value) != value
+    )
+    if changed:
+        print("  note: the baseline was run with different {}".format(", ".join(changed)))
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print("  {:<17} (not in baseline)".format(name))
+            continue
+        change = result["best"] / before["best"] - 1
+        flag = "SLOWER" if change > tolerance else ""
+        if flag:
+            slower.append(name)
+        print("  {:<17} {:8.3f}s -> {:8.3f}s  {:+6.1%}  {}".format(name, before["best"], result["best"], change, flag))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS), help="scenarios to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each scenario")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the server waits before answering")
+    parser.add_argument("--bandwidth", type=int, default=None, help="bytes per second per connection (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds the client waits for an answer")
+    parser.add_argument("--per-letter", type=int, default=10, help="records listed under each letter of the directory")
+    parser.add_argument("--register-rows", type=int, default=500_000, help="rows in the register zip (500,000 make a zip of about 200 MB)")
+    parser.add_argument("--page-repeats", type=int, default=20, help="times the Example 1 pages are requested per run")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parsing processes for the detail crawl (0: in-process)")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "scrapetools-fixtures"), help="folder to keep the register zip in between runs")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the server's random errors")
+    parser.add_argument("--output", default="suite-results.json", help="where to write the results")
+    parser.add_argument("--compare", default=None, help="an earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="how much slower than the baseline counts as a regression")
+    args = parser.parse_args()
+
+    os.makedirs(args.fixtures, exist_ok=True)
+    print("building fixtures in {} ...".format(args.fixtures))
+    pages = offline_sites(args.fixtures, per_letter=args.per_letter, register_rows=args.register_rows)
+    print("register zip: {:.0f} MB".format(pages[REGISTER_ZIP].stat().st_size / 1e6))
+
+    results = {
+        "suite": "scrapetools",
+        "created": dt.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "fixtures")},
+        "scenarios": {},
+    }
+    with LocalServer(pages, latency=args.latency, bandwidth=args.bandwidth, error_rate=args.error_rate, seed=args.seed) as server, \
+            tempfile.TemporaryDirectory() as folder:
+        for name in args.scenarios:
+            result = run_scenario(name, server, folder, args)
+            results["scenarios"][name] = result
+            print("{:<17} best {:8.3f}s  median {:8.3f}s  {:10.1f} {}  {:5d} requests".format(
+                name, result["best"], result["median"], result["throughput"], result["throughput_unit"], result["requests"]))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print("results written to {}".format(args.output))
+
+    if args.compare:
+        if compare(results, args.compare, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
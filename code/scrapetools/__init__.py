@@ -0,0 +1,77 @@
+"""Reusable helpers for the web scraping examples.
+
+Import these from a notebook or script that lives in the `code` folder, e.g.:
+
+    from scrapetools import ScrapeClient
+
+    client = ScrapeClient()
+    responses = client.fetch_all(urls)
+"""
+
+from .archive import ArchivedPage, PageArchive
+from .batch import reextract
+from .cache import HTTPCache
+from .cassette import Cassette, NotRecorded
+from .client import DEFAULT_HEADERS, ScrapeClient
+from .dedupe import ContentStore
+from .directory import DirectoryCrawler
+from .download import Download, download_file, download_ranged, file_checksum, save_stream
+from .episodes import EpisodeCrawler
+from .extract import parse_index, parse_record
+from .fetch import HostLimiter, fetch_all
+from .frontier import Frontier, crawl_frontier
+from .parsers import PARSERS, get_parser
+from .pipeline import PageResult, crawl, iter_crawl
+from .ratelimit import RateLimiter
+from .register import REGISTER_DTYPES, RegisterReader, compact_register, convert_register, load_register
+from .retry import FailureLedger, RetryPolicy
+from .sink import JSONLinesWriter, finalize_jsonl, read_jsonl
+from .spec import ElementIndex, Extractor, compile_selector, compile_spec, index_page
+from .timings import Timings
+
+__all__ = [
+    "ArchivedPage",
+    "Cassette",
+    "ContentStore",
+    "DEFAULT_HEADERS",
+    "DirectoryCrawler",
+    "ElementIndex",
+    "Download",
+    "EpisodeCrawler",
+    "Extractor",
+    "FailureLedger",
+    "Frontier",
+    "HTTPCache",
+    "HostLimiter",
+    "JSONLinesWriter",
+    "NotRecorded",
+    "PARSERS",
+    "PageArchive",
+    "PageResult",
+    "REGISTER_DTYPES",
+    "RateLimiter",
+    "RegisterReader",
+    "RetryPolicy",
+    "ScrapeClient",
+    "Timings",
+    "compact_register",
+    "compile_selector",
+    "compile_spec",
+    "convert_register",
+    "crawl",
+    "crawl_frontier",
+    "download_file",
+    "download_ranged",
+    "fetch_all",
+    "file_checksum",
+    "finalize_jsonl",
+    "get_parser",
+    "index_page",
+    "iter_crawl",
+    "load_register",
+    "parse_index",
+    "parse_record",
+    "read_jsonl",
+    "reextract",
+    "save_stream",
+]
@@ -0,0 +1,6 @@
+"""`python -m scrapetools`: run an extraction function again over stored pages; see `scrapetools.batch`."""
+
+from .batch import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Keep the raw pages of every crawl, to extract new fields later without crawling again.
+
+Example 2 keeps only `org_details`: the HTML of each page is thrown away, so
+taking one more field from the record pages means requesting them all again,
+and last month's pages are gone for good. A `PageArchive` keeps every page a
+`ScrapeClient` fetches, compressed, in one folder:
+
+    archive = PageArchive(la_data + "pages/")
+    client = ScrapeClient(archive=archive)
+    ...
+    client.close() # also closes the archive
+
+and hands them back later, day by day, with no network:
+
+    archive = PageArchive(la_data + "pages/", readonly=True)
+    for page, html in archive.pages(day="2024-06-05"):
+        details = parse_record(html)
+
+The folder holds
+
+* `pages.pack` - the bodies, each compressed on its own (zstd if the
+  `zstandard` module is installed, otherwise zlib) and appended to the end of
+  the file. A body is stored once however many times it is fetched, so a
+  page that does not change from day to day costs nothing after the first.
+* `pages.jsonl` - the index: one line per fetch, with the url, time, status
+  code, encoding, the SHA-256 of the body and where its compressed copy
+  starts in the pack and how long it is.
+* `archive.json` - the compression used.
+
+Reading maps the pack into memory (`mmap`) and decompresses only the page
+asked for, so the archive can be far larger than memory, and several
+processes can read it at once (given where each body is, from `locate`, a
+process can open it with `index=False` and skip reading the index). If a run stops halfway through a write, the
+unfinished end of the pack is ignored when the archive is next opened.
+(Unlike a `Cassette`, which replays the latest copy of each page, the
+archive keeps every day's copy.)
+"""
+
+import hashlib # module for creating fingerprints (hashes) of data
+import json # module for working with JSON data structures
+import mmap # module for reading files through memory
+import os # module for navigating your machine (e.g., file directories)
+import threading # module for running code in parallel threads
+import zlib # module for compressing/decompressing data
+from collections import namedtuple # module for lightweight record types
+from datetime import datetime as dt, timezone # modules for working with dates and time
+
+from .sink import JSONLinesWriter, read_jsonl
+
+CODECS = ("zstd", "zlib")
+
+ArchivedPage = namedtuple("ArchivedPage", ["url", "fetched", "status_code", "digest", "size", "encoding", "content_type"])
+ArchivedPage.__doc__ = """One fetch of a page: `fetched` is an ISO time (UTC), `digest` the SHA-256 of its body and `size` the body's length."""
+
+
+def _zstandard():
+    try:
+        import zstandard # module for zstd compression
+    except ImportError:
+        raise ImportError("a zstd-compressed PageArchive needs zstandard: pip install zstandard") from None
+    return zstandard
+
+
+def default_codec():
+    """"zstd" if the `zstandard` module is installed, otherwise "zlib"."""
+    try:
+        _zstandard()
+    except ImportError:
+        return "zlib"
+    return "zstd"
+
+
+class PageArchive:
+    """Every fetched body, compressed once per content into an append-only pack in `folder`, with an index of fetches."""
+
+    def __init__(self, folder, codec=None, level=None, readonly=False, index=True):
+        if not (index or readonly):
+            raise ValueError("an archive can only be opened without its index with readonly=True")
+        self.folder = folder
+        self.readonly = readonly
+        self._pack_path = os.path.join(folder, "pages.pack")
+        self._index_path = os.path.join(folder, "pages.jsonl")
+        settings_path = os.path.join(folder, "archive.json")
+        if not readonly:
+            os.makedirs(folder, exist_ok=True)
+
+        if os.path.exists(settings_path):
+            with open(settings_path, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+            if codec is not None and codec != settings["codec"]:
+                raise ValueError("the archive in {} is compressed with {}, not {}".format(folder, settings["codec"], codec))
+        elif readonly:
+            raise FileNotFoundError("no page archive in {}".format(folder))
+        else:
+            settings = {"codec": codec or default_codec(), "level": level}
+            if settings["codec"] not in CODECS:
+                raise ValueError("codec must be one of {}, not {!r}".format(", ".join(CODECS), settings["codec"]))
+            with open(settings_path, "w", encoding="utf-8") as f:
+                json.dump(settings, f)
+        self.codec = settings["codec"]
+        self.level = settings["level"] if level is None else level
+        if self.codec == "zstd":
+            _zstandard() # fail now, not at the first page
+
+        self._lock = threading.Lock()
+        self._local = threading.local() # each thread's compressor and decompressor
+        self._pages = []
+        self._bodies = {} # digest: (offset, length)
+        size = os.path.getsize(self._pack_path) if os.path.exists(self._pack_path) else 0
+        end = 0
+        if index and os.path.exists(self._index_path):
+            shared = {}.setdefault # one copy of each url, time, digest, etc., however many fetches share it
+            for entry in read_jsonl(self._index_path):
+                offset, length = entry["offset"], entry["length"]
+                if offset + length > size:
+                    continue # written to the index, but the body never reached the pack
+                digest = shared(entry["digest"], entry["digest"])
+                self._bodies.setdefault(digest, (offset, length))
+                self._pages.append(ArchivedPage(
+                    shared(entry["url"], entry["url"]), shared(entry["fetched"], entry["fetched"]), entry["status_code"], digest,
+                    entry["size"], shared(entry["encoding"], entry["encoding"]), shared(entry["content_type"], entry["content_type"]),
+                ))
+                end = max(end, offset + length)
+
+        self._pack = None
+        self._writer = None
+        if not readonly:
+            with open(self._pack_path, "ab") as f:
+                f.truncate(end) # drop a body left half-written by a crash
+            self._pack = open(self._pack_path, "ab")
+            self._writer = JSONLinesWriter(self._index_path)
+        self._end = end
+        self._map = None
+        self._map_file = None
+
+    def _compress(self, body):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            if self.codec == "zstd":
+                compressor = _zstandard().ZstdCompressor(level=self.level or 3).compress
+            else:
+                level = self.level or 6
+                compressor = lambda data: zlib.compress(data, level)
+            self._local.compressor = compressor
+        return compressor(body)
+
+    def _decompress(self, frame):
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = _zstandard().ZstdDecompressor().decompress if self.codec == "zstd" else zlib.decompress
+            self._local.decompressor = decompressor
+        return decompressor(frame)
+
+    def add(self, url, body, status_code=200, fetched=None, encoding=None, content_type=None):
+        """Archive one fetch of `url` (its `body` as bytes or text); returns the SHA-256 of the body."""
+        if self.readonly:
+            raise ValueError("the archive was opened with readonly=True")
+        if isinstance(body, str):
+            body, encoding = body.encode(encoding or "utf-8"), encoding or "utf-8"
+        digest = hashlib.sha256(body).hexdigest()
+        fetched = fetched or dt.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            known = digest in self._bodies
+        frame = None if known else self._compress(body) # outside the lock, so threads compress at the same time
+        with self._lock:
+            if digest not in self._bodies:
+                self._pack.write(frame)
+                self._bodies[digest] = (self._end, len(frame))
+                self._end += len(frame)
+            offset, length = self._bodies[digest]
+            page = ArchivedPage(url, fetched, status_code, digest, len(body), encoding, content_type)
+            self._pages.append(page)
+            self._writer.write(dict(page._asdict(), offset=offset, length=length))
+        return digest
+
+    def add_response(self, url, response):
+        """Archive the body of a `requests` response to `url`."""
+        return self.add(url, response.content, response.status_code, encoding=response.encoding, content_type=response.headers.get("Content-Type"))
+
+    def read(self, digest):
+        """The body (bytes) with SHA-256 `digest`."""
+        return self.read_at(*self._bodies[digest])
+
+    def locate(self, digest):
+        """(offset, length) of the compressed body with SHA-256 `digest` in the pack."""
+        return self._bodies[digest]
+
+    def read_at(self, offset, length):
+        """The body stored at `offset` in the pack (see `locate`); works without the index."""
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                self._remap()
+            frame = self._map[offset:offset + length]
+        return self._decompress(frame)
+
+    def _remap(self):
+        # map the pack again, now that it has grown (with the lock held)
+        if self._pack is not None:
+            self._pack.flush()
+        if self._map is not None:
+            self._map.close()
+            self._map_file.close()
+        self._map_file = open(self._pack_path, "rb")
+        self._map = mmap.mmap(self._map_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def text(self, page):
+        """The body of an `ArchivedPage` as text."""
+        return self.read(page.digest).decode(page.encoding or "utf-8", "replace")
+
+    def entries(self, day=None, url=None):
+        """The `ArchivedPage`s, oldest first: those fetched on `day` ("YYYY-MM-DD") and/or of `url`, if given."""
+        with self._lock:
+            pages = list(self._pages)
+        return [page for page in pages if (day is None or page.fetched[:10] == day) and (url is None or page.url == url)]
+
+    def days(self):
+        """The days (as "YYYY-MM-DD") on which pages were archived."""
+        with self._lock:
+            return sorted({page.fetched[:10] for page in self._pages})
+
+    def get(self, url, day=None):
+        """The text of the latest copy of `url` (fetched on `day`, if given), or None."""
+        pages = self.entries(day=day, url=url)
+        return self.text(pages[-1]) if pages else None
+
+    def pages(self, day=None):
+        """Yield (`ArchivedPage`, text) for every fetch (on `day`, if given), reading one page at a time."""
+        for page in self.entries(day=day):
+            yield page, self.text(page)
+
+    def stats(self):
+        """Counts of fetches and distinct bodies, and their size before and after compression."""
+        with self._lock:
+            pages = list(self._pages)
+            stored = {page.digest: page.size for page in pages}
+            return {
+                "codec": self.codec,
+                "fetches": len(pages),
+                "bodies": len(self._bodies),
+                "fetched_bytes": sum(page.size for page in pages),
+                "body_bytes": sum(stored.values()),
+                "pack_bytes": self._end,
+            }
+
+    def flush(self):
+        with self._lock:
+            if self._pack is not None:
+                self._pack.flush() # the bodies reach the disk before the index lines that point at them
+                self._writer.flush()
+
+    def close(self):
+        with self._lock:
+            if self._pack is not None:
+                self._pack.close()
+                self._writer.close()
+                self._pack = None
+            if self._map is not None:
+                self._map.close()
+                self._map_file.close()
+                self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,287 @@
+"""Run an extraction function again over stored pages, on every core.
+
+A change to the way Example 2 pairs the `<dt>`/`<dd>` headings and values of
+a record page, or to the way Example 1 reads the Mary's Meals paragraphs,
+can otherwise only be tried by requesting every page again. `reextract`
+runs the new extraction over pages already on disk instead: a `PageArchive`
+(see `scrapetools.archive`) or a folder of `.html` files.
+
+    report = reextract(la_data + "pages/", parse_record, la_data + "coe-records-again.jsonl", match="/directory_record/", latest=True)
+    report["pages_per_second"], report["workers"]
+
+The pages are handed to a pool of `workers` processes (default: one per
+core) in chunks of `chunk_size`. Only the address of each page passes
+between processes: each worker opens the archive for itself (read-only,
+through `mmap`, without reading its index) or reads the files itself, and builds its own parser once,
+so the workers share nothing and the run speeds up with every core added.
+The main process writes each record to `output` as its chunk comes back:
+a JSON Lines file for a `.jsonl` path, a Parquet file for a `.parquet` path
+(needs the optional `pyarrow` module). Records are
+{"url": ..., "fetched": ..., "data": ...}, with `data` as returned by
+`parse`; in Parquet each key of `data` becomes a column. The report gives
+the pages read per second by each worker as well as overall.
+
+From the command line (`python -m scrapetools`, run from the `code`
+folder), the extraction is given as `module:function` or as the name of a
+spec in `scrapetools.spec`:
+
+    python -m scrapetools ../data/pages/ records.jsonl --parse scrapetools.extract:parse_record --match /directory_record/
+    python -m scrapetools ./pages/ paragraphs.parquet --spec MARYS_MEALS_SPEC --parser lxml
+"""
+
+import argparse # module for reading command line options
+import importlib # module for importing a module by name
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import re # module for searching text with patterns
+import time # module for working with time
+from datetime import datetime as dt, timezone # modules for working with dates and time
+from functools import partial # module for fixing some arguments of a function
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait # modules for managing a pool of processes
+
+from .archive import PageArchive
+from .parsers import get_parser
+from .sink import read_jsonl
+
+HTML_SUFFIXES = (".html", ".htm")
+
+_worker = None # the Worker of this process, set up by _start_worker
+
+
+def is_archive(source):
+    """True if the folder `source` holds a `PageArchive`."""
+    return os.path.exists(os.path.join(source, "archive.json"))
+
+
+def stored_pages(source, day=None, match=None, latest=False):
+    """The pages in `source` to extract from, as (url, fetched, key, encoding).
+
+    For a `PageArchive`, these are its successful fetches (on `day`, if
+    given), and with `latest=True` only the newest fetch of each url; `key`
+    is where the body is in the pack, (offset, length). For a folder, these are its `.html` files,
+    with the path inside the folder as the url and the time the file was
+    last changed as `fetched`. `match` is a pattern the url must contain
+    (a regular expression).
+    """
+    pattern = re.compile(match) if match is not None else None
+    if is_archive(source):
+        with PageArchive(source, readonly=True) as archive:
+            entries = [page for page in archive.entries(day=day) if page.status_code==200]
+            if latest:
+                entries = list({page.url: page for page in entries}.values())
+            return [
+                (page.url, page.fetched, archive.locate(page.digest), page.encoding) for page in entries
+                if pattern is None or pattern.search(page.url)
+            ]
+    if day is not None or latest:
+        raise ValueError("day and latest only apply to a PageArchive, and {} is a folder of files".format(source))
+    pages = []
+    for folder, subfolders, files in os.walk(source):
+        subfolders.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(HTML_SUFFIXES):
+                continue
+            path = os.path.join(folder, name)
+            url = os.path.relpath(path, source).replace(os.sep, "/")
+            if pattern is None or pattern.search(url):
+                fetched = dt.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat(timespec="seconds")
+                pages.append((url, fetched, path, None))
+    return pages
+
+
+class Worker:
+    """Reads and parses chunks of stored pages in one process, with its own archive reader and parser."""
+
+    def __init__(self, source, parse, parser=None):
+        self.archive = PageArchive(source, readonly=True, index=False) if is_archive(source) else None # the pages come with their place in the pack
+        get_parser(parser) # build this process's parser now, not on the first page
+        self.parse = partial(parse, parser=parser) if parser is not None else parse
+        self.pid = os.getpid()
+
+    def text(self, key, encoding):
+        if self.archive is not None:
+            return self.archive.read_at(*key).decode(encoding or "utf-8", "replace")
+        with open(key, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def run(self, chunk):
+        """The records of the pages in `chunk` as JSON lines, [(url, error)] for pages that failed, and (pid, pages, seconds).
+
+        The records are turned into text here, in the worker, so the main
+        process only has to append them to the output file.
+        """
+        start = time.perf_counter()
+        lines = []
+        errors = []
+        for url, fetched, key, encoding in chunk:
+            try:
+                data = self.parse(self.text(key, encoding))
+            except Exception as error:
+                errors.append((url, error))
+                continue
+            lines.append(json.dumps({"url": url, "fetched": fetched, "data": data}, ensure_ascii=False) + "\n")
+        return "".join(lines), errors, (self.pid, len(chunk), time.perf_counter() - start)
+
+
+def _start_worker(source, parse, parser):
+    global _worker
+    _worker = Worker(source, parse, parser)
+
+
+def _run_chunk(chunk):
+    return _worker.run(chunk)
+
+
+def reextract(source, parse, output, workers=None, parser=None, day=None, match=None, latest=False, chunk_size=64, failures=None):
+    """Run `parse` over every page stored in `source` and write the records to `output`.
+
+    `source` is a `PageArchive` folder or a folder of `.html` files, and `day`,
+    `match` and `latest` choose the pages as for `stored_pages`. `parse`
+    takes the text of a page, as for `crawl` (it must be importable, e.g.
+    `parse_record` or `compile_spec(spec).extract`), and `parser` is passed
+    on to it if given. `workers` is the number of processes (default: one
+    per core; 0 to parse in this process). An existing `output` is replaced.
+    `failures` is a `FailureLedger` to record pages that cannot be parsed in,
+    rather than stopping.
+
+    Returns a report: pages read, records written, errors, seconds, pages
+    per second, and {pid: {"pages", "seconds", "pages_per_second"}} for each
+    worker.
+    """
+    pages = stored_pages(source, day=day, match=match, latest=latest)
+    chunks = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+    parquet = output.endswith(".parquet")
+    if parquet:
+        _pyarrow() # fail now, not after the run
+    records = output + ".jsonl" if parquet else output
+    for path in (output, records):
+        if os.path.exists(path):
+            os.remove(path)
+
+    report = {"pages": len(pages), "records": 0, "errors": 0, "seconds": 0.0, "pages_per_second": 0.0, "workers": {}}
+    start = time.perf_counter()
+    with open(records, "w", encoding="utf-8") as f:
+        if workers == 0:
+            worker = Worker(source, parse, parser)
+            done = (worker.run(chunk) for chunk in chunks)
+            _write(done, f, report, failures)
+        elif chunks:
+            workers = min(workers or os.cpu_count(), len(chunks))
+            with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(source, parse, parser)) as pool:
+                _write(_pooled(pool, chunks, 2 * workers), f, report, failures)
+    if parquet:
+        jsonl_to_parquet(records, output)
+        os.remove(records)
+    report["seconds"] = time.perf_counter() - start
+    report["pages_per_second"] = report["pages"] / report["seconds"] if report["seconds"] else 0.0
+    for stats in report["workers"].values():
+        stats["pages_per_second"] = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    return report
+
+
+def _pooled(pool, chunks, max_pending):
+    # yields each chunk's results as it finishes, with at most `max_pending` chunks handed out at once
+    chunks = iter(chunks)
+    in_flight = set()
+    for chunk in chunks:
+        if len(in_flight) >= max_pending:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        in_flight.add(pool.submit(_run_chunk, chunk))
+    for future in wait(in_flight).done:
+        yield future.result()
+
+
+def _write(done, f, report, failures):
+    for lines, errors, (pid, pages, seconds) in done:
+        for url, error in errors:
+            if failures is None:
+                raise error
+            failures.record(url, "parse", error=error)
+        f.write(lines)
+        report["records"] += pages - len(errors)
+        report["errors"] += len(errors)
+        stats = report["workers"].setdefault(pid, {"pages": 0, "seconds": 0.0})
+        stats["pages"] += pages
+        stats["seconds"] += seconds
+
+
+def _pyarrow():
+    try:
+        import pyarrow # module for working with columnar (Parquet) data
+        import pyarrow.parquet # noqa: F401
+    except ImportError:
+        raise ImportError("writing Parquet needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _rows(record):
+    # the Parquet rows for one record: one per item if `data` is a list, with each key of a dict as a column
+    items = record["data"] if isinstance(record["data"], list) else [record["data"]]
+    for item in items:
+        row = {"url": record["url"], "fetched": record["fetched"]}
+        if isinstance(item, dict):
+            row.update(item)
+        elif item is not None:
+            row["value"] = item
+        yield {key: value if value is None or isinstance(value, str) else json.dumps(value, ensure_ascii=False) for key, value in row.items()}
+
+
+def jsonl_to_parquet(path, outfile, row_group_size=10_000):
+    """Write the records `reextract` saved in the JSON Lines file `path` to the Parquet file `outfile`.
+
+    Every column is text (values that are not text are written as JSON), and
+    pages without a key have nulls. The file is read twice, once for the
+    columns and once for the rows, so memory use depends on `row_group_size`
+    rather than the number of records. Returns the number of rows.
+    """
+    pa = _pyarrow()
+    columns = {}
+    for record in read_jsonl(path):
+        for row in _rows(record):
+            columns.update(dict.fromkeys(row))
+    schema = pa.schema([(column, pa.string()) for column in columns or ["url", "fetched"]])
+    count = 0
+    with pa.parquet.ParquetWriter(outfile, schema) as writer:
+        batch = []
+        for record in read_jsonl(path):
+            batch.extend(_rows(record))
+            if len(batch) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def _load(args):
+    # the parse function named on the command line
+    if args.spec is not None:
+        from . import spec
+        return spec.compile_spec(getattr(spec, args.spec)).extract
+    module, _, name = args.parse.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m scrapetools", description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="a PageArchive folder, or a folder of .html files")
+    parser.add_argument("output", help="a .jsonl or .parquet file for the records")
+    extraction = parser.add_mutually_exclusive_group(required=True)
+    extraction.add_argument("--parse", help="the extraction function, as module:function (e.g. scrapetools.extract:parse_record)")
+    extraction.add_argument("--spec", help="the name of a spec in scrapetools.spec (e.g. MARYS_MEALS_SPEC)")
+    parser.add_argument("--parser", default=None, help="HTML parser (default: the fastest installed)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core; 0: this process)")
+    parser.add_argument("--day", default=None, help="only pages archived on this day (YYYY-MM-DD)")
+    parser.add_argument("--match", default=None, help="only pages whose url contains this pattern")
+    parser.add_argument("--latest", action="store_true", help="only the newest copy of each archived page")
+    args = parser.parse_args()
+
+    report = reextract(args.source, _load(args), args.output, workers=args.workers, parser=args.parser, day=args.day, match=args.match, latest=args.latest)
+    print("{} pages -> {} records in {} ({} errors): {:.1f}s, {:.0f} pages/s".format(
+        report["pages"], report["records"], args.output, report["errors"], report["seconds"], report["pages_per_second"]))
+    for pid, stats in sorted(report["workers"].items()):
+        print("  worker {:>7}: {:6d} pages, {:.0f} pages/s".format(pid, stats["pages"], stats["pages_per_second"]))
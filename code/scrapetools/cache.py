@@ -0,0 +1,155 @@
+"""A disk-backed HTTP cache for scrapes that are repeated day after day.
+
+Most pages on a council directory do not change from one day to the next.
+When a website sends an `ETag` or `Last-Modified` header with a page, we can
+store the page and ask next time "has this changed since?" by sending
+`If-None-Match` / `If-Modified-Since`. If it has not, the server answers
+`304 Not Modified` with an empty body and we reuse our stored copy.
+
+    cache = HTTPCache("./data/http-cache/", max_bytes=200_000_000)
+    client = ScrapeClient(cache=cache)
+
+The cache keeps at most `max_bytes` of page bodies on disk, dropping the least
+recently used pages first, and counts hits (pages reused after a 304) and
+misses (pages downloaded in full).
+"""
+
+import hashlib # module for creating fingerprints (hashes) of data
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import threading # module for running code in parallel threads
+import time # module for working with time
+
+from requests.models import Response # module representing a requested web page
+from requests.structures import CaseInsensitiveDict # module for dicts of http headers
+
+# Response headers kept with each page, needed to rebuild it from the cache
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+class HTTPCache:
+    """Stores page bodies and their validators (ETag / Last-Modified) by url."""
+
+    def __init__(self, folder, max_bytes=500_000_000, autosave=50):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.autosave = autosave # write the index after this many changes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._changes = 0
+        os.makedirs(folder, exist_ok=True)
+
+        self._index_file = os.path.join(folder, "index.json")
+        try:
+            with open(self._index_file, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except FileNotFoundError:
+            self._index = {}
+        self._bytes = sum(entry["size"] for entry in self._index.values())
+
+    def _body_file(self, url):
+        return os.path.join(self.folder, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".body")
+
+    def validators(self, url):
+        """Return the conditional request headers for `url` (empty if it is not cached)."""
+        with self._lock:
+            entry = self._index.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, url, response):
+        """Keep a copy of a 200 response if it carries a validator; returns True if stored."""
+        with self._lock:
+            self.misses += 1
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        if "ETag" not in headers and "Last-Modified" not in headers:
+            return False # nothing to revalidate with next time
+
+        body = response.content
+        with open(self._body_file(url), "wb") as f:
+            f.write(body)
+        with self._lock:
+            old = self._index.get(url)
+            self._bytes += len(body) - (old["size"] if old else 0)
+            self._index[url] = {"headers": headers, "encoding": response.encoding, "size": len(body), "used": time.time()}
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._changed()
+        return True
+
+    def replay(self, url, not_modified):
+        """Rebuild the stored page for `url` from a 304 response; None if it is gone."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+            entry["used"] = time.time()
+            self._changed()
+        try:
+            with open(self._body_file(url), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = url
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers.update(not_modified.headers) # the server may send fresh validators with a 304
+        response.encoding = entry["encoding"]
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response._content = body
+        response.from_cache = True
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def _evict(self):
+        # drop least recently used pages until the bodies fit in max_bytes (caller holds the lock)
+        for url, entry in sorted(self._index.items(), key=lambda item: item[1]["used"]):
+            if self._bytes <= self.max_bytes:
+                break
+            self._bytes -= entry["size"]
+            del self._index[url]
+            try:
+                os.remove(self._body_file(url))
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+
+    def _changed(self):
+        self._changes += 1
+        if self._changes >= self.autosave:
+            self._save()
+
+    def _save(self):
+        temp = self._index_file + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(temp, self._index_file) # never leave a half-written index behind
+        self._changes = 0
+
+    def save(self):
+        """Write the index to disk; called automatically by `ScrapeClient.close()`."""
+        with self._lock:
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "pages": len(self._index),
+                "bytes": self._bytes,
+            }
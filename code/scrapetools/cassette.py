@@ -0,0 +1,255 @@
+"""Record the responses of a scrape once, then replay them without the network.
+
+While working on the extraction code for the council directories or the
+Desert Island Discs pages, every rerun of a notebook requests hundreds of
+pages again, and waits for each one. A `Cassette` sits between `requests` and
+the network and keeps a copy of every response (status, headers and body):
+
+    cassette = Cassette("./data/cassette/", mode="auto")
+    client = ScrapeClient(cassette=cassette)
+
+The modes are:
+
+* "off" - every request goes to the website; nothing is recorded;
+* "record" - every request goes to the website, and its response is recorded
+  (replacing any earlier copy);
+* "replay" - every request is answered from the cassette, without the
+  network; a request that was never recorded raises `NotRecorded`;
+* "auto" - requests recorded before are replayed, the rest are requested and
+  recorded.
+
+Bodies are stored compressed (gzip) under the SHA-256 of their content, so a
+page that is recorded many times, or served at several addresses, is stored
+once; an index file (`cassette.jsonl`) maps each request (method and url) to
+its status, headers and body. Replayed bodies are kept in memory after their
+first use. `export_warc(path)` writes the recorded responses as a standard
+WARC web archive (`.warc.gz`) for other tools.
+
+Only answers that will be the same next time are recorded: successes and
+redirects (2xx and 3xx) and pages that do not exist (404, 410). A temporary
+error such as a `429 Too Many Requests` or a `503 Service Unavailable` is
+passed back without being recorded, so that the retries of a `RetryPolicy`
+reach the website again rather than replaying the error for good; in "auto"
+mode, such an answer found in an older cassette is requested again.
+
+Two kinds of request are handled specially. Streamed requests
+(`stream=True`, as made by `download_file` for large files) always go to the
+network and are never recorded. When recording, the `If-None-Match` /
+`If-Modified-Since` headers added by an `HTTPCache` are dropped, so that the
+website sends every page in full rather than a `304 Not Modified`.
+
+Outside `ScrapeClient`, `cassette.mount(session)` puts a cassette in front of
+any `requests.Session`.
+"""
+
+import gzip # module for compressing/decompressing files
+import hashlib # module for creating fingerprints (hashes) of data
+import io # module for working with streams of bytes
+import os # module for navigating your machine (e.g., file directories)
+import threading # module for running code in parallel threads
+import uuid # module for creating unique identifiers
+from datetime import datetime as dt, timedelta, timezone # modules for working with dates and time
+
+import requests # module for requesting urls
+from requests.adapters import BaseAdapter, HTTPAdapter # modules for sending requests
+from requests.models import Response # module representing a requested web page
+from requests.structures import CaseInsensitiveDict # module for dicts of http headers
+from requests.utils import get_encoding_from_headers # module for reading the encoding of a page
+
+from .sink import JSONLinesWriter, read_jsonl
+
+MODES = ("off", "record", "replay", "auto")
+
+# headers that describe how the body was sent rather than the body itself; bodies are stored decoded
+_TRANSPORT_HEADERS = ("Connection", "Content-Encoding", "Content-Length", "Keep-Alive", "Transfer-Encoding")
+_CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+GONE_STATUSES = (404, 410) # answers outside 2xx/3xx that are still worth recording
+
+
+def is_recordable(status_code):
+    """True if a response with `status_code` is recorded: 2xx, 3xx or a page that does not exist."""
+    return 200 <= status_code < 400 or status_code in GONE_STATUSES
+
+
+class NotRecorded(requests.RequestException):
+    """A request in "replay" mode that is not in the cassette."""
+
+
+class Cassette:
+    """Recorded responses in `folder`: an index of requests and their bodies, stored once by content."""
+
+    def __init__(self, folder, mode="auto"):
+        if mode not in MODES:
+            raise ValueError("mode must be one of {}, not {!r}".format(", ".join(MODES), mode))
+        self.folder = folder
+        self.mode = mode
+        self.replayed = 0
+        self.recorded = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+        self._bodies = {} # digest: body, for bodies already read
+        os.makedirs(os.path.join(folder, "bodies"), exist_ok=True)
+        self._index_file = os.path.join(folder, "cassette.jsonl")
+        self._index = {}
+        if os.path.exists(self._index_file):
+            for entry in read_jsonl(self._index_file):
+                self._index[entry["key"]] = entry # a later recording of the same request replaces an earlier one
+        self._writer = None
+
+    @staticmethod
+    def key(method, url):
+        return "{} {}".format(method.upper(), url)
+
+    def _body_file(self, digest):
+        return os.path.join(self.folder, "bodies", digest[:2], digest + ".gz")
+
+    def _read_body(self, digest):
+        body = self._bodies.get(digest)
+        if body is None:
+            with gzip.open(self._body_file(digest), "rb") as f:
+                body = f.read()
+            self._bodies[digest] = body
+        return body
+
+    def play(self, request):
+        """The recorded response to `request` (a `requests.PreparedRequest`), or None if there is none."""
+        with self._lock:
+            entry = self._index.get(self.key(request.method, request.url))
+            if entry is None:
+                return None
+            body = self._read_body(entry["body"])
+            self.replayed += 1
+
+        response = Response()
+        response.status_code = entry["status_code"]
+        response.reason = entry["reason"]
+        response.url = entry["url"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers["Content-Length"] = str(len(body))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.request = request
+        response.elapsed = timedelta(0)
+        response._content = body
+        response._content_consumed = True
+        response.from_cassette = True
+        return response
+
+    def record(self, request, response):
+        """Store `response` (whose body is read in full) as the answer to `request`."""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        entry = {
+            "key": self.key(request.method, request.url),
+            "url": response.url,
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items() if name.title() not in _TRANSPORT_HEADERS},
+            "body": digest,
+            "size": len(body),
+            "recorded": dt.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        path = self._body_file(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with gzip.open(path + ".tmp", "wb") as f:
+                    f.write(body)
+                os.replace(path + ".tmp", path) # a body file is either complete or absent
+            if self._writer is None:
+                self._writer = JSONLinesWriter(self._index_file, flush_every=20)
+            self._writer.write(entry)
+            self._index[entry["key"]] = entry
+            self.recorded += 1
+
+    def adapter(self, inner=None):
+        """A transport adapter that answers from the cassette and sends everything else through `inner`."""
+        return CassetteAdapter(self, inner if inner is not None else HTTPAdapter())
+
+    def mount(self, session):
+        """Put the cassette in front of the http and https adapters of a `requests.Session`; returns the session."""
+        for prefix in ("http://", "https://"):
+            session.mount(prefix, self.adapter(session.get_adapter(prefix)))
+        return session
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "replayed": self.replayed,
+                "recorded": self.recorded,
+                "missing": self.missing,
+                "requests": len(self._index),
+                "bodies": len({entry["body"] for entry in self._index.values()}),
+            }
+
+    def export_warc(self, path):
+        """Write every recorded response to `path` as a gzipped WARC file (one gzip member per record); returns the count."""
+        with self._lock:
+            entries = list(self._index.values())
+        with open(path, "wb") as f:
+            for entry in entries:
+                with self._lock:
+                    body = self._read_body(entry["body"])
+                head = "HTTP/1.1 {} {}\r\n".format(entry["status_code"], entry["reason"] or "")
+                head += "".join("{}: {}\r\n".format(name, value) for name, value in entry["headers"].items())
+                head += "Content-Length: {}\r\n\r\n".format(len(body))
+                block = head.encode("iso-8859-1", "replace") + body
+                warc = (
+                    "WARC/1.1\r\n"
+                    "WARC-Type: response\r\n"
+                    "WARC-Record-ID: <urn:uuid:{}>\r\n"
+                    "WARC-Date: {}\r\n"
+                    "WARC-Target-URI: {}\r\n"
+                    "WARC-Payload-Digest: sha256:{}\r\n"
+                    "Content-Type: application/http;msgtype=response\r\n"
+                    "Content-Length: {}\r\n\r\n"
+                ).format(uuid.uuid4(), entry["recorded"].replace("+00:00", "Z"), entry["key"].split(" ", 1)[1], entry["body"], len(block))
+                record = io.BytesIO()
+                with gzip.GzipFile(fileobj=record, mode="wb") as member:
+                    member.write(warc.encode("utf-8") + block + b"\r\n\r\n")
+                f.write(record.getvalue())
+        return len(entries)
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CassetteAdapter(BaseAdapter):
+    """Answers requests from a `Cassette` according to its mode, passing the others to `inner`."""
+
+    def __init__(self, cassette, inner):
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner
+
+    def send(self, request, stream=False, **kwargs):
+        mode = self.cassette.mode
+        if mode == "off" or stream: # large streamed files are never recorded
+            return self.inner.send(request, stream=stream, **kwargs)
+        if mode in ("replay", "auto"):
+            response = self.cassette.play(request)
+            if response is not None and (mode == "replay" or is_recordable(response.status_code)):
+                response.connection = self
+                return response
+            if mode == "replay":
+                with self.cassette._lock:
+                    self.cassette.missing += 1
+                raise NotRecorded("{} {} is not in the cassette at {}".format(request.method, request.url, self.cassette.folder), request=request)
+        for name in _CONDITIONAL_HEADERS:
+            request.headers.pop(name, None) # record the whole page, not a 304
+        response = self.inner.send(request, stream=stream, **kwargs)
+        if is_recordable(response.status_code): # a 429 or 5xx is passed on for the retries, not kept
+            self.cassette.record(request, response)
+        return response
+
+    def close(self):
+        self.inner.close()
@@ -0,0 +1,191 @@
+"""A shared HTTP client for all of the requests made in a scrape.
+
+Calling `requests.get()` opens a brand new connection to the website every
+time: for an https address that means a fresh TCP handshake and TLS
+negotiation before a single byte of the page arrives. A `ScrapeClient` keeps a
+`requests.Session` with a pool of open (keep-alive) connections, so that
+repeat requests to the same website reuse them. It also holds the settings we
+would otherwise repeat on every call: the `user-agent` header, a timeout and a
+retry policy.
+"""
+
+import time # module for working with time
+
+import requests # module for requesting urls
+from requests.adapters import HTTPAdapter # module for configuring connection pools
+from urllib3.util.retry import Retry # module for retrying failed requests
+
+from .fetch import fetch_all
+from .ratelimit import THROTTLE_STATUSES, retry_after_seconds
+from .timings import TimedAdapter
+
+DEFAULT_HEADERS = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36"}
+
+
+class ScrapeClient:
+    """Owns one `requests.Session` that every request in a scrape goes through.
+
+    `pool_connections` is the number of websites to keep connections open to,
+    `pool_maxsize` the number of open connections kept per website (set it to
+    at least the number of threads making requests). `max_retries` covers
+    failed connections and 429/5xx responses, waiting
+    `backoff_factor * 2 ** attempt` seconds between attempts. `verify` is
+    passed to every request (e.g. the path of a certificate bundle).
+
+    With a `cache` (a `scrapetools.HTTPCache`) each request for a page seen
+    before is sent as a conditional GET, and a `304 Not Modified` answer is
+    turned back into the stored page (with `response.from_cache` set to True).
+
+    With a `rate_limiter` (a `scrapetools.RateLimiter`) every request waits
+    for its turn with the limiter, and 429/503 answers are retried by the
+    client (up to `max_retries` times) after the limiter's pause, rather than
+    by the connection pool.
+
+    With a `retry` policy (a `scrapetools.RetryPolicy`) the client retries
+    timeouts, failed connections and transient statuses itself, waiting a
+    random, growing time between attempts, and `max_retries` and
+    `backoff_factor` are not used. Every response (and every exception raised
+    by `get`) then has an `attempts` attribute.
+
+    With `timings` (a `scrapetools.Timings`) every request is timed, split
+    into connecting, the https handshake, waiting and downloading, along with
+    any waits for the rate limiter and between retries.
+
+    With a `cassette` (a `scrapetools.Cassette`) responses are recorded, or
+    replayed without the network, according to the cassette's mode.
+
+    With an `archive` (a `scrapetools.PageArchive`) the body of every page
+    answered with 200 is kept in the archive (streamed downloads are not).
+    """
+
+    def __init__(self, headers=None, pool_connections=10, pool_maxsize=10, max_retries=3, backoff_factor=0.5, timeout=30, verify=True, cache=None, rate_limiter=None, retry=None, timings=None, cassette=None, archive=None):
+        self.timeout = timeout
+        self.verify = verify
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.retry = retry
+        self.timings = timings
+        self.cassette = cassette
+        self.archive = archive
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS if headers is None else headers)
+
+        if retry is not None:
+            retries = Retry(0, read=False) # the retry policy in `get` does all the retrying
+        else:
+            retries = Retry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                # with a rate limiter, 429 and 503 are left to `get` so the limiter hears about them
+                status_forcelist=(500, 502, 504) if rate_limiter is not None else (429, 500, 502, 503, 504),
+                respect_retry_after_header=rate_limiter is None,
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                raise_on_status=False, # hand back the last response rather than raising
+            )
+        adapter = (HTTPAdapter if timings is None else TimedAdapter)(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+        if cassette is not None:
+            adapter = cassette.adapter(adapter)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, **kwargs):
+        """Request `url`, reusing an open connection to its website if there is one."""
+        if self.retry is None:
+            if self.rate_limiter is None:
+                return self._get(url, **kwargs)
+            for attempt in range(self.max_retries + 1):
+                response = self._limited_get(url, **kwargs)
+                if response.status_code not in THROTTLE_STATUSES or attempt == self.max_retries:
+                    return response
+                response.close() # the limiter now pauses this host before the next attempt
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self._limited_get(url, **kwargs)
+            except Exception as error:
+                error.attempts = attempt
+                if not self.retry.retries(attempt, error=error):
+                    raise
+                self._sleep(self.retry.delay(attempt), url)
+                continue
+            response.attempts = attempt
+            if not self.retry.retries(attempt, status_code=response.status_code):
+                return response
+            # a rate limiter already pauses the host for the Retry-After time, so only back off on top of it
+            retry_after = retry_after_seconds(response) if self.rate_limiter is None else None
+            response.close()
+            self._sleep(self.retry.delay(attempt, retry_after), url)
+
+    def _limited_get(self, url, **kwargs):
+        # one request, waiting for the rate limiter's permission and reporting back to it
+        if self.rate_limiter is None:
+            return self._get(url, **kwargs)
+        if self.timings is None:
+            started = self.rate_limiter.acquire(url)
+        else:
+            with self.timings.span("limiter", url):
+                started = self.rate_limiter.acquire(url)
+        try:
+            response = self._get(url, **kwargs)
+        except Exception:
+            self.rate_limiter.release(url, started)
+            raise
+        self.rate_limiter.release(url, started, response.status_code, retry_after_seconds(response))
+        return response
+
+    def _sleep(self, seconds, url):
+        # wait between the attempts of the retry policy
+        if self.timings is None:
+            time.sleep(seconds)
+        else:
+            with self.timings.span("backoff", url):
+                time.sleep(seconds)
+
+    def _get(self, url, **kwargs):
+        if self.timings is None:
+            response = self._request(url, **kwargs)
+        else:
+            with self.timings.fetch(url, stream=kwargs.get("stream", False)) as request:
+                response = request["response"] = self._request(url, **kwargs)
+        if self.archive is not None and response.status_code==200 and not kwargs.get("stream"):
+            self.archive.add_response(url, response)
+        return response
+
+    def _request(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)
+        if self.cache is None or kwargs.get("stream"):
+            return self.session.get(url, **kwargs) # streamed files are written to disk, not cached
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        response = self.session.get(url, headers=dict(headers, **self.cache.validators(url)), **kwargs)
+        if response.status_code==304:
+            cached = self.cache.replay(url, response)
+            if cached is not None:
+                return cached
+            response = self.session.get(url, headers=headers, **kwargs) # stored copy has gone: ask again in full
+        if response.status_code==200:
+            self.cache.store(url, response)
+        return response
+
+    def fetch_all(self, urls, max_workers=8, per_host=4, failures=None):
+        """Request every url in `urls` concurrently; see `scrapetools.fetch_all`."""
+        return fetch_all(urls, max_workers=max_workers, per_host=per_host, get=self.get, failures=failures)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.save()
+        if self.cassette is not None:
+            self.cassette.close() # writes out the rest of its index
+        if self.archive is not None:
+            self.archive.close()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,376 @@
+"""Parse and store each distinct page once, however many web addresses serve it.
+
+The A-Z loops in Example 2 can meet the same record page under several
+letters or directories, or at several addresses, and a daily run parses
+every page again even though most have not changed. A `ContentStore` keeps
+the parsed data of each page under a hash (SHA-256) of its content, in a
+small SQLite database:
+
+    store = ContentStore(la_data + "content.sqlite", strip=True, near_threshold=0.8)
+    for page in iter_crawl(urls, parse_record, get=client.get, dedupe=store):
+        if not page.duplicate: # content not seen before: save it
+            sink.write(page.data)
+    store.close()
+
+Given a store as `dedupe`, `crawl` and `iter_crawl` hash the body of each
+page they download. A page whose content has been parsed before (in this run
+or an earlier one) is not parsed again: its data comes from the store, and
+its `PageResult` has `duplicate=True`. So parse time and storage grow with
+the number of distinct pages rather than the number of web addresses. Data
+is kept separately for each parse function and each version of its code
+(see `parse_kind`), so after `parse_record`, or the spec in
+`scrapetools/spec.py` it reads, is edited its pages are parsed again rather
+than taken from the store. A change `parse_kind` cannot see (e.g. to a
+module the function only uses indirectly) needs a new `version`:
+`ContentStore(path, version=2)`. New entries are written to the database `flush_every` pages at a time
+(and on `close`), so a run that crashes only parses its last few pages again.
+
+With `strip=True` the navigation, header, footer, scripts and styles are
+removed before hashing (see `strip_boilerplate`), so two copies of a record
+that differ only in the menus around it count as the same page.
+
+With `near_threshold`, each distinct page also gets a MinHash signature of
+the three-word phrases in its text (without the boilerplate), and pages
+sharing at least `near_threshold` of their phrases (e.g. the same record
+with one detail changed) are listed by `store.near_duplicates()`. Similar
+signatures are found through `NearDuplicateIndex`, without comparing every
+pair of pages.
+"""
+
+import hashlib # module for creating fingerprints (hashes) of data
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import re # module for searching text with patterns
+import sqlite3 # module for working with SQLite databases
+import sys # module for the running Python interpreter (e.g., loaded modules)
+import sysconfig # module for where Python and installed packages live
+import threading # module for running code in parallel threads
+import time # module for working with time
+import types # module for the types of Python objects (e.g., compiled code)
+from functools import lru_cache, partial # modules for remembering results and fixing some arguments of a function
+
+import numpy as np # module for working with arrays of numbers
+
+# Elements that are the same on every page of a website, or change on every request
+BOILERPLATE_TAGS = ("script", "style", "noscript", "header", "nav", "footer")
+
+_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+_HASHES = 64 # values in a MinHash signature
+_BANDS = 16 # groups of values an index looks signatures up by
+_random = np.random.default_rng(20240605)
+_MULTIPLIERS = _random.integers(1, 2**63, _HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1) # odd, so each is a permutation
+_OFFSETS = _random.integers(0, 2**63, _HASHES, dtype=np.uint64)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    data TEXT,
+    size INTEGER,
+    signature BLOB,
+    first_url TEXT,
+    added REAL,
+    PRIMARY KEY (kind, digest)
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    seen REAL
+);
+CREATE TABLE IF NOT EXISTS near (
+    digest TEXT NOT NULL,
+    other TEXT NOT NULL,
+    similarity REAL,
+    PRIMARY KEY (digest, other)
+);
+"""
+
+
+def strip_boilerplate(html, tags=BOILERPLATE_TAGS):
+    """Return `html` without comments and the elements named in `tags`, with runs of whitespace collapsed."""
+    html = _COMMENT.sub("", html)
+    html = re.sub(r"<({})\b.*?</\1\s*>".format("|".join(tags)), "", html, flags=re.DOTALL | re.IGNORECASE)
+    return _SPACE.sub(" ", html).strip()
+
+
+def content_hash(html, strip=False):
+    """The SHA-256 of a page (as hex), after `strip_boilerplate` if `strip`."""
+    if strip:
+        html = strip_boilerplate(html)
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def minhash(html, shingle=3):
+    """The MinHash signature (64 numbers) of the `shingle`-word phrases in the text of a page."""
+    words = _WORD.findall(_TAG.sub(" ", html).lower())
+    phrases = {" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))}
+    hashes = np.frombuffer(b"".join(hashlib.blake2b(phrase.encode("utf-8"), digest_size=8).digest() for phrase in phrases), dtype=np.uint64)
+    # for each of the 64 hash functions, the smallest hash of any phrase (multiplying wraps around, as intended)
+    return ((hashes[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)).min(axis=0).astype(np.uint32)
+
+
+def similarity(signature, other):
+    """The estimated share of phrases two pages have in common (their Jaccard similarity), from their signatures."""
+    return float(np.mean(signature == other))
+
+
+class NearDuplicateIndex:
+    """MinHash signatures, looked up by similarity.
+
+    Each signature is split into bands of values; pages sharing at least
+    `threshold` of their phrases are very likely to agree on a whole band, so
+    only the signatures that share a band with a page are compared with it.
+    """
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._rows = _HASHES // _BANDS
+        self._bands = [{} for _ in range(_BANDS)]
+        self._signatures = {}
+
+    def _keys(self, signature):
+        return [signature[band * self._rows:(band + 1) * self._rows].tobytes() for band in range(_BANDS)]
+
+    def near(self, signature):
+        """[(key, similarity)] of the signatures at least `threshold` similar to `signature`, most similar first."""
+        candidates = set()
+        for band, key in zip(self._bands, self._keys(signature)):
+            candidates.update(band.get(key, ()))
+        found = [(key, similarity(signature, self._signatures[key])) for key in candidates]
+        return sorted((item for item in found if item[1] >= self.threshold), key=lambda item: -item[1])
+
+    def add(self, key, signature):
+        """Add `signature` under `key`; returns the near ones already in the index, as for `near`."""
+        found = [item for item in self.near(signature) if item[0] != key]
+        if key in self._signatures:
+            return found
+        self._signatures[key] = signature
+        for band, band_key in zip(self._bands, self._keys(signature)):
+            band.setdefault(band_key, []).append(key)
+        return found
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+class ContentStore:
+    """The parsed data of each distinct page, kept once by content hash in SQLite at `path`."""
+
+    def __init__(self, path, strip=False, near_threshold=None, flush_every=100, version=None):
+        self.path = path
+        self.version = version
+        self.strip = strip
+        self.near_threshold = near_threshold
+        self.flush_every = flush_every
+        self.parsed = 0 # pages parsed and stored by this run
+        self.skipped = 0 # pages whose content was already stored
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._unsaved = {} # (kind, digest): data as JSON, for contents not yet written
+        self._contents = []
+        self._urls = []
+        self._near = []
+        self._index = None
+        if near_threshold is not None:
+            self._index = NearDuplicateIndex(near_threshold)
+            for digest, signature in self._db.execute("SELECT digest, signature FROM contents WHERE signature IS NOT NULL"):
+                self._index.add(digest, np.frombuffer(signature, dtype=np.uint32))
+
+    def digest(self, html):
+        return content_hash(html, self.strip)
+
+    def kind(self, parse):
+        """The name the data parsed by `parse` is kept under: its `parse_kind`, and this store's `version` if given."""
+        kind = parse_kind(parse)
+        return kind if self.version is None else "{} v{}".format(kind, self.version)
+
+    def get(self, kind, digest):
+        """(True, data) if content `digest` has been parsed by `kind` before, else (False, None)."""
+        with self._lock:
+            data = self._unsaved.get((kind, digest))
+            if data is None:
+                row = self._db.execute("SELECT data FROM contents WHERE kind=? AND digest=?", (kind, digest)).fetchone()
+                data = row[0] if row is not None else None
+        if data is None:
+            return False, None
+        return True, json.loads(data)
+
+    def seen(self, url, digest):
+        """Record that `url` served content `digest`, which was already stored."""
+        with self._lock:
+            self._urls.append((url, digest, time.time()))
+            self.skipped += 1
+            self._flush_if_due()
+
+    def add(self, kind, url, digest, data, html=None):
+        """Store the `data` parsed by `kind` from content `digest`, first seen at `url`.
+
+        With `near_threshold` and the page's `html`, also take its MinHash
+        signature; returns [(digest, similarity)] of the stored pages it
+        nearly duplicates.
+        """
+        signature = minhash(strip_boilerplate(html)) if self._index is not None and html is not None else None
+        text = json.dumps(data)
+        now = time.time()
+        with self._lock:
+            near = self._index.add(digest, signature) if signature is not None else []
+            self._unsaved[(kind, digest)] = text
+            self._contents.append((kind, digest, text, len(html) if html is not None else None,
+                                   signature.tobytes() if signature is not None else None, url, now))
+            self._urls.append((url, digest, now))
+            self._near.extend((digest, other, round(share, 3)) for other, share in near)
+            self.parsed += 1
+            self._flush_if_due()
+        return near
+
+    def _flush_if_due(self):
+        if len(self._contents) + len(self._urls) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        # write the new entries in one transaction (with the lock held)
+        if not (self._contents or self._urls or self._near):
+            return
+        self._db.execute("BEGIN")
+        self._db.executemany("INSERT OR IGNORE INTO contents (kind, digest, data, size, signature, first_url, added) VALUES (?, ?, ?, ?, ?, ?, ?)", self._contents)
+        self._db.executemany("INSERT OR REPLACE INTO urls (url, digest, seen) VALUES (?, ?, ?)", self._urls)
+        self._db.executemany("INSERT OR IGNORE INTO near (digest, other, similarity) VALUES (?, ?, ?)", self._near)
+        self._db.execute("COMMIT")
+        self._unsaved.clear()
+        self._contents = []
+        self._urls = []
+        self._near = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def near_duplicates(self):
+        """[(url, other url, similarity)] for each pair of distinct pages found to be near duplicates."""
+        with self._lock:
+            self._flush()
+            return self._db.execute(
+                "SELECT a.first_url, b.first_url, near.similarity FROM near"
+                " JOIN contents a ON a.digest = near.digest JOIN contents b ON b.digest = near.other"
+                " GROUP BY near.digest, near.other ORDER BY near.similarity DESC, a.first_url"
+            ).fetchall()
+
+    def stats(self):
+        """Counts of the urls seen, the distinct pages stored and their size, and this run's parsed/skipped pages."""
+        with self._lock:
+            self._flush()
+            urls = self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            pages, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM contents").fetchone()
+            near = self._db.execute("SELECT COUNT(*) FROM near").fetchone()[0]
+        return {"urls": urls, "pages": pages, "data_bytes": size, "near_duplicates": near, "parsed": self.parsed, "skipped": self.skipped}
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parse_kind(parse):
+    """A name for a parse function, to keep its data apart, e.g. "scrapetools.extract.parse_record#3f2a9c1e".
+
+    It includes any arguments fixed with `functools.partial` and, after the
+    "#", a hash of what the function's results depend on: its compiled code,
+    the value of any plain data (such as a spec) it reads from its module,
+    and the source of the modules that define it and the other objects it
+    uses (such as `scrapetools/spec.py` for the compiled spec in
+    `parse_record`). So the name changes when any of these is edited (or
+    the function is run on another version of Python). Modules of Python
+    itself and of installed packages are left out.
+    """
+    if isinstance(parse, partial):
+        fixed = [repr(arg) for arg in parse.args] + ["{}={!r}".format(name, value) for name, value in sorted(parse.keywords.items())]
+        return "{}({})".format(parse_kind(parse.func), ", ".join(fixed))
+    name = "{}.{}".format(getattr(parse, "__module__", None), getattr(parse, "__qualname__", repr(parse)))
+    function = getattr(parse, "__func__", parse) # methods keep their code on __func__
+    code = getattr(function, "__code__", None)
+    if code is None:
+        return name
+    digest = hashlib.sha256()
+    _hash_code(code, digest)
+    _hash_globals(function, code, digest)
+    return "{}#{}".format(name, digest.hexdigest()[:8])
+
+
+def _hash_code(code, digest):
+    # the instructions, names and constants of `code`, with those of any functions defined inside it
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode("utf-8"))
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            _hash_code(constant, digest)
+        else:
+            digest.update(_constant_text(constant).encode("utf-8"))
+
+
+def _hash_globals(function, code, digest):
+    # plain data the function reads from its module by value; anything else by the source of the module defining it
+    namespace = getattr(function, "__globals__", {})
+    modules = {function.__module__}
+    for name in sorted(_global_names(code)):
+        if name not in namespace:
+            continue
+        value = namespace[name]
+        if isinstance(value, _DATA_TYPES):
+            digest.update("{}={}".format(name, _constant_text(value)).encode("utf-8"))
+        elif isinstance(value, types.ModuleType):
+            modules.add(value.__name__)
+        else:
+            modules.add(getattr(value, "__module__", None) or type(value).__module__)
+    for module in sorted(modules, key=str):
+        digest.update(_module_source(module))
+
+
+def _global_names(code):
+    # the names `code`, and any functions defined inside it, look up outside themselves
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= _global_names(constant)
+    return names
+
+
+_DATA_TYPES = (dict, list, tuple, set, frozenset, str, bytes, int, float, bool, type(None))
+
+_INSTALLED = tuple(os.path.normcase(sysconfig.get_paths()[key]) for key in ("stdlib", "platstdlib", "purelib", "platlib"))
+
+
+@lru_cache(maxsize=256)
+def _module_source(module_name):
+    # the source of a loaded module, or b"" for modules of Python or installed packages and those without a file
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    if path is None or not path.endswith(".py") or os.path.normcase(os.path.abspath(path)).startswith(_INSTALLED):
+        return b""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def _constant_text(constant):
+    # repr, but with sets sorted: their order changes from one Python process to the next
+    if isinstance(constant, (set, frozenset)):
+        return "{}({})".format(type(constant).__name__, sorted(_constant_text(item) for item in constant))
+    if isinstance(constant, (tuple, list)):
+        return "({})".format(", ".join(_constant_text(item) for item in constant))
+    if isinstance(constant, dict):
+        return "{{{}}}".format(", ".join("{}: {}".format(_constant_text(key), _constant_text(value)) for key, value in constant.items()))
+    return repr(constant)
@@ -0,0 +1,246 @@
+"""Crawl several City of Edinburgh Council directories in one run.
+
+Example 2 collects the Libraries and Warm Spaces directories with the same
+two loops, written out twice: one over the A-Z index pages, one over the
+record pages they link to. `DirectoryCrawler` does both loops for any number
+of directories at once, over one set of shared connections:
+
+    crawler = DirectoryCrawler([10199, 10258], client=client)
+    details = crawler.crawl() # {10199: org_details, 10258: org_details}
+    crawler.save(details, "./data/local-authorities/", ddate)
+
+A record page linked from more than one directory is requested only once.
+
+On later days `crawl_incremental` reads the previous snapshots and requests
+only the record pages that are new or whose index entry has changed.
+
+Given a `Frontier` (see `scrapetools.frontier`), the crawler records each
+page in it as it goes, and a crawl that was interrupted requests only the
+pages it had not finished when it is run again. Pages that failed are tried
+again on each run until they have been requested `max_attempts` times.
+`crawl_incremental` always requests the A-Z index pages again, even if the
+frontier has them as done, so that new organisations are found.
+
+Given a `FailureLedger` (see `scrapetools.retry`), pages that could not be
+requested or read are recorded in it instead of being reported with a
+"Could not request webpage" message, and a record page without its details
+list no longer stops the crawl.
+
+If the client was given a `Timings` (see `scrapetools.timings`), parse times
+are recorded in it along with the requests.
+
+Given a `ContentStore` (see `scrapetools.dedupe`) as `dedupe`, index and
+record pages whose content was parsed before, in this run or an earlier one,
+are not parsed again.
+"""
+
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import string # module for working with ASCII and other strings
+
+from .client import ScrapeClient
+from .extract import parse_index, parse_record
+from .frontier import crawl_frontier
+from .incremental import diff_snapshots, latest_snapshot, load_snapshot
+from .pipeline import PageResult, crawl
+
+BASE = "https://www.edinburgh.gov.uk"
+
+# Output file names used in Example 2: coe-<name>-<ddate>.json
+DIRECTORY_NAMES = {
+    10199: "library-spaces",
+    10258: "warm-spaces",
+}
+
+
+def _index_letter(org_name):
+    """The letter of the A-Z index page an organisation is listed under, or None if it does not start with one."""
+    letter = org_name.strip()[:1].upper()
+    return letter if letter and letter in string.ascii_uppercase else None
+
+
+class DirectoryCrawler:
+    """Collects the organisations and details of one or more directories."""
+
+    def __init__(self, directory_ids, client=None, base=BASE, names=None, parse_workers=0, frontier=None, failures=None, dedupe=None, max_attempts=3):
+        self.directory_ids = list(directory_ids)
+        self.client = client if client is not None else ScrapeClient()
+        self.base = base
+        self.names = dict(DIRECTORY_NAMES, **(names or {}))
+        self.parse_workers = parse_workers
+        self.frontier = frontier
+        self.failures = failures
+        self.dedupe = dedupe
+        self.max_attempts = max_attempts
+
+    def index_urls(self, directory_id):
+        return [self.base + "/directory/{}/a-to-z/{}".format(directory_id, l) for l in string.ascii_uppercase]
+
+    def crawl_indexes(self, refresh=False):
+        """Return {directory_id: org_list} from the A-Z index pages of every directory.
+
+        With `refresh=True` the index pages are requested even if the frontier has them as done.
+        """
+        org_lists, _ = self._crawl_indexes(refresh)
+        return org_lists
+
+    def _crawl_indexes(self, refresh=False):
+        # ({directory_id: org_list}, {directory_id: set of letters whose index page could not be requested or read})
+        urls = [url for directory_id in self.directory_ids for url in self.index_urls(directory_id)]
+        pages = self._crawl(urls, parse_index, refresh=refresh)
+
+        org_lists = {directory_id: [] for directory_id in self.directory_ids}
+        missing = {directory_id: set() for directory_id in self.directory_ids}
+        letters = ((d, l) for d in self.directory_ids for l in string.ascii_uppercase)
+        for (directory_id, letter), page in zip(letters, pages):
+            if page.status_code==200 and page.error is None:
+                org_lists[directory_id].extend(page.data)
+            else:
+                missing[directory_id].add(letter)
+                if self.failures is None:
+                    print("Could not request webpage: {} ({})".format(page.url, page.error or page.status_code))
+        return org_lists, missing
+
+    def crawl_records(self, urls):
+        """Return {url: details} for each record page that was requested successfully."""
+        pages = self._crawl(urls, parse_record)
+
+        records = {}
+        for page in pages:
+            if page.status_code==200 and page.error is None:
+                records[page.url] = page.data
+            elif self.failures is None:
+                print("Could not request webpage: {} ({})".format(page.url, page.error or page.status_code))
+        return records
+
+    def _crawl(self, urls, parse, refresh=False):
+        # a PageResult for each url, in order; with a frontier, urls finished by an earlier run are not requested
+        # (unless `refresh`), and urls that failed are requested again until they have had max_attempts
+        if self.frontier is None:
+            return crawl(
+                urls, parse, get=self.client.get, parse_workers=self.parse_workers,
+                failures=self.failures, timings=self.client.timings, dedupe=self.dedupe,
+            )
+        self.frontier.add(urls)
+        if refresh:
+            self.frontier.reset(urls)
+        else:
+            self.frontier.retry_failed(urls, max_attempts=self.max_attempts)
+        crawl_frontier(
+            self.frontier, parse, get=self.client.get, urls=urls,
+            parse_workers=self.parse_workers, failures=self.failures, timings=self.client.timings, dedupe=self.dedupe,
+        )
+        pages = []
+        for url in urls:
+            entry = self.frontier.get(url)
+            pages.append(PageResult(url, entry["status_code"], entry["data"], entry["error"] if entry["state"]=="failed" else None))
+        return pages
+
+    def crawl(self):
+        """Return {directory_id: org_details}, as built by the loops in Example 2."""
+        org_lists = self.crawl_indexes()
+
+        # request each distinct record page once, however many directories list it
+        urls = list(dict.fromkeys(self.base + org["org_url"] for org_list in org_lists.values() for org in org_list))
+        records = self.crawl_records(urls)
+
+        details = {}
+        for directory_id, org_list in org_lists.items():
+            org_details = []
+            for org in org_list:
+                url = self.base + org["org_url"]
+                if url in records:
+                    obs = dict(records[url])
+                    obs["org_name"] = org["org_name"]
+                    obs["org_url"] = url
+                    org_details.append(obs)
+            details[directory_id] = org_details
+        return details
+
+    def crawl_incremental(self, folder, revalidate=False):
+        """Update the newest snapshots in `folder` rather than crawling from nothing.
+
+        The A-Z index pages are always requested. A record page is requested
+        again only if its url is new or its name in the index has changed;
+        other records are copied from the previous snapshot. With
+        `revalidate=True` every record page is requested again, which is
+        cheap when the client has an `HTTPCache`: unchanged pages come back
+        as `304 Not Modified`.
+
+        If a letter's index page cannot be requested, the organisations
+        listed under that letter in the previous snapshot are kept as they
+        were, rather than being reported as removed.
+
+        Returns ({directory_id: org_details}, {directory_id: delta}), where
+        each delta is the result of `scrapetools.incremental.diff_snapshots`.
+        """
+        previous = {
+            directory_id: {obs["org_url"]: obs for obs in load_snapshot(latest_snapshot(folder, self.name(directory_id)))}
+            for directory_id in self.directory_ids
+        }
+        known = {}
+        for records in previous.values():
+            known.update(records)
+
+        org_lists, missing = self._crawl_indexes(refresh=True)
+        urls = []
+        for org_list in org_lists.values():
+            for org in org_list:
+                url = self.base + org["org_url"]
+                old = known.get(url)
+                if revalidate or old is None or old["org_name"]!=org["org_name"]:
+                    urls.append(url)
+        records = self.crawl_records(list(dict.fromkeys(urls)))
+
+        details = {}
+        deltas = {}
+        for directory_id, org_list in org_lists.items():
+            org_details = []
+            for org in org_list:
+                url = self.base + org["org_url"]
+                if url in records:
+                    obs = dict(records[url])
+                    obs["org_name"] = org["org_name"]
+                    obs["org_url"] = url
+                elif url in known:
+                    obs = previous[directory_id].get(url, known[url]) # unchanged, or could not be requested again
+                else:
+                    continue
+                org_details.append(obs)
+            if missing[directory_id]:
+                # the index pages of these letters could not be read: keep what was listed under them before
+                # (and names that do not start with a letter, as we cannot tell which page lists them)
+                listed = {obs["org_url"] for obs in org_details}
+                for url, obs in previous[directory_id].items():
+                    letter = _index_letter(obs["org_name"])
+                    if url not in listed and (letter is None or letter in missing[directory_id]):
+                        org_details.append(obs)
+            details[directory_id] = org_details
+            deltas[directory_id] = diff_snapshots(list(previous[directory_id].values()), org_details)
+        return details, deltas
+
+    def name(self, directory_id):
+        return self.names.get(directory_id, "directory-{}".format(directory_id))
+
+    def outfile(self, folder, directory_id, ddate):
+        return os.path.join(folder, "coe-{}-{}.json".format(self.name(directory_id), ddate))
+
+    def save(self, details, folder, ddate):
+        """Write each directory's org_details to coe-<name>-<ddate>.json; returns the file names."""
+        outfiles = []
+        for directory_id, org_details in details.items():
+            outfile = self.outfile(folder, directory_id, ddate)
+            with open(outfile, "w", encoding="utf-8") as f:
+                json.dump(org_details, f)
+            outfiles.append(outfile)
+        return outfiles
+
+    def save_deltas(self, deltas, folder, ddate):
+        """Write each directory's delta to coe-<name>-delta-<ddate>.json; returns the file names."""
+        outfiles = []
+        for directory_id, delta in deltas.items():
+            outfile = os.path.join(folder, "coe-{}-delta-{}.json".format(self.name(directory_id), ddate))
+            with open(outfile, "w", encoding="utf-8") as f:
+                json.dump(delta, f)
+            outfiles.append(outfile)
+        return outfiles
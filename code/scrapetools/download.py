@@ -0,0 +1,187 @@
+"""Download files to disk without holding them in memory.
+
+Example 1 downloads the Register of Charities with `requests.get(url)` and
+then `f.write(response.content)`: the whole archive (hundreds of MB) is held
+in memory before a single byte reaches the disk. Requesting with
+`stream=True` and writing the file in fixed-size chunks as they arrive keeps
+memory use flat, however large the file is:
+
+    download_file(url, "./downloads/ccew-register-of-charities.zip", get=client.get)
+
+For very large files `download_ranged` fetches several pieces of the file at
+once and can resume an interrupted download.
+"""
+
+import hashlib # module for creating fingerprints (hashes) of data
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import threading # module for running code in parallel threads
+import time # module for working with time
+from collections import namedtuple # module for lightweight record types
+from concurrent.futures import ThreadPoolExecutor # module for managing a pool of threads
+
+import requests # module for requesting urls
+
+CHUNK_SIZE = 1024 * 1024 # 1 MB
+
+Download = namedtuple("Download", ["path", "bytes", "seconds", "headers"])
+Download.__doc__ = """A finished download: where it was saved, its size, how long it took and the response headers."""
+
+
+def report_progress(done, total, rate):
+    """Default progress report: one line per update, e.g. "120.0 MB of 250.0 MB (48%) at 35.2 MB/s"."""
+    if total:
+        print("{:.1f} MB of {:.1f} MB ({:.0%}) at {:.1f} MB/s".format(done / 1e6, total / 1e6, done / total, rate / 1e6))
+    else:
+        print("{:.1f} MB at {:.1f} MB/s".format(done / 1e6, rate / 1e6))
+
+
+def save_stream(response, outfile, chunk_size=CHUNK_SIZE, progress=report_progress, report_every=2.0):
+    """Write the body of a `stream=True` response to `outfile`, `chunk_size` bytes at a time.
+
+    `progress(bytes_done, bytes_total, bytes_per_second)` is called at most
+    every `report_every` seconds and once at the end (use None for silence).
+    The file is written as `<outfile>.part` and renamed once complete, so a
+    failed download never leaves a truncated file under the real name.
+    """
+    response.raise_for_status()
+    total = int(response.headers.get("Content-Length", 0)) or None
+    partial = outfile + ".part"
+    done = 0
+    start = last_report = time.perf_counter()
+
+    with response, open(partial, "wb") as f:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+            done += len(chunk)
+            now = time.perf_counter()
+            if progress is not None and now - last_report >= report_every:
+                progress(done, total, done / (now - start))
+                last_report = now
+    os.replace(partial, outfile)
+
+    seconds = time.perf_counter() - start
+    if progress is not None:
+        progress(done, total, done / seconds if seconds else 0)
+    return Download(outfile, done, seconds, response.headers)
+
+
+def download_file(url, outfile, get=None, chunk_size=CHUNK_SIZE, progress=report_progress, report_every=2.0):
+    """Request `url` and stream it to `outfile`; see `save_stream`.
+
+    `get` is the function used to make the request (default: `requests.get`;
+    pass `client.get` to share connections).
+    """
+    if get is None:
+        get = requests.get
+    response = get(url, stream=True)
+    return save_stream(response, outfile, chunk_size=chunk_size, progress=progress, report_every=report_every)
+
+
+def download_ranged(url, outfile, get=None, segment_size=8 * CHUNK_SIZE, max_workers=4, checksum=None, algorithm="sha256", progress=report_progress):
+    """Download `url` in `segment_size` pieces over `max_workers` connections at once.
+
+    Each piece is requested with an HTTP `Range` header and written into its
+    place in `<outfile>.part`. Finished pieces are recorded in the sidecar
+    file `<outfile>.progress`, so if the download is interrupted, calling this
+    again resumes where it stopped (provided the file on the server has not
+    changed). If the server does not support ranges, or does not say how big
+    the file is, the file is downloaded as a single stream instead.
+
+    If `checksum` is given, the finished file's `algorithm` hash (e.g.
+    "sha256" or "md5") must match it, or `ValueError` is raised.
+    """
+    if get is None:
+        get = requests.get
+    start = time.perf_counter()
+
+    head = get(url, headers={"Range": "bytes=0-0"}, stream=True) # a one byte request tells us about range support
+    head.close()
+    size = _total_size(head)
+    if size is None:
+        result = download_file(url, outfile, get=get, progress=progress)
+    else:
+        _download_segments(url, outfile, get, size, head.headers, segment_size, max_workers, progress, start)
+        result = Download(outfile, size, time.perf_counter() - start, head.headers)
+
+    if checksum is not None:
+        actual = file_checksum(outfile, algorithm)
+        if actual.lower() != checksum.lower():
+            raise ValueError("{} checksum of {} is {}, expected {}".format(algorithm, outfile, actual, checksum))
+    return result
+
+
+def file_checksum(path, algorithm="sha256", chunk_size=CHUNK_SIZE):
+    """Return the hex digest of the file at `path`, reading it in chunks."""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _total_size(response):
+    # the full size from a 206 answer to "Range: bytes=0-0", e.g. "Content-Range: bytes 0-0/12345"
+    if response.status_code!=206:
+        return None
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def _download_segments(url, outfile, get, size, headers, segment_size, max_workers, progress, start):
+    partial = outfile + ".part"
+    sidecar = outfile + ".progress"
+    # the progress file is only trusted if it describes the same file on the server
+    identity = {"url": url, "size": size, "segment_size": segment_size, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+    done = set()
+    if os.path.exists(sidecar) and os.path.exists(partial):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("identity") == identity:
+            done = set(saved["done"])
+    if not done:
+        with open(partial, "wb") as f:
+            f.truncate(size) # reserve the full size so each segment can be written in place
+
+    segments = [(offset, min(offset + segment_size, size) - 1) for offset in range(0, size, segment_size)]
+    todo = [segment for segment in segments if segment[0] not in done]
+    lock = threading.Lock()
+    state = {"bytes": sum(min(segment_size, size - offset) for offset in done), "reported": time.perf_counter()}
+
+    def fetch(segment):
+        first, last = segment
+        response = get(url, headers={"Range": "bytes={}-{}".format(first, last)}, stream=True)
+        with response:
+            if response.status_code!=206:
+                raise IOError("expected 206 Partial Content for bytes {}-{}, got {}".format(first, last, response.status_code))
+            position = first
+            with open(partial, "r+b") as f:
+                f.seek(first)
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    position += len(chunk)
+        if position!=last + 1:
+            raise IOError("segment {}-{} ended early at byte {}".format(first, last, position))
+
+        with lock:
+            done.add(first)
+            temp = sidecar + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump({"identity": identity, "done": sorted(done)}, f)
+            os.replace(temp, sidecar)
+            state["bytes"] += last + 1 - first
+            now = time.perf_counter()
+            if progress is not None and now - state["reported"] >= 2.0:
+                progress(state["bytes"], size, state["bytes"] / (now - start))
+                state["reported"] = now
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for _ in pool.map(fetch, todo):
+            pass # re-raises the first failure; finished segments stay recorded for next time
+
+    os.replace(partial, outfile)
+    os.remove(sidecar)
+    if progress is not None:
+        seconds = time.perf_counter() - start
+        progress(size, size, size / seconds if seconds else 0)
@@ -0,0 +1,174 @@
+"""Collect every Desert Island Discs episode: the "Advanced" tier of Challenge 1.
+
+The episode list at https://www.bbc.co.uk/programmes/b006qnmr/episodes/player
+is split over hundreds of pages (`?page=2`, `?page=3`, ...), each listing a
+few episodes that link to a page of their own. A loop that requests one
+listing page, then each of its episodes, then the next listing page, spends
+nearly all of its time waiting for the BBC. `EpisodeCrawler` instead:
+
+1. requests the first listing page and reads the number of the last page
+   from its page links;
+2. requests the other listing pages at the same time (see `scrapetools.crawl`);
+3. requests the episode pages, handing back each episode as soon as it has
+   been read.
+
+    crawler = EpisodeCrawler(client=client)
+    episodes = crawler.crawl() # newest first
+    crawler.table(episodes).to_csv("./data/desert-island-discs-" + ddate + ".csv", index=False)
+
+The listing pages are read with `DESERT_ISLAND_DISCS_SPEC` and the episode
+pages with `DESERT_ISLAND_DISCS_EPISODE_SPEC` (see `scrapetools.spec`). An
+episode that moves onto the next listing page while the crawl runs (because
+a new one has been broadcast) is kept only once. `max_pages` limits the
+crawl to the newest pages, e.g. `max_pages=1` for the "Intermediate" tier.
+
+As with `DirectoryCrawler`, pages that could not be requested or read are
+recorded in a `FailureLedger` if one is given, or reported with a "Could not
+request webpage" message.
+"""
+
+import re # module for searching text with patterns
+from urllib.parse import urljoin # module for building absolute web addresses
+
+import pandas as pd # module for working with dataframes
+import requests # module for requesting urls
+
+from .client import ScrapeClient
+from .pipeline import crawl, iter_crawl
+from .spec import DESERT_ISLAND_DISCS_EPISODE_SPEC, DESERT_ISLAND_DISCS_SPEC, compile_spec
+
+BASE = "https://www.bbc.co.uk"
+PROGRAMME = "b006qnmr" # Desert Island Discs
+
+# The columns of `EpisodeCrawler.table`, in order
+EPISODE_COLUMNS = ["position", "page", "pid", "url", "title", "subtitle", "synopsis", "broadcast", "description", "artists", "discs"]
+
+_PAGE_LINK = re.compile(r"""href=["'][^"']*[?&](?:amp;)?page=(\d+)""")
+
+_listing_extractor = compile_spec(DESERT_ISLAND_DISCS_SPEC)
+_episode_extractor = compile_spec(DESERT_ISLAND_DISCS_EPISODE_SPEC)
+
+
+def last_page(html):
+    """Return the highest page number linked from a listing page (1 if it has no page links)."""
+    return max((int(number) for number in _PAGE_LINK.findall(html)), default=1)
+
+
+def parse_listing(html, parser=None):
+    """Return the episodes on a listing page, each a dict of title, subtitle, synopsis and url."""
+    return _listing_extractor.extract(html, parser=parser)
+
+
+def parse_episode(html, parser=None):
+    """Return the details on an episode page: its title, description, broadcast date and the artists played."""
+    details = _episode_extractor.extract(html, parser=parser)
+    if details["title"] is None:
+        raise ValueError("no title (h1) on the episode page")
+    return details
+
+
+class EpisodeCrawler:
+    """Collects every episode of a BBC programme from its paginated episode list."""
+
+    def __init__(self, client=None, base=BASE, programme=PROGRAMME, max_pages=None, io_workers=8, per_host=4, parse_workers=0, failures=None):
+        self.client = client if client is not None else ScrapeClient()
+        self.base = base
+        self.programme = programme
+        self.max_pages = max_pages
+        self.io_workers = io_workers
+        self.per_host = per_host
+        self.parse_workers = parse_workers
+        self.failures = failures
+
+    def listing_url(self, page):
+        url = self.base + "/programmes/{}/episodes/player".format(self.programme)
+        return url if page == 1 else url + "?page={}".format(page)
+
+    def crawl_listings(self):
+        """Return the episodes on every listing page, newest first, without their episode pages."""
+        url = self.listing_url(1)
+        try:
+            response = self.client.get(url)
+        except requests.RequestException as error:
+            if self.failures is None:
+                raise
+            self.failures.record(url, "request", error=error, attempts=getattr(error, "attempts", 1))
+            return []
+        if response.status_code!=200:
+            if self.failures is None:
+                print("Could not request webpage: {} ({})".format(url, response.status_code))
+            else:
+                self.failures.record(url, "request", status_code=response.status_code, attempts=getattr(response, "attempts", 1))
+            return []
+        last = last_page(response.text)
+        if self.max_pages is not None:
+            last = min(last, self.max_pages)
+
+        pages = [(1, parse_listing(response.text))]
+        urls = [self.listing_url(page) for page in range(2, last + 1)]
+        for page, result in zip(range(2, last + 1), self._crawl(urls, parse_listing)):
+            if result.status_code==200 and result.error is None:
+                pages.append((page, result.data))
+            elif self.failures is None:
+                print("Could not request webpage: {} ({})".format(result.url, result.error or result.status_code))
+
+        episodes = []
+        seen = set()
+        for page, listed in pages:
+            for episode in listed:
+                if episode["url"] is None:
+                    continue
+                episode["url"] = urljoin(url, episode["url"])
+                if episode["url"] in seen:
+                    continue # moved onto the next page during the crawl
+                seen.add(episode["url"])
+                episode["page"] = page
+                episode["position"] = len(episodes) + 1
+                episodes.append(episode)
+        return episodes
+
+    def iter_episodes(self, episodes=None):
+        """Yield each episode, with the details from its own page, as soon as that page has been read.
+
+        Episodes come in the order their pages finish, not newest first.
+        `episodes` defaults to those found by `crawl_listings`.
+        """
+        if episodes is None:
+            episodes = self.crawl_listings()
+        listed = {episode["url"]: episode for episode in episodes}
+        for result in iter_crawl(
+            listed, parse_episode, get=self.client.get, io_workers=self.io_workers, per_host=self.per_host,
+            parse_workers=self.parse_workers, failures=self.failures, timings=self.client.timings,
+        ):
+            if result.status_code==200 and result.error is None:
+                episode = dict(listed[result.url])
+                details = dict(result.data)
+                title = details.pop("title")
+                episode["title"] = episode["title"] or title # the guest's name
+                episode.update(details)
+                yield episode
+            elif self.failures is None:
+                print("Could not request webpage: {} ({})".format(result.url, result.error or result.status_code))
+
+    def crawl(self):
+        """Return every episode with its details, newest first."""
+        return sorted(self.iter_episodes(), key=lambda episode: episode["position"])
+
+    def _crawl(self, urls, parse):
+        return crawl(
+            urls, parse, get=self.client.get, io_workers=self.io_workers, per_host=self.per_host,
+            parse_workers=self.parse_workers, failures=self.failures, timings=self.client.timings,
+        )
+
+    @staticmethod
+    def table(episodes):
+        """The episodes as one dataframe, a row per episode, with the artists joined by "; "."""
+        rows = []
+        for episode in episodes:
+            row = dict(episode)
+            row["pid"] = row["url"].rstrip("/").rsplit("/", 1)[-1]
+            artists = row.get("artists") or []
+            row["artists"] = "; ".join(artists)
+            row["discs"] = len(artists)
+            rows.append(row)
+        return pd.DataFrame(rows, columns=EPISODE_COLUMNS)
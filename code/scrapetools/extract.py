@@ -0,0 +1,53 @@
+"""Extraction functions for the City of Edinburgh Council directory pages.
+
+These are the parsing steps from Example 2 packaged as functions, so that
+they can be handed to other helpers (for instance `scrapetools.crawl`, which
+runs them in separate processes). Each takes the text of a web page and
+returns plain Python data.
+
+`parser` names the HTML parser to use (see `scrapetools.parsers`); by default
+the fastest one installed. To choose one when handing a function to `crawl`,
+use `functools.partial(parse_record, parser="lxml")`. With `partial=True`
+(the default) only the element the details are read from is parsed, rather
+than the whole page.
+"""
+
+from .parsers import get_parser
+from .spec import RECORD_SPEC, compile_spec
+
+# The one element each page type is read from; with partial=True only it is parsed
+INDEX_TARGET = ("ul", "list list--record")
+RECORD_TARGET = ("dl", "list list--definition definition")
+
+_record_extractor = compile_spec(RECORD_SPEC)
+
+
+def parse_index(html, parser=None, partial=True):
+    """Return the organisations listed on an A-Z index page.
+
+    Each organisation is a dict with "org_name" and "org_url" (the link as it
+    appears on the page, relative to https://www.edinburgh.gov.uk).
+    """
+    orgs = get_parser(parser).parse(html, target=INDEX_TARGET if partial else None)
+    results = orgs.find(*INDEX_TARGET)
+    if results is None:
+        return [] # letters without any organisations have no list
+
+    org_list = []
+    for el in results.find_all("li"):
+        name = el.find("a").text
+        link = el.find("a").get("href")
+        org_list.append({"org_name": name, "org_url": link})
+    return org_list
+
+
+def parse_record(html, parser=None, partial=True):
+    """Return the details on a directory record page as a dict of heading: value.
+
+    Each `<dt>` heading is paired with the `<dd>` values that follow it (see
+    `scrapetools.spec.RECORD_SPEC`); a heading without a value gets None.
+    """
+    details = _record_extractor.extract(html, parser=parser, partial=partial)
+    if details is None:
+        raise ValueError("no details list ({}) on the page".format(RECORD_SPEC["root"]))
+    return details
@@ -0,0 +1,67 @@
+"""Request many web addresses at once.
+
+The examples request pages one after another: every request waits for the
+previous one to finish before it is sent. `fetch_all` sends the requests from
+a pool of threads instead, while capping how many are in flight for any one
+website so that we remain polite to the servers we scrape.
+"""
+
+import threading # module for running code in parallel threads
+from concurrent.futures import ThreadPoolExecutor, as_completed # modules for managing a pool of threads
+from urllib.parse import urlsplit # module for splitting urls into their parts
+
+import requests # module for requesting urls
+
+
+class HostLimiter:
+    """Caps the number of simultaneous requests made to each host (website)."""
+
+    def __init__(self, per_host=4):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    def slot(self, url):
+        """Return the semaphore guarding the host that `url` points at."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._slots[host]
+
+
+def fetch_all(urls, headers=None, max_workers=8, per_host=4, get=None, failures=None):
+    """Request every url in `urls` concurrently.
+
+    At most `max_workers` requests are in flight overall, and at most
+    `per_host` of those go to the same host. `get` is the function used to
+    make each request (default: `requests.get`).
+
+    Returns the responses in the same order as `urls`, so results built from
+    them are identical to those of a plain `for` loop. A url whose request
+    raised an error (after any retries by `get`) gets None instead of a
+    response, and the other urls are still requested; given a
+    `FailureLedger` as `failures`, the error is recorded there.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    if get is None:
+        get = requests.get
+    limiter = HostLimiter(per_host)
+
+    def fetch(url):
+        with limiter.slot(url):
+            return get(url, headers=headers)
+
+    responses = [None] * len(urls)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+        futures = {pool.submit(fetch, url): i for i, url in enumerate(urls)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                responses[i] = future.result()
+            except Exception as error:
+                if failures is not None:
+                    failures.record(urls[i], "request", error=error, attempts=getattr(error, "attempts", 1))
+    return responses
@@ -0,0 +1,204 @@
+"""A crawl frontier on disk, so an interrupted crawl resumes where it stopped.
+
+If Example 2 dies halfway through (a network blip, a kernel restart), running
+it again starts from letter A. A `Frontier` records every url of a crawl in a
+small SQLite database with its state:
+
+* "pending" - not requested yet;
+* "in_flight" - requested, but the result has not been saved yet;
+* "done" - requested and parsed; the parsed data is stored with it;
+* "failed" - the request raised an error or did not return 200.
+
+along with the response's status code, validators (`ETag`, `Last-Modified`),
+size and timing. Each url is marked done in the same transaction that stores
+its data, so after a crash a new run requests only the urls that were not
+done (those in flight when it stopped are requested again):
+
+    frontier = Frontier(la_data + "crawl-" + ddate + ".sqlite") # one frontier per day's crawl
+    frontier.add(urls)
+    crawl_frontier(frontier, parse_record, get=client.get)
+    records = dict(frontier.results(urls))
+"""
+
+import json # module for working with JSON data structures
+import sqlite3 # module for working with SQLite databases
+import threading # module for running code in parallel threads
+import time # module for working with time
+
+import requests # module for requesting urls
+
+from .pipeline import iter_crawl
+
+STATES = ("pending", "in_flight", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status_code INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    content_length INTEGER,
+    elapsed REAL,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    data TEXT
+)
+"""
+
+
+class Frontier:
+    """The urls of one crawl and how far each has got, kept in SQLite at `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL") # readers do not block the writer, and commits are cheap
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        # urls in flight when a previous run stopped never finished: request them again
+        self._db.execute("UPDATE urls SET state='pending' WHERE state='in_flight'")
+
+    def add(self, urls):
+        """Add `urls` as pending; urls already in the frontier keep their state. Returns how many were new."""
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR IGNORE INTO urls (url) VALUES (?)", ((url,) for url in urls))
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def unfinished(self, urls=None):
+        """The pending urls (of `urls`, if given), in the order they were added."""
+        with self._lock:
+            pending = [url for (url,) in self._db.execute("SELECT url FROM urls WHERE state='pending' ORDER BY rowid")]
+        if urls is None:
+            return pending
+        wanted = set(urls)
+        return [url for url in pending if url in wanted]
+
+    def start(self, url):
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET state='in_flight', attempts=attempts + 1, started=? WHERE url=?", (time.time(), url),
+            )
+
+    def fetched(self, url, response):
+        """Record the metadata of the response to `url` (it stays in flight until `finish`)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET status_code=?, etag=?, last_modified=?, content_length=?, elapsed=? WHERE url=?",
+                (
+                    response.status_code, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                    len(response.content), response.elapsed.total_seconds(), url,
+                ),
+            )
+
+    def finish(self, url, status_code, data):
+        """Mark `url` done with its parsed `data` (anything `json.dumps` accepts), or failed if the status was not 200."""
+        state = "done" if status_code==200 else "failed"
+        error = None if status_code==200 else "status code {}".format(status_code)
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET state=?, status_code=?, finished=?, error=?, data=? WHERE url=?",
+                (state, status_code, time.time(), error, json.dumps(data), url),
+            )
+
+    def fail(self, url, error):
+        with self._lock:
+            self._db.execute(
+                "UPDATE urls SET state='failed', finished=?, error=? WHERE url=?", (time.time(), repr(error), url),
+            )
+
+    def retry_failed(self, urls=None, max_attempts=None):
+        """Put the failed urls (of `urls`, if given) back to pending; returns how many.
+
+        With `max_attempts`, urls already requested that many times are left as failed.
+        """
+        query = "UPDATE urls SET state='pending' WHERE state='failed'"
+        if max_attempts is not None:
+            query += " AND attempts < {:d}".format(max_attempts)
+        with self._lock:
+            if urls is None:
+                return self._db.execute(query).rowcount
+            self._db.execute("BEGIN")
+            count = sum(self._db.execute(query + " AND url=?", (url,)).rowcount for url in urls)
+            self._db.execute("COMMIT")
+            return count
+
+    def reset(self, urls):
+        """Put `urls` back to pending whatever their state, so they are requested again; returns how many."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            count = sum(self._db.execute("UPDATE urls SET state='pending' WHERE url=? AND state!='pending'", (url,)).rowcount for url in urls)
+            self._db.execute("COMMIT")
+            return count
+
+    def results(self, urls=None):
+        """Yield (url, data) for each done url (of `urls`, if given)."""
+        with self._lock:
+            rows = self._db.execute("SELECT url, data FROM urls WHERE state='done' ORDER BY rowid").fetchall()
+        wanted = None if urls is None else set(urls)
+        for url, data in rows:
+            if wanted is None or url in wanted:
+                yield url, json.loads(data)
+
+    def get(self, url):
+        """The frontier's row for `url` as a dict, or None."""
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM urls WHERE url=?", (url,))
+            row = cursor.fetchone()
+            names = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        entry = dict(zip(names, row))
+        entry["data"] = json.loads(entry["data"]) if entry["data"] is not None else None
+        return entry
+
+    def counts(self):
+        """{state: number of urls} for every state."""
+        with self._lock:
+            found = dict(self._db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"))
+        return {state: found.get(state, 0) for state in STATES}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def crawl_frontier(frontier, parse, get=None, urls=None, **options):
+    """Request and parse the unfinished urls in `frontier` (of `urls`, if given), recording each outcome.
+
+    `parse` and `get` are as for `scrapetools.crawl`, as are any other
+    keyword `options`. Returns the number of urls finished by this run.
+    """
+    if get is None:
+        get = requests.get
+
+    def tracked_get(url, **kwargs):
+        frontier.start(url)
+        try:
+            response = get(url, **kwargs)
+        except Exception as error:
+            frontier.fail(url, error)
+            raise
+        frontier.fetched(url, response)
+        return response
+
+    finished = 0
+    for page in iter_crawl(frontier.unfinished(urls), parse, get=tracked_get, **options):
+        if page.error is not None: # recorded in the `failures` ledger, if one was given
+            frontier.fail(page.url, page.error)
+        else:
+            frontier.finish(page.url, page.status_code, page.data)
+        finished += 1
+    return finished
@@ -0,0 +1,53 @@
+"""Snapshots and deltas for re-scraping a directory day after day.
+
+Each run of Example 2 saves a dated snapshot, e.g.
+`./data/local-authorities/coe-library-spaces-2024-06-05.json`. These functions
+find the most recent snapshot and compare two snapshots, so that a new run can
+request only the record pages that have changed (see
+`DirectoryCrawler.crawl_incremental`) and record what changed in a small delta
+file next to the snapshot.
+"""
+
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import re # module for searching text with patterns
+
+
+def latest_snapshot(folder, name):
+    """Return the path of the newest coe-<name>-<date>.json in `folder`, or None."""
+    pattern = re.compile(r"^coe-{}-(\d{{4}}-\d{{2}}-\d{{2}})\.json$".format(re.escape(name)))
+    dated = []
+    for filename in os.listdir(folder) if os.path.isdir(folder) else []:
+        match = pattern.match(filename)
+        if match:
+            dated.append((match.group(1), filename))
+    if not dated:
+        return None
+    return os.path.join(folder, max(dated)[1])
+
+
+def load_snapshot(path):
+    """Return the list of records saved at `path` (an empty list if `path` is None)."""
+    if path is None:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def diff_snapshots(old, new):
+    """Compare two lists of records, matched on "org_url".
+
+    Returns a dict with the records "added" and "removed", and for each
+    "changed" record its url with the record "before" and "after".
+    """
+    old_by_url = {obs["org_url"]: obs for obs in old}
+    new_by_url = {obs["org_url"]: obs for obs in new}
+    return {
+        "added": [obs for url, obs in new_by_url.items() if url not in old_by_url],
+        "removed": [obs for url, obs in old_by_url.items() if url not in new_by_url],
+        "changed": [
+            {"org_url": url, "before": old_by_url[url], "after": obs}
+            for url, obs in new_by_url.items()
+            if url in old_by_url and old_by_url[url] != obs
+        ],
+    }
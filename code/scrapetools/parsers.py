@@ -0,0 +1,374 @@
+"""Interchangeable HTML parsers for the extraction functions.
+
+Example 2 parses every page with `soup(response.text, "html.parser")`, the
+slowest of the parsers BeautifulSoup can use. Once pages are requested
+concurrently, parsing takes most of the time. The extraction functions only
+need a few things from a parsed page: find the first tag with a given class,
+find all tags of a kind inside it, and read a tag's text and attributes. Each
+parser here offers exactly those, using the names BeautifulSoup uses:
+
+    doc = get_parser("lxml").parse(html)
+    results = doc.find("dl", class_="list list--definition definition")
+    [dt.text.strip() for dt in results.find_all("dt")]
+
+The parsers are:
+
+* "html.parser" - BeautifulSoup with Python's built-in parser (always available).
+* "lxml" - the C library lxml (`pip install lxml`).
+* "selectolax" - the C library lexbor through selectolax (`pip install selectolax`).
+
+`get_parser()` with no name returns the fastest one that is installed.
+
+Most of a council page is navigation and footer that the extraction never
+reads. `parse(html, target=("dl", "list list--definition definition"))`
+builds a tree for only the first element matching the target and its
+contents: BeautifulSoup skips everything else while parsing (a
+`SoupStrainer`), and the C parsers are handed just that element's markup. If
+the target cannot be found this way, the whole page is parsed as usual.
+
+Classes are compared as sets of class names (`class_tokens`) by all three
+parsers, so `find("div", class_="programme programme--episode")` finds
+`<div class="programme programme--radio programme--episode">`, whatever the
+order of the classes or the spaces between them. (BeautifulSoup's own
+`find` compares a class string of several classes character for character;
+the "html.parser" parser therefore wraps its tags in `SoupNode`, whose
+`find`/`find_all` compare sets like the others.) The set for each class
+string is worked out once and remembered, so a long class attribute that
+appears on every page (such as the Mary's Meals one) is not split again on
+every element. An empty page parses to an empty document with every parser.
+"""
+
+import re # module for searching text with patterns
+from functools import lru_cache # module for remembering the results of a function
+
+from bs4 import BeautifulSoup as soup # module for parsing web pages
+from bs4 import SoupStrainer # module for parsing only part of a web page
+
+PARSERS = ("selectolax", "lxml", "html.parser") # fastest first
+
+_parsers = {}
+
+
+def get_parser(name=None):
+    """Return the parser called `name`, or the fastest installed parser if `name` is None."""
+    if name is None:
+        for candidate in PARSERS:
+            try:
+                return get_parser(candidate)
+            except ImportError:
+                continue
+    if name not in _parsers:
+        if name == "html.parser":
+            _parsers[name] = SoupParser()
+        elif name == "lxml":
+            _parsers[name] = LxmlParser()
+        elif name == "selectolax":
+            _parsers[name] = SelectolaxParser()
+        else:
+            raise ValueError("unknown parser {!r}; choose from {}".format(name, ", ".join(PARSERS)))
+    return _parsers[name]
+
+
+@lru_cache(maxsize=8192)
+def _split_classes(value):
+    return frozenset(value.split())
+
+
+def class_tokens(value):
+    """The set of class names in a class attribute or `class_` string (or a list of them, as BeautifulSoup gives)."""
+    if not value:
+        return frozenset()
+    if isinstance(value, str):
+        return _split_classes(value)
+    return frozenset(value)
+
+
+_CSS_PLAIN = re.compile(r"[\w-]", re.ASCII)
+
+
+@lru_cache(maxsize=4096)
+def css_identifier(name):
+    """`name` (a tag or class name) escaped for use in a CSS selector, e.g. "md:flex" -> "md\\:flex"."""
+    escaped = []
+    for i, character in enumerate(name):
+        if character.isdigit() and (i == 0 or (i == 1 and name[0] == "-")):
+            escaped.append("\\{:x} ".format(ord(character))) # a name cannot start with a digit
+        elif _CSS_PLAIN.match(character) or ord(character) > 127:
+            escaped.append(character)
+        else:
+            escaped.append("\\" + character)
+    return "".join(escaped)
+
+
+def _has_classes(value, class_):
+    # True if the element's class attribute contains every class in `class_`
+    return value is not None and class_tokens(class_) <= class_tokens(value)
+
+
+# elements whose content is text rather than markup, so a tag written inside them is not a tag
+RAW_TEXT = ("script", "style", "textarea", "title")
+
+
+@lru_cache(maxsize=64)
+def _tag_pattern(tag):
+    # the opening and closing tags of `tag`, and the comments and text-only elements to step over
+    raw = "|".join(name for name in RAW_TEXT if name != tag.lower())
+    return re.compile(
+        r"<!--.*?(?:-->|\Z)|<({raw})\b[^>]*>.*?(?:</\1\s*>|\Z)|<(/?){tag}\b([^>]*)>".format(raw=raw, tag=re.escape(tag)),
+        re.IGNORECASE | re.DOTALL,
+    )
+
+
+def target_region(html, target):
+    """Return the markup of the first element matching `target` = (tag, class_), or None.
+
+    Nested elements of the same tag are counted, so the region ends at the
+    closing tag that matches the opening one. Comments and the contents of
+    `<script>`, `<style>`, `<textarea>` and `<title>` are stepped over, so a
+    copy of the target written inside them (e.g. a commented-out list) is
+    not taken for the real one.
+    """
+    tag, class_ = target
+    start = None
+    depth = 0
+    for match in _tag_pattern(tag).finditer(html):
+        _, closing, attributes = match.groups()
+        if closing is None: # a comment or text-only element
+            continue
+        if start is None:
+            if not closing and _has_classes(_class_attribute(attributes), class_):
+                start = match.start()
+                depth = 1
+        elif closing:
+            depth -= 1
+            if depth == 0:
+                return html[start:match.end()]
+        else:
+            depth += 1
+    return None
+
+
+_CLASS_ATTRIBUTE = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+
+
+def _class_attribute(attributes):
+    match = _CLASS_ATTRIBUTE.search(attributes)
+    if match is None:
+        return None
+    return next(value for value in match.groups() if value is not None)
+
+
+class SoupParser:
+    """BeautifulSoup itself: its tags already have `find`, `find_all`, `text` and `get`."""
+
+    name = "html.parser"
+
+    def __init__(self, features="html.parser"):
+        self.features = features
+
+    def parse(self, html, target=None):
+        if target is None:
+            return SoupNode(soup(html, self.features))
+        tag, class_ = target
+        if class_ is None:
+            return SoupNode(soup(html, self.features, parse_only=SoupStrainer(tag)))
+        # a plain class string with spaces only matches character for character, so test the classes
+        # ourselves (depending on the version, BeautifulSoup passes the whole attribute or one class at a time)
+        classes = class_.split()
+        return SoupNode(soup(html, self.features, parse_only=SoupStrainer(tag, class_=lambda value: value is not None and (_has_classes(value, class_) or value in classes))))
+
+    @staticmethod
+    def elements(node):
+        """The child tags of `node`, skipping text and comments."""
+        return [SoupNode(child) for child in node.element.children if child.name is not None]
+
+    @staticmethod
+    def descendants(node):
+        """Every tag inside `node`, in page order."""
+        return [SoupNode(child) for child in node.element.find_all(True)]
+
+    @staticmethod
+    def find_all(node, tag, class_=None):
+        """Every `tag` inside `node` with all the classes in `class_`."""
+        return node.find_all(tag, class_)
+
+
+class SoupNode:
+    """A BeautifulSoup tag whose `find`/`find_all` compare classes as sets, as the other parsers' nodes do.
+
+    The tag itself is `node.element`, for anything else BeautifulSoup offers.
+    """
+
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def name(self):
+        return self.element.name
+
+    def _matching(self, tag, class_):
+        # the tags inside this one with that name and classes, in page order (text has no name)
+        classes = class_tokens(class_)
+        for element in self.element.descendants:
+            if element.name == tag and (not classes or classes <= class_tokens(element.get("class"))):
+                yield element
+
+    def find(self, tag, class_=None):
+        element = next(self._matching(tag, class_), None)
+        return None if element is None else SoupNode(element)
+
+    def find_all(self, tag, class_=None):
+        return [SoupNode(element) for element in self._matching(tag, class_)]
+
+    @property
+    def text(self):
+        return self.element.get_text()
+
+    def get(self, name, default=None):
+        value = self.element.get(name, default)
+        return " ".join(value) if isinstance(value, list) else value # class comes as a list; give the attribute as written, as lxml does
+
+
+class LxmlParser:
+    """Parses with lxml.html and wraps its elements in `LxmlNode`."""
+
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            import lxml.html # module for parsing web pages quickly (C library)
+            from lxml.etree import ParserError
+        except ImportError:
+            raise ImportError("the lxml parser needs lxml: pip install lxml") from None
+        self._document_fromstring = lxml.html.document_fromstring
+        self._parser_error = ParserError
+
+    def parse(self, html, target=None):
+        region = target_region(html, target) if target is not None else None
+        try:
+            return LxmlNode(self._document_fromstring(region or html))
+        except self._parser_error: # lxml refuses a page with no elements at all ("Document is empty")
+            return LxmlNode(self._document_fromstring("<html></html>"))
+
+    @staticmethod
+    def elements(node):
+        """The child tags of `node`, skipping text and comments."""
+        return [LxmlNode(element) for element in node.element if isinstance(element.tag, str)]
+
+    @staticmethod
+    def descendants(node):
+        """Every tag inside `node`, in page order."""
+        return [LxmlNode(element) for element in node.element.iterdescendants() if isinstance(element.tag, str)]
+
+    @staticmethod
+    def find_all(node, tag, class_=None):
+        """Every `tag` inside `node` with all the classes in `class_`."""
+        return node.find_all(tag, class_)
+
+
+class LxmlNode:
+    """An lxml element with the BeautifulSoup methods the extraction functions use."""
+
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    def find(self, tag, class_=None):
+        classes = class_tokens(class_)
+        for element in self.element.iterdescendants(tag):
+            if not classes or classes <= class_tokens(element.get("class")):
+                return LxmlNode(element)
+        return None
+
+    def find_all(self, tag, class_=None):
+        classes = class_tokens(class_)
+        return [
+            LxmlNode(element) for element in self.element.iterdescendants(tag)
+            if not classes or classes <= class_tokens(element.get("class"))
+        ]
+
+    @property
+    def text(self):
+        return self.element.text_content()
+
+    def get(self, name, default=None):
+        return self.element.get(name, default)
+
+
+class SelectolaxParser:
+    """Parses with selectolax (lexbor) and wraps its nodes in `SelectolaxNode`."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser # module for parsing web pages quickly (C library)
+        except ImportError:
+            raise ImportError("the selectolax parser needs selectolax: pip install selectolax") from None
+        self._parser = LexborHTMLParser
+
+    def parse(self, html, target=None):
+        region = target_region(html, target) if target is not None else None
+        return SelectolaxNode(self._parser(region or html).root)
+
+    @staticmethod
+    def elements(node):
+        """The child tags of `node`, skipping text and comments."""
+        return [SelectolaxNode(child) for child in node.node.iter() if not child.tag.startswith("-")]
+
+    @staticmethod
+    def descendants(node):
+        """Every tag inside `node`, in page order."""
+        return [SelectolaxNode(child) for child in list(node.node.traverse())[1:] if not child.tag.startswith("-")] # traverse starts with the node itself
+
+    @staticmethod
+    def find_all(node, tag, class_=None):
+        """Every `tag` inside `node` with all the classes in `class_`."""
+        return node.find_all(tag, class_)
+
+
+class SelectolaxNode:
+    """A selectolax node with the BeautifulSoup methods the extraction functions use."""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _selector(tag, class_):
+        # the CSS selector for a tag and classes, worked out once for each pair
+        return css_identifier(tag) + "".join("." + css_identifier(name) for name in sorted(class_tokens(class_)))
+
+    def find(self, tag, class_=None):
+        selector = self._selector(tag, class_)
+        node = self.node.css_first(selector)
+        if node is not None and node.mem_id == self.node.mem_id: # the node itself matched; search below it only
+            nodes = self.node.css(selector)
+            node = nodes[1] if len(nodes) > 1 else None
+        return None if node is None else SelectolaxNode(node)
+
+    def find_all(self, tag, class_=None):
+        nodes = self.node.css(self._selector(tag, class_))
+        if nodes and nodes[0].mem_id == self.node.mem_id: # as in BeautifulSoup, the node itself is not included
+            nodes = nodes[1:]
+        return [SelectolaxNode(node) for node in nodes]
+
+    @property
+    def text(self):
+        return self.node.text(deep=True)
+
+    def get(self, name, default=None):
+        return self.node.attributes.get(name, default)
@@ -0,0 +1,211 @@
+"""Download and parse pages at the same time.
+
+In Example 2 each record page is requested, then parsed, then the next page
+is requested: while the page is being parsed the network sits idle, and while
+we wait for the next page the processor sits idle. `crawl` splits the work
+into two stages joined by a bounded queue:
+
+1. download threads request pages and put their text on the queue;
+2. the main process, or with `parse_workers` a pool of processes, takes
+   pages off the queue and parses them.
+
+The queue holds at most `max_pending` pages, so fast downloads cannot run
+ahead of parsing and fill up memory on large directories. `iter_crawl` hands
+back each result as soon as it is parsed instead of collecting them all.
+
+Given a `FailureLedger` (see `scrapetools.retry`) as `failures`, a page that
+could not be requested, did not return 200 or could not be parsed is recorded
+there and the crawl carries on; without one, the first error stops the crawl.
+Given a `Timings` (see `scrapetools.timings`) as `timings`, the time taken to
+parse each page is recorded in it. Given a `ContentStore` (see
+`scrapetools.dedupe`) as `dedupe`, a page whose content has been parsed
+before is not parsed again.
+"""
+
+import os # module for navigating your machine (e.g., file directories)
+import queue # module for passing work safely between threads
+import threading # module for running code in parallel threads
+from collections import namedtuple # module for lightweight record types
+from functools import partial # module for fixing some arguments of a function
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait # modules for managing a pool of processes
+
+import requests # module for requesting urls
+
+from .fetch import HostLimiter
+from .timings import timed_call
+
+PageResult = namedtuple("PageResult", ["url", "status_code", "data", "error", "duplicate"], defaults=(None, False))
+PageResult.__doc__ = """The outcome for one url: `data` is the parsed page, or None if the status code was not 200.
+
+With a failure ledger, `error` is the exception that stopped the page being
+requested or parsed (and `data` is None). With a content store, `duplicate`
+is True if the page's content had been parsed before and `data` was taken
+from the store.
+"""
+
+_DONE = object() # placed on the queue by a download thread that has run out of urls
+
+
+def crawl(urls, parse, get=None, io_workers=8, per_host=4, parse_workers=0, max_pending=64, failures=None, timings=None, dedupe=None):
+    """Request every url in `urls` and parse each successful response.
+
+    `parse` takes the text of a page and returns anything picklable; it must
+    be defined in an importable module (such as `scrapetools.extract`) so that
+    the parsing processes can find it. `get` is the function used to make each
+    request (default: `requests.get`; pass `client.get` to share connections).
+    `parse_workers` is the number of parsing processes (None: one per core);
+    the default, 0, parses in the current process, which is faster for a
+    few hundred pages and needs no `if __name__ == "__main__":` guard in
+    the calling script. `failures` is a
+    `FailureLedger` to record failed pages in, rather than stopping,
+    `timings` a `Timings` to record parse times in and `dedupe` a
+    `ContentStore` of pages already parsed (`parse` must then return data
+    that `json.dumps` accepts).
+
+    Returns a list of `PageResult`, in the same order as `urls`.
+    """
+    urls = list(urls)
+    results = [None] * len(urls)
+    for i, result in _crawl(urls, parse, get, io_workers, per_host, parse_workers, max_pending, failures, timings, dedupe):
+        results[i] = result
+    return results
+
+
+def iter_crawl(urls, parse, get=None, io_workers=8, per_host=4, parse_workers=0, max_pending=64, failures=None, timings=None, dedupe=None):
+    """Like `crawl`, but yield each `PageResult` as soon as it is ready.
+
+    Results come in the order they finish rather than the order of `urls`,
+    and none are kept once yielded, so a long crawl can write each one out
+    (e.g. to a `JSONLinesWriter`) with memory use that does not grow.
+    """
+    for _, result in _crawl(list(urls), parse, get, io_workers, per_host, parse_workers, max_pending, failures, timings, dedupe):
+        yield result
+
+
+def _crawl(urls, parse, get, io_workers, per_host, parse_workers, max_pending, failures, timings, dedupe):
+    # yields (position in urls, PageResult) as each page is ready
+    if not urls:
+        return
+    if get is None:
+        get = requests.get
+    kind = dedupe.kind(parse) if dedupe is not None else None
+    if timings is not None:
+        parse = partial(timed_call, parse) # returns the parse time along with the data, from whichever process parsed it
+    io_workers = min(io_workers, len(urls))
+    limiter = HostLimiter(per_host)
+
+    todo = queue.Queue()
+    for i, url in enumerate(urls):
+        todo.put((i, url))
+    pages = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(item):
+        # wait for room on the queue, but give up if the crawl has been stopped
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def download():
+        while not stop.is_set():
+            try:
+                i, url = todo.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                with limiter.slot(url):
+                    response = get(url)
+                attempts = getattr(response, "attempts", 1) # set by a ScrapeClient with a retry policy
+                text = response.text if response.status_code==200 else None
+                digest = dedupe.digest(text) if dedupe is not None and text is not None else None # hashed here, in parallel
+                put((i, response.status_code, text, None, attempts, digest))
+            except Exception as error:
+                put((i, None, None, error, getattr(error, "attempts", 1), None))
+        put((None, None, None, _DONE, None, None))
+
+    threads = [threading.Thread(target=download, daemon=True) for _ in range(io_workers)]
+    for thread in threads:
+        thread.start()
+
+    pool = ProcessPoolExecutor(parse_workers or os.cpu_count()) if parse_workers != 0 else None
+    in_flight = {}
+    parsing = {} # digest: [(position, status code)] of pages with the same content as one being parsed
+    try:
+        finished = 0
+        while finished < io_workers:
+            i, status_code, text, error, attempts, digest = pages.get()
+            if error is _DONE:
+                finished += 1
+                continue
+            if error is not None:
+                if failures is None:
+                    raise error
+                failures.record(urls[i], "request", error=error, attempts=attempts)
+                yield i, PageResult(urls[i], None, None, error)
+            elif text is None:
+                if failures is not None:
+                    failures.record(urls[i], "request", status_code=status_code, attempts=attempts)
+                yield i, PageResult(urls[i], status_code, None)
+            elif digest is not None and digest in parsing:
+                parsing[digest].append((i, status_code)) # answered when the first copy has been parsed
+            else:
+                if digest is not None:
+                    found, data = dedupe.get(kind, digest)
+                    if found:
+                        dedupe.seen(urls[i], digest)
+                        yield i, PageResult(urls[i], status_code, data, None, True)
+                        continue
+                    parsing[digest] = []
+                if pool is None:
+                    result = _parsed(urls[i], status_code, attempts, lambda: parse(text), failures, timings)
+                    yield from _stored(i, result, text, digest, urls, failures, dedupe, kind, parsing)
+                    continue
+                if len(in_flight) >= max_pending:
+                    yield from _collect(wait(in_flight, return_when=FIRST_COMPLETED).done, in_flight, urls, failures, timings, dedupe, kind, parsing)
+                in_flight[pool.submit(parse, text)] = (i, status_code, attempts, digest, text if dedupe is not None else None)
+        yield from _collect(wait(in_flight).done, in_flight, urls, failures, timings, dedupe, kind, parsing)
+    finally:
+        stop.set()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _collect(done, in_flight, urls, failures, timings, dedupe, kind, parsing):
+    for future in done:
+        i, status_code, attempts, digest, text = in_flight.pop(future)
+        result = _parsed(urls[i], status_code, attempts, future.result, failures, timings)
+        yield from _stored(i, result, text, digest, urls, failures, dedupe, kind, parsing)
+
+
+def _stored(i, result, text, digest, urls, failures, dedupe, kind, parsing):
+    # yields a parsed page, after adding it to the content store, and the pages with the same content that waited for it
+    yield i, result
+    if digest is None:
+        return
+    if result.error is None:
+        dedupe.add(kind, result.url, digest, result.data, text)
+    for j, status_code in parsing.pop(digest):
+        if result.error is None:
+            dedupe.seen(urls[j], digest)
+            yield j, PageResult(urls[j], status_code, dedupe.get(kind, digest)[1], None, True)
+        else:
+            failures.record(urls[j], "parse", status_code=status_code, error=result.error)
+            yield j, PageResult(urls[j], status_code, None, result.error)
+
+
+def _parsed(url, status_code, attempts, result, failures, timings):
+    # the PageResult for a downloaded page, whose parsed data `result()` returns (or raises)
+    try:
+        data = result()
+    except Exception as error:
+        if failures is None:
+            raise
+        failures.record(url, "parse", status_code=status_code, error=error, attempts=attempts)
+        return PageResult(url, status_code, None, error)
+    if timings is not None:
+        data, started, seconds, pid = data
+        timings.add("parse", seconds, url=url, started=started, pid=pid, tid=0)
+    return PageResult(url, status_code, data)
@@ -0,0 +1,167 @@
+"""Polite, adaptive rate limiting for each website we scrape.
+
+`fetch_all` and `crawl` cap how many requests are in flight per website, but
+not how many are sent per second, and the examples on their own send
+requests as fast as a loop allows. A `RateLimiter` paces the requests to each
+host (website) in three ways:
+
+* a token bucket: on average at most `rate` requests per second, with short
+  bursts of up to `burst`;
+* an adaptive concurrency limit, between `min_concurrency` and
+  `max_concurrency`: while response times stay close to the fastest seen, it
+  creeps up by about one request per round; when they rise, or the server
+  answers with errors, it is halved (additive increase, multiplicative
+  decrease, as TCP does);
+* a pause: a `429 Too Many Requests` or `503 Service Unavailable` answer stops
+  all requests to that host for the time given in its `Retry-After` header
+  (or `default_pause` seconds), and halves the request rate, which then
+  recovers gradually.
+
+Give one to the client and every request it makes is paced:
+
+    client = ScrapeClient(rate_limiter=RateLimiter(rate=5, max_concurrency=8))
+
+`limiter.metrics()` reports the state of each host: current rate and
+concurrency limit, requests in flight, time spent waiting, response times and
+the number of throttled and failed requests.
+"""
+
+import threading # module for running code in parallel threads
+import time # module for working with time
+from email.utils import parsedate_to_datetime # module for http dates
+from urllib.parse import urlsplit # module for splitting urls into their parts
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def retry_after_seconds(response):
+    """Seconds to wait according to the response's `Retry-After` header, or None if it has none."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Host:
+    """The limiter's state for one host."""
+
+    def __init__(self, rate, burst, concurrency):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+        self.limit = float(concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency = None # moving average of response times
+        self.baseline = None # the fastest that average has been, drifting up slowly
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.waited = 0.0
+
+
+class RateLimiter:
+    """Paces requests to each host with a token bucket and an adaptive concurrency limit."""
+
+    def __init__(self, rate=2.0, burst=4, min_concurrency=1, max_concurrency=8, start_concurrency=2,
+                 latency_tolerance=0.5, default_pause=30.0, min_rate=0.1):
+        self.max_rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.start_concurrency = max(min_concurrency, min(start_concurrency, max_concurrency))
+        self.latency_tolerance = latency_tolerance # how much slower than the baseline counts as "rising"
+        self.default_pause = default_pause
+        self.min_rate = min_rate
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _host(self, url):
+        name = urlsplit(url).netloc
+        if name not in self._hosts:
+            self._hosts[name] = _Host(self.max_rate, self.burst, self.start_concurrency)
+        return self._hosts[name]
+
+    def acquire(self, url):
+        """Wait until a request to `url`'s host is allowed; returns the start time to pass to `release`."""
+        with self._condition:
+            host = self._host(url)
+            while True:
+                now = time.monotonic()
+                host.tokens = min(self.burst, host.tokens + (now - host.refilled) * host.rate)
+                host.refilled = now
+                if now < host.paused_until:
+                    wait = host.paused_until - now
+                elif host.in_flight >= int(host.limit):
+                    wait = None # until another request to this host finishes
+                elif host.tokens < 1:
+                    wait = (1 - host.tokens) / host.rate
+                else:
+                    host.tokens -= 1
+                    host.in_flight += 1
+                    host.requests += 1
+                    return now
+                self._condition.wait(wait)
+                host.waited += time.monotonic() - now
+
+    def release(self, url, started, status_code=None, retry_after=None):
+        """Report how a request to `url` went: its status code (None if it raised) and any `Retry-After`."""
+        with self._condition:
+            host = self._host(url)
+            now = time.monotonic()
+            host.in_flight -= 1
+            if status_code in THROTTLE_STATUSES:
+                host.throttled += 1
+                pause = retry_after if retry_after is not None else self.default_pause
+                host.paused_until = max(host.paused_until, now + pause)
+                host.rate = max(self.min_rate, host.rate / 2)
+                self._decrease(host, now)
+            elif status_code is None or status_code >= 500:
+                host.errors += 1
+                self._decrease(host, now)
+            else:
+                latency = now - started
+                host.latency = latency if host.latency is None else 0.8 * host.latency + 0.2 * latency
+                if host.baseline is None or host.latency < host.baseline:
+                    host.baseline = host.latency
+                else:
+                    host.baseline += (host.latency - host.baseline) * 0.002 # let the baseline follow lasting changes, slowly
+                if host.latency > host.baseline * (1 + self.latency_tolerance):
+                    self._decrease(host, now)
+                else:
+                    host.limit = min(self.max_concurrency, host.limit + 1 / host.limit)
+                    host.rate = min(self.max_rate, host.rate + self.max_rate / 20)
+            self._condition.notify_all()
+
+    def _decrease(self, host, now):
+        # halve the concurrency limit, at most once per round trip so that one bad moment counts once
+        if now - host.last_decrease >= (host.latency or 0.0):
+            host.limit = max(self.min_concurrency, host.limit / 2)
+            host.last_decrease = now
+
+    def metrics(self):
+        """{host: state} for every host requested so far."""
+        with self._condition:
+            now = time.monotonic()
+            return {
+                name: {
+                    "rate": round(host.rate, 3),
+                    "concurrency_limit": int(host.limit),
+                    "in_flight": host.in_flight,
+                    "paused_for": round(max(0.0, host.paused_until - now), 3),
+                    "requests": host.requests,
+                    "throttled": host.throttled,
+                    "errors": host.errors,
+                    "waited_seconds": round(host.waited, 3),
+                    "latency": None if host.latency is None else round(host.latency, 4),
+                    "latency_baseline": None if host.baseline is None else round(host.baseline, 4),
+                }
+                for name, host in self._hosts.items()
+            }
@@ -0,0 +1,225 @@
+"""Read the Charity Commission Register of Charities straight out of its zip.
+
+Example 1 extracts `publicextract.charity.txt` from the downloaded zip and then
+loads all of it into one DataFrame. `RegisterReader` instead decompresses the
+tab-delimited file as it reads it and hands back DataFrames of `chunksize`
+rows at a time, so memory use depends on the chunk size rather than the size
+of the register, and nothing is extracted to disk:
+
+    register = RegisterReader("./downloads/ccew-register-of-charities.zip", usecols=["charity_name", "latest_income"])
+    for chunk in register:
+        ...
+    register.bad_lines # number of badly formed lines that were skipped
+
+Columns are given explicit types (`REGISTER_DTYPES`), so every chunk has the
+same types and pandas does not have to guess them.
+
+For repeated analysis, `convert_register` writes the register once to a
+partitioned Parquet dataset with compact column types, and `load_register`
+reads back only the columns and rows asked for. Both need the optional
+`pyarrow` module (`pip install pyarrow`).
+"""
+
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import re # module for searching text with patterns
+import shutil # module for copying and removing folders
+import warnings # module for handling warnings
+import zipfile # module for compressing/decompressing files
+
+import numpy as np # module for working with arrays of numbers
+import pandas as pd # module for working with dataframes
+
+from .download import file_checksum
+
+# Column types of publicextract.charity.txt; any other column is read as text
+REGISTER_DTYPES = {
+    "organisation_number": "Int64",
+    "registered_charity_number": "Int64",
+    "linked_charity_number": "Int64",
+    "charity_type": "category",
+    "charity_registration_status": "category",
+    "charity_reporting_status": "category",
+    "latest_income": "float64",
+    "latest_expenditure": "float64",
+    "charity_insolvent": "category",
+    "charity_in_administration": "category",
+    "charity_previously_excepted": "category",
+    "charity_is_cdf_or_cif": "category",
+    "charity_is_cio": "category",
+    "cio_is_dissolved": "category",
+    "charity_gift_aid": "category",
+    "charity_has_land": "category",
+}
+
+DATE_COLUMNS = [
+    "date_of_extract", "date_of_registration", "date_of_removal", "latest_acc_fin_period_start_date",
+    "latest_acc_fin_period_end_date", "date_cio_dissolution_notice",
+]
+FLAG_COLUMNS = [
+    "charity_insolvent", "charity_in_administration", "charity_previously_excepted", "charity_is_cdf_or_cif",
+    "charity_is_cio", "cio_is_dissolved", "charity_gift_aid", "charity_has_land",
+]
+SMALL_INTEGER_COLUMNS = ["organisation_number", "registered_charity_number", "linked_charity_number"]
+
+_SKIPPED = re.compile(r"Skipping line (\d+)")
+
+
+class RegisterReader:
+    """Iterates over the register in a zip as DataFrames of `chunksize` rows.
+
+    `member` is the file inside the zip to read (default: the first .txt
+    file). `usecols` restricts the columns read, and `dtype` adds to or
+    overrides `REGISTER_DTYPES`. After reading, `bad_lines` is the number of
+    badly formed lines skipped and `bad_line_numbers` the first
+    `keep_line_numbers` of their line numbers.
+    """
+
+    def __init__(self, zip_path, member=None, chunksize=100_000, usecols=None, dtype=None, keep_line_numbers=100):
+        self.zip_path = zip_path
+        self.member = member
+        self.chunksize = chunksize
+        self.usecols = usecols
+        self.dtype = dict(REGISTER_DTYPES, **(dtype or {}))
+        self.keep_line_numbers = keep_line_numbers
+        self.bad_lines = 0
+        self.bad_line_numbers = []
+        self.rows = 0
+
+    def _member(self, download_zip):
+        if self.member is not None:
+            return self.member
+        return next(name for name in download_zip.namelist() if name.endswith(".txt"))
+
+    def __iter__(self):
+        self.bad_lines = 0
+        self.bad_line_numbers = []
+        self.rows = 0
+        with zipfile.ZipFile(self.zip_path, "r") as download_zip, download_zip.open(self._member(download_zip)) as f:
+            reader = pd.read_csv(
+                f, delimiter="\t", encoding="utf-8-sig", chunksize=self.chunksize, usecols=self.usecols,
+                dtype=self._dtypes(download_zip), on_bad_lines="warn",
+            )
+            with reader:
+                while True:
+                    with warnings.catch_warnings(record=True) as caught:
+                        warnings.simplefilter("always", pd.errors.ParserWarning)
+                        try:
+                            chunk = next(reader)
+                        except StopIteration:
+                            chunk = None
+                    self._count_bad_lines(caught)
+                    if chunk is None:
+                        return
+                    self.rows += len(chunk)
+                    yield chunk
+
+    def _dtypes(self, download_zip):
+        # only pass types for columns that will be read: the header says which exist
+        with download_zip.open(self._member(download_zip)) as f:
+            header = f.readline().decode("utf-8-sig").rstrip("\r\n").split("\t")
+        wanted = header if self.usecols is None else [column for column in header if column in self.usecols]
+        return {column: self.dtype.get(column, "str") for column in wanted}
+
+    def _count_bad_lines(self, caught):
+        for warning in caught:
+            if not issubclass(warning.category, pd.errors.ParserWarning):
+                warnings.warn_explicit(warning.message, warning.category, warning.filename, warning.lineno)
+                continue
+            numbers = [int(n) for n in _SKIPPED.findall(str(warning.message))]
+            self.bad_lines += len(numbers)
+            room = self.keep_line_numbers - len(self.bad_line_numbers)
+            self.bad_line_numbers.extend(numbers[:max(room, 0)])
+
+    def sample(self, n=5, random_state=None):
+        """Return `n` rows chosen uniformly at random from the whole register.
+
+        Each row gets a random key and the `n` smallest keys are kept as the
+        chunks go by, so only `n` rows are held between chunks.
+        """
+        rng = np.random.default_rng(random_state)
+        kept = None
+        for chunk in self:
+            chunk = chunk.assign(_key=rng.random(len(chunk)))
+            kept = chunk if kept is None else pd.concat([kept, chunk])
+            kept = kept.nsmallest(n, "_key")
+        if kept is None:
+            return pd.DataFrame()
+        return kept.drop(columns="_key")
+
+
+def compact_register(df):
+    """Return `df` with compact column types: dates, True/False flags and 32-bit charity numbers."""
+    df = df.copy()
+    for column in df.columns:
+        if column in DATE_COLUMNS:
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+        elif column in FLAG_COLUMNS:
+            df[column] = df[column].astype("str").map({"True": True, "False": False}).astype("boolean")
+        elif column in SMALL_INTEGER_COLUMNS:
+            df[column] = df[column].astype("Int32")
+    return df
+
+
+def _pyarrow():
+    try:
+        import pyarrow # module for working with columnar (Parquet) data
+        import pyarrow.parquet # noqa: F401
+    except ImportError:
+        raise ImportError("convert_register and load_register need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def convert_register(zip_path, folder, last_modified, partition_cols=("charity_registration_status",), chunksize=100_000):
+    """Write the register in `zip_path` to a Parquet dataset in `folder`, unless it is already there.
+
+    `last_modified` is the `Last-Modified` header sent with the download; it is
+    stored with the dataset, and the register is only converted again when it
+    changes. If the website sent no `Last-Modified` (None), a checksum of the
+    zip is stored and compared instead. The dataset is split into one folder
+    per value of `partition_cols`, so that filters on those columns skip
+    whole files.
+
+    Returns True if the register was converted, False if it was up to date.
+    """
+    pa = _pyarrow()
+    checksum = file_checksum(zip_path) if last_modified is None else None
+    meta_file = os.path.join(folder, "_register.json")
+    if os.path.exists(meta_file):
+        with open(meta_file, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if last_modified is not None and stored.get("last_modified") == last_modified:
+            return False
+        if checksum is not None and stored.get("checksum") == checksum:
+            return False
+
+    # write to a temporary folder and swap it in at the end, so a failed conversion leaves the old one intact
+    building = folder.rstrip("/\\") + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+    schema = None
+    register = RegisterReader(zip_path, chunksize=chunksize)
+    for i, chunk in enumerate(register):
+        table = pa.Table.from_pandas(compact_register(chunk), preserve_index=False)
+        if schema is None:
+            schema = table.schema
+        table = table.cast(schema)
+        pa.parquet.write_to_dataset(table, building, partition_cols=list(partition_cols), basename_template="part-{}-{{i}}.parquet".format(i))
+
+    with open(os.path.join(building, "_register.json"), "w", encoding="utf-8") as f:
+        json.dump({"last_modified": last_modified, "checksum": checksum, "rows": register.rows, "bad_lines": register.bad_lines}, f)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(building, folder)
+    return True
+
+
+def load_register(folder, columns=None, filters=None):
+    """Read the Parquet register in `folder`, keeping only `columns` and rows matching `filters`.
+
+    `filters` is a list of (column, operator, value) tuples, all of which must
+    hold, e.g. [("charity_registration_status", "==", "Registered"),
+    ("latest_income", ">", 1_000_000)]. Only the requested columns are read
+    from disk, and files whose partition or statistics rule them out are
+    skipped altogether.
+    """
+    _pyarrow()
+    return pd.read_parquet(folder, engine="pyarrow", columns=columns, filters=filters)
@@ -0,0 +1,137 @@
+"""Retry transient failures, and keep a record of the pages that still failed.
+
+In Example 2 a page that does not come back with a 200 is dropped with a
+"Could not request webpage" message, a record page without its `<dl>` stops
+the whole loop, and the bare `except:` in the index loop hides every error.
+Many failures are only momentary: a timeout, a `503 Service Unavailable`
+while the website restarts, a `429 Too Many Requests`. Others are not: a page
+that has been removed, or one whose layout has changed.
+
+A `RetryPolicy` tries a request again after a transient failure, waiting
+longer each time (exponential backoff) by a random amount (jitter), so that
+many threads that failed together do not all come back at the same moment.
+The number of attempts is capped, so a page that keeps failing costs at most
+`max_attempts` requests:
+
+    client = ScrapeClient(retry=RetryPolicy(max_attempts=4))
+
+Whatever still fails is written to a `FailureLedger`, a JSON Lines file kept
+next to the output, with one line per page: its url, the stage it failed at
+("request" or "parse"), the status code, the error and the number of
+attempts. Pass it to `crawl`, `iter_crawl` or `DirectoryCrawler` and a bad
+page is recorded there rather than stopping the run:
+
+    with FailureLedger(la_data + "coe-failures-" + ddate + ".jsonl") as ledger:
+        for page in iter_crawl(urls, parse_record, get=client.get, failures=ledger):
+            ...
+    ledger.summary() # {"status 404": 2, "parse ValueError": 1}
+"""
+
+import random # module for generating random numbers
+import threading # module for running code in parallel threads
+from collections import Counter # module for counting things
+from datetime import datetime as dt # module for working with dates and time
+
+import requests # module for requesting urls
+
+from .sink import JSONLinesWriter, read_jsonl
+
+TRANSIENT_STATUSES = (408, 429, 500, 502, 503, 504)
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class RetryPolicy:
+    """When to try a request again, and how long to wait first.
+
+    A response whose status is in `statuses`, or a request that raised one of
+    `errors` (timeouts and failed connections), is tried again up to
+    `max_attempts` attempts in all. Before attempt `n + 1` the policy waits a
+    random time between 0 and `backoff * 2 ** (n - 1)` seconds, capped at
+    `max_backoff` ("full jitter"); with `jitter=False` it waits the whole
+    amount. A `Retry-After` header asks for at least that long (up to
+    `max_backoff`).
+    """
+
+    def __init__(self, max_attempts=4, backoff=0.5, max_backoff=30.0, statuses=TRANSIENT_STATUSES, errors=TRANSIENT_ERRORS, jitter=True):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1, not {}".format(max_attempts))
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.errors = tuple(errors)
+        self.jitter = jitter
+
+    def retries(self, attempt, status_code=None, error=None):
+        """True if attempt number `attempt`, which ended with `status_code` or raised `error`, should be tried again."""
+        if attempt >= self.max_attempts:
+            return False
+        if error is not None:
+            return isinstance(error, self.errors)
+        return status_code in self.statuses
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait after attempt number `attempt` before the next one."""
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling) if self.jitter else ceiling
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+
+class FailureLedger:
+    """Appends one JSON line to `path` for every page that could not be requested or read."""
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = JSONLinesWriter(path, flush_every=1) # failures are few: write each one straight away
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, url, stage, status_code=None, error=None, attempts=1):
+        """Record that `url` failed at `stage` ("request" or "parse") after `attempts` attempts.
+
+        `error` is the exception raised, or a short description; without one
+        the failure is the `status_code`.
+        """
+        if error is None:
+            kind = "status {}".format(status_code)
+        elif isinstance(error, BaseException):
+            kind = "{} {}".format(stage, type(error).__name__)
+        else:
+            kind = "{} error".format(stage)
+        self._writer.write({
+            "url": url,
+            "stage": stage,
+            "status_code": status_code,
+            "error_type": type(error).__name__ if isinstance(error, BaseException) else None,
+            "error": str(error) if error is not None else None,
+            "attempts": attempts,
+            "time": dt.now().isoformat(timespec="seconds"),
+        })
+        with self._lock:
+            self._counts[kind] += 1
+
+    def __len__(self):
+        """The number of failures recorded by this ledger (not counting any already in the file)."""
+        with self._lock:
+            return sum(self._counts.values())
+
+    def summary(self):
+        """{kind of failure: number of pages}, e.g. {"status 404": 2, "parse ValueError": 1}."""
+        with self._lock:
+            return dict(self._counts)
+
+    def urls(self):
+        """The urls in the ledger file (including earlier runs), without repeats, to try again later."""
+        self._writer.flush()
+        return list(dict.fromkeys(entry["url"] for entry in read_jsonl(self.path)))
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
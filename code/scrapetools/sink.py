@@ -0,0 +1,164 @@
+"""Write records to disk as they are scraped, one JSON object per line.
+
+Example 2 keeps every record in the list `org_details` until the end, then
+writes them all with `json.dump(org_details, f)`. If the crawl fails on page
+900, nothing has been saved, and memory grows with the size of the directory.
+`JSONLinesWriter` appends each record to a JSON Lines (`.jsonl`) file as soon
+as it is scraped:
+
+    with JSONLinesWriter(la_data + "coe-library-spaces-" + ddate + ".jsonl") as sink:
+        for page in iter_crawl(urls, parse_record, get=client.get):
+            sink.write(page.data)
+    sink.finalize(la_data + "coe-library-spaces-" + ddate + ".json") # the usual JSON array
+
+Records are buffered and written `flush_every` at a time (or after
+`flush_seconds`). `fsync` says how hard to push each write to the disk:
+
+* "never" - leave it to the operating system (fastest);
+* "flush" - after every buffered write (the default; at most one buffer is
+  lost if the machine itself crashes);
+* "always" - after every record (slowest).
+
+Opening an existing file appends to it, so an interrupted crawl can carry on
+where it stopped; a half-written last line left by a crash is removed first.
+Given a `Timings` (see `scrapetools.timings`), the time taken by each `write`
+(including any flush it triggers) is recorded in it as "save".
+"""
+
+import json # module for working with JSON data structures
+import os # module for navigating your machine (e.g., file directories)
+import threading # module for running code in parallel threads
+import time # module for working with time
+
+FSYNC_POLICIES = ("never", "flush", "always")
+
+
+class JSONLinesWriter:
+    """Appends JSON records to `path`, one per line, flushing every `flush_every` records."""
+
+    def __init__(self, path, flush_every=100, flush_seconds=5.0, fsync="flush", timings=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("fsync must be one of {}, not {!r}".format(", ".join(FSYNC_POLICIES), fsync))
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.timings = timings
+        self.written = 0 # records written by this writer (not counting any already in the file)
+        self._buffer = []
+        self._lock = threading.Lock()
+        _drop_partial_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+        self._last_flush = time.monotonic()
+
+    def write(self, record):
+        """Add one record (anything `json.dumps` accepts)."""
+        if self.timings is None:
+            self._write(record)
+        else:
+            with self.timings.span("save"):
+                self._write(record)
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self.written += 1
+            if (
+                self.fsync == "always"
+                or len(self._buffer) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            ):
+                self._flush()
+
+    def flush(self):
+        """Write any buffered records to the file now."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer = []
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+
+    def finalize(self, outfile, remove=False, key=None):
+        """Close, then copy every record in the file into a JSON array at `outfile`; see `finalize_jsonl`."""
+        self.close()
+        return finalize_jsonl(self.path, outfile, remove=remove, key=key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_jsonl(path):
+    """Yield the records in a JSON Lines file, skipping a half-written last line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return # cut short by a crash
+            if line.strip():
+                yield json.loads(line)
+
+
+def finalize_jsonl(path, outfile, remove=False, key=None):
+    """Write the records in the JSON Lines file `path` to `outfile` as one JSON array.
+
+    This is the same format as `json.dump(org_details, f)`. The records are
+    copied one at a time, so memory use does not depend on how many there
+    are. With `key`, a function as for `sorted`, they are sorted first
+    instead, which reads them all into memory; this gives the same file
+    however the records arrived. With `remove=True` the .jsonl file is
+    deleted afterwards. Returns the number of records.
+    """
+    records = read_jsonl(path) if key is None else sorted(read_jsonl(path), key=key)
+    count = 0
+    temp = outfile + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            if count:
+                f.write(", ")
+            json.dump(record, f)
+            count += 1
+        f.write("]")
+    os.replace(temp, outfile)
+    if remove:
+        os.remove(path)
+    return count
+
+
+def _drop_partial_line(path, block=64 * 1024):
+    # a crash can leave the last line half-written: cut the file back to its last newline
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            position = start
+        else:
+            keep = 0
+        if keep != end:
+            f.truncate(keep)
@@ -0,0 +1,268 @@
+"""Declarative extraction: describe what to take from a page, not how.
+
+Example 2 reads a record page in two passes, one `find_all("dt")` and one
+`find_all("dd")`, and pairs them up with `dict(zip(dt_list, dd_list))`. If a
+heading has no value, every later heading is paired with the wrong value. An
+extraction spec instead says which element holds the record and which
+elements hold its fields; `compile_spec` turns it into an `Extractor` that
+reads each page in a single walk over that element:
+
+    extractor = compile_spec({
+        "root": "dl.list.list--definition.definition", # the element the record is read from
+        "pairs": ["dt", "dd"], # heading: value pairs, matched in page order
+    })
+    extractor.extract(response.text) # {"Address": "...", "Telephone": "...", ...}
+
+Selectors are a tag and/or classes as in CSS (`"p"`, `"span.programme__title"`,
+`".intro"`, `"*"` for any element, with backslash escapes such as
+`"div.md\\:flex"`), optionally followed by `@attribute` to take an attribute
+rather than the text (`"a@href"`) and `[]` to take every match as a list
+rather than only the first (`"p[]"`). A spec can have:
+
+* "root" - the element to read; only it is parsed (see `scrapetools.parsers`).
+  Without one the whole page is read.
+* "pairs" - [heading, value] selectors. A heading without a value is kept with
+  the value None, and several values for one heading are joined by newlines.
+* "fields" - {name: selector} for values in fixed places.
+* "items" - a selector for repeated elements (e.g. the episodes on a listing
+  page); "pairs" and "fields" are then read from each item, and `extract`
+  returns a list of records.
+
+An element taken as a heading or value of a pair is not searched any
+further, so anything nested inside it (such as a definition list inside a
+`<dd>`) stays part of its text. Fields may be nested inside one another, e.g.
+a title inside a link.
+`MARYS_MEALS_SPEC` and `DESERT_ISLAND_DISCS_SPEC` are written for the pages
+in the Example 1 exercise and the Desert Island Discs challenge, and
+`DESERT_ISLAND_DISCS_EPISODE_SPEC` for the page of each episode.
+
+Each selector is compiled once (`compile_selector` remembers them) and
+matches an element when its classes include all of the selector's, as sets
+of class names. To look the same selectors up many times on one large
+page, an `ElementIndex` remembers what each selector found:
+
+    index = index_page(response.text)
+    index.select("div.programme--episode") # every episode on a listing page
+    index.find("nav", class_="pagination") # as BeautifulSoup's find
+"""
+
+import re # module for searching text with patterns
+from functools import lru_cache # module for remembering the results of a function
+
+from .parsers import class_tokens, css_identifier, get_parser
+
+RECORD_SPEC = {
+    "root": "dl.list.list--definition.definition",
+    "pairs": ["dt", "dd"],
+}
+
+# https://www.marysmeals.org/what-we-do/our-impact: the paragraphs under "Assessing our impact"
+MARYS_MEALS_SPEC = {
+    "root": "div.coh-wysiwyg.ssa-component-instance-b659e133-d541-41a7-8fdc-a10d2a24b61a",
+    "fields": {"paragraphs": "p[]"},
+}
+
+# https://www.bbc.co.uk/programmes/b006qnmr/episodes/player: one record per episode
+DESERT_ISLAND_DISCS_SPEC = {
+    "items": "div.programme--episode",
+    "fields": {
+        "title": "span.programme__title",
+        "subtitle": "span.programme__subtitle",
+        "synopsis": "p.programme__synopsis",
+        "url": "a.br-blocklink__link@href",
+    },
+}
+
+# https://www.bbc.co.uk/programmes/<episode id>: the page of one episode
+DESERT_ISLAND_DISCS_EPISODE_SPEC = {
+    "fields": {
+        "title": "h1",
+        "description": "div.synopsis-toggle__long",
+        "broadcast": "div.broadcast-event__time@content",
+        "artists": "span.artist[]",
+    },
+}
+
+_NAME = r"(?:[\w-]|\\[0-9a-fA-F]{1,6} ?|\\[^0-9a-fA-F\n])+" # a tag or class name, with CSS escapes such as "md\:flex"
+_SELECTOR = re.compile(r"^(\*|{name})?((?:\.{name})*)(?:@([\w-]+))?(\[\])?$".format(name=_NAME))
+_CLASS = re.compile(r"\.({})".format(_NAME))
+_ESCAPE = re.compile(r"\\([0-9a-fA-F]{1,6}) ?|\\(.)")
+
+
+def _unescape(name):
+    # "md\:flex" -> "md:flex", "\32 col" -> "2col"
+    return _ESCAPE.sub(lambda match: chr(int(match.group(1), 16)) if match.group(1) else match.group(2), name)
+
+
+class Selector:
+    """One compiled selector: the tag and classes to match, and what to take."""
+
+    __slots__ = ("tag", "class_", "classes", "attribute", "many")
+
+    def __init__(self, text):
+        match = _SELECTOR.match(text.strip())
+        if match is None or not (match.group(1) or match.group(2)):
+            raise ValueError("bad selector {!r}: expected e.g. 'dt', 'p.intro', 'a@href' or 'p[]'".format(text))
+        tag, classes, self.attribute, many = match.groups()
+        self.tag = _unescape(tag).lower() if tag not in (None, "*") else None # "*": any tag
+        self.class_ = " ".join(_unescape(name) for name in _CLASS.findall(classes)) or None
+        self.classes = class_tokens(self.class_)
+        self.many = many is not None
+
+    def matches(self, node):
+        if self.tag is not None and (node.name or "").lower() != self.tag:
+            return False
+        return not self.classes or self.classes <= class_tokens(node.get("class"))
+
+    def value(self, node):
+        if self.attribute is not None:
+            return node.get(self.attribute)
+        return node.text.strip()
+
+
+class Extractor:
+    """A compiled spec; `extract(html)` returns one record (or a list, for "items")."""
+
+    def __init__(self, spec):
+        unknown = set(spec) - {"root", "pairs", "fields", "items"}
+        if unknown:
+            raise ValueError("unknown spec keys: {}".format(", ".join(sorted(unknown))))
+        self.root = compile_selector(spec["root"]) if spec.get("root") else None
+        if self.root is not None and self.root.tag is None:
+            raise ValueError("the root selector needs a tag, e.g. 'div.{}'".format(spec["root"].lstrip(".")))
+        self.items = compile_selector(spec["items"]) if spec.get("items") else None
+        self.pairs = None
+        if spec.get("pairs"):
+            heading, value = spec["pairs"]
+            self.pairs = (compile_selector(heading), compile_selector(value))
+        self.fields = [(name, compile_selector(selector)) for name, selector in spec.get("fields", {}).items()]
+
+    def extract(self, html, parser=None, partial=True):
+        """Return the record on the page, or None if the page has no "root" element.
+
+        With "items", return the list of records instead (empty if there is
+        no root). `parser` and `partial` are as for `scrapetools.parse_record`.
+        """
+        parser = get_parser(parser)
+        if self.root is None:
+            root = parser.parse(html)
+        else:
+            target = (self.root.tag, self.root.class_)
+            root = _first(parser, parser.parse(html, target=target if partial else None), self.root)
+            if root is None:
+                return [] if self.items is not None else None
+
+        if self.items is None:
+            return self._record(parser, root)
+        records = []
+        stack = parser.elements(root)[::-1]
+        while stack:
+            node = stack.pop()
+            if self.items.matches(node):
+                records.append(self._record(parser, node))
+            else:
+                stack.extend(parser.elements(node)[::-1])
+        return records
+
+    def _record(self, parser, node):
+        # one walk over the element, in page order, taking headings, values and fields as they come
+        record = {name: [] if selector.many else None for name, selector in self.fields}
+        heading = None
+        stack = parser.elements(node)[::-1]
+        while stack:
+            node = stack.pop()
+            taken = False
+            if self.pairs is not None:
+                if self.pairs[0].matches(node):
+                    heading = self.pairs[0].value(node)
+                    record.setdefault(heading, None)
+                    taken = True
+                elif self.pairs[1].matches(node):
+                    if heading is not None:
+                        value = self.pairs[1].value(node)
+                        record[heading] = value if record[heading] is None else record[heading] + "\n" + value
+                    taken = True
+            for name, selector in self.fields:
+                if selector.matches(node):
+                    if selector.many:
+                        record[name].append(selector.value(node))
+                    elif record[name] is None:
+                        record[name] = selector.value(node)
+            if not taken:
+                stack.extend(parser.elements(node)[::-1])
+        return record
+
+
+def _first(parser, node, selector):
+    # the first element under `node`, in page order, that matches `selector`
+    stack = parser.elements(node)[::-1]
+    while stack:
+        node = stack.pop()
+        if selector.matches(node):
+            return node
+        stack.extend(parser.elements(node)[::-1])
+    return None
+
+
+@lru_cache(maxsize=1024)
+def compile_selector(text):
+    """The compiled `Selector` for `text` (e.g. "div.programme--episode"), made once and then reused."""
+    return Selector(text)
+
+
+def compile_spec(spec):
+    """Check `spec` and compile it into an `Extractor`, ready to use on many pages."""
+    return Extractor(spec)
+
+
+class ElementIndex:
+    """The elements under `node` (parsed by `parser`) found by each selector, for many lookups on one page.
+
+    A selector is looked up the first time it is asked for, with the
+    parser's own search (in C for lxml and selectolax), and what it found is
+    kept under the selector, so asking again is a dictionary lookup.
+    """
+
+    def __init__(self, parser, node):
+        self.parser = parser
+        self.node = node
+        self._found = {} # selector text: elements found before
+
+    def select(self, text):
+        """Every element matching the selector `text` (a tag and/or classes, e.g. "div.programme--episode"), in page order."""
+        found = self._found.get(text)
+        if found is None:
+            selector = compile_selector(text)
+            if selector.tag is not None:
+                found = self.parser.find_all(self.node, selector.tag, selector.class_)
+            else:
+                found = [node for node in self.parser.descendants(self.node) if selector.matches(node)]
+            self._found[text] = found
+        return found
+
+    def select_one(self, text):
+        """The first element matching the selector `text`, or None."""
+        found = self.select(text)
+        return found[0] if found else None
+
+    def find_all(self, tag=None, class_=None):
+        """As BeautifulSoup's `find_all(tag, class_=...)`: every element with that tag and all of those classes (with neither, every element)."""
+        return self.select(_selector_text(tag, class_))
+
+    def find(self, tag=None, class_=None):
+        found = self.find_all(tag, class_)
+        return found[0] if found else None
+
+
+@lru_cache(maxsize=1024)
+def _selector_text(tag, class_):
+    # the selector for a `find`/`find_all` call, e.g. ("ul", "list list--record") -> "ul.list.list--record",
+    # with names escaped as in CSS ("md:flex" -> "md\:flex"), and "*" for any element
+    classes = "".join("." + css_identifier(name) for name in sorted(class_tokens(class_)))
+    return (css_identifier(tag) if tag else "*" if not classes else "") + classes
+
+
+def index_page(html, parser=None):
+    """Parse `html` with `parser` (default: the fastest installed) and return an `ElementIndex` of the whole page."""
+    parser = get_parser(parser)
+    return ElementIndex(parser, parser.parse(html))
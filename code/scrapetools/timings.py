@@ -0,0 +1,287 @@
+"""Where does the time in a scrape go?
+
+When a run is slow, the odd `print(url)` does not say whether the time went
+on opening connections, waiting for the website, downloading, parsing or
+saving. A `Timings` object, handed to the helpers that do each stage,
+records how long every step took:
+
+    timings = Timings(trace=True)
+    client = ScrapeClient(timings=timings)
+    with JSONLinesWriter(records, timings=timings) as sink:
+        for page in iter_crawl(urls, parse_record, get=client.get, timings=timings):
+            sink.write(page.data)
+    print(timings.table())
+    timings.save_trace(la_data + "coe-trace-" + ddate + ".json")
+
+The stages are:
+
+* "fetch" - one HTTP request, from sending it to having the whole page; it
+  is split into
+  * "connect" - looking up the website's address (DNS) and opening a TCP
+    connection, only for requests that needed a new connection;
+  * "tls" - the https handshake on a new connection;
+  * "wait" - the rest of the time until the response headers arrived, mostly
+    the website preparing the page;
+  * "download" - receiving the body of the page;
+* "limiter" and "backoff" - time spent waiting for a `RateLimiter`, or
+  between the attempts of a `RetryPolicy`;
+* "parse" - reading the page (in the parsing processes of `crawl`);
+* "save" - writing a record to a `JSONLinesWriter`.
+
+Any other step can be timed with `with timings.span("name", url): ...`.
+
+Each stage keeps a histogram of its durations (buckets about 19% wide, so
+memory use does not grow with the length of the run), from which `table()`
+reports the count, total, mean, median, 95th percentile and maximum. Every
+request is also kept in `timings.requests` with its status code, bytes and
+phases. With `trace=True` every step is also kept as an event for
+`save_trace`, which writes a Chrome trace file to open at
+https://ui.perfetto.dev or chrome://tracing, showing what each thread and
+process was doing when.
+
+Leave `timings` out (the default) and none of this runs.
+"""
+
+import contextlib # module for building context managers
+import json # module for working with JSON data structures
+import math # module for mathematical functions
+import os # module for navigating your machine (e.g., file directories)
+import threading # module for running code in parallel threads
+import time # module for working with time
+from collections import Counter # module for counting things
+
+from requests.adapters import HTTPAdapter # module for configuring connection pools
+from urllib3.connection import HTTPConnection, HTTPSConnection # modules for single connections
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool # modules for pools of connections
+
+STAGES = ("fetch", "connect", "tls", "wait", "download", "limiter", "backoff", "parse", "save")
+
+_SMALLEST = 1e-4 # seconds at the top of the first histogram bucket
+_STEPS = 4 # buckets per doubling
+
+_local = threading.local() # the phases of the request being made by this thread
+
+
+class _Stage:
+    """The histogram of one stage's durations."""
+
+    __slots__ = ("count", "total", "largest", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.largest = 0.0
+        self.buckets = Counter()
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.largest = max(self.largest, seconds)
+        self.buckets[_bucket(seconds)] += 1
+
+    def percentile(self, share):
+        # the top of the bucket holding the `share` point of the durations (at most the largest seen)
+        wanted = share * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= wanted:
+                return min(self.largest, _bucket_top(bucket))
+        return self.largest
+
+
+def _bucket(seconds):
+    if seconds <= _SMALLEST:
+        return 0
+    return math.ceil(_STEPS * math.log2(seconds / _SMALLEST))
+
+
+def _bucket_top(bucket):
+    return _SMALLEST * 2 ** (bucket / _STEPS)
+
+
+class Timings:
+    """Durations of every stage of a scrape, per request and as histograms."""
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.requests = [] # one dict per HTTP request
+        self.events = [] # Chrome trace events, if `trace`
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def add(self, stage, seconds, url=None, started=None, pid=None, tid=None):
+        """Record that `stage` took `seconds`; `started` is its `time.time()` start, for the trace."""
+        with self._lock:
+            if stage not in self._stages:
+                self._stages[stage] = _Stage()
+            self._stages[stage].add(seconds)
+            if self.trace:
+                if started is None:
+                    started = time.time() - seconds
+                self.events.append({
+                    "name": stage, "cat": "scrape", "ph": "X",
+                    "ts": round(started * 1e6), "dur": round(seconds * 1e6),
+                    "pid": os.getpid() if pid is None else pid,
+                    "tid": threading.get_ident() if tid is None else tid,
+                    "args": {"url": url} if url is not None else {},
+                })
+
+    @contextlib.contextmanager
+    def span(self, stage, url=None):
+        """Time the code inside the `with` block as `stage`."""
+        started = time.time()
+        clock = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - clock, url=url, started=started)
+
+    @contextlib.contextmanager
+    def fetch(self, url, stream=False):
+        """Time one HTTP request; the block must set `request["response"]` to the response it gets.
+
+        With `stream=True` the body is left for the caller to read, so its
+        download is not timed and its size is taken from `Content-Length`.
+        """
+        started = time.time()
+        clock = time.perf_counter()
+        _local.phases = phases = Counter()
+        request = {"url": url, "response": None}
+        try:
+            yield request
+        finally:
+            _local.phases = None
+            total = time.perf_counter() - clock
+            response = request.pop("response")
+            request["started"] = started
+            request["seconds"] = total
+            request["status_code"] = None if response is None else response.status_code
+            request["bytes"] = None
+            request["new_connection"] = "connect" in phases
+            self.add("fetch", total, url=url, started=started)
+            if response is not None:
+                request["bytes"] = int(response.headers.get("Content-Length", 0)) if stream else len(response.content)
+                headers = response.elapsed.total_seconds() # from sending the request to having the headers
+                connect = phases["connect"]
+                tls = max(0.0, phases["handshake"] - connect)
+                timed = {"wait": max(0.0, headers - connect - tls)}
+                if "connect" in phases:
+                    timed["connect"] = connect
+                    if url.startswith("https:"):
+                        timed["tls"] = tls
+                if not stream:
+                    timed["download"] = max(0.0, total - headers)
+                offset = started
+                for phase in ("connect", "tls", "wait", "download"):
+                    if phase in timed:
+                        request[phase] = timed[phase]
+                        self.add(phase, timed[phase], url=url, started=offset)
+                        offset += timed[phase]
+            with self._lock:
+                self.requests.append(request)
+
+    def summary(self):
+        """{stage: {"count", "total", "mean", "p50", "p95", "max"}} in seconds, for the stages seen so far."""
+        with self._lock:
+            stages = dict(self._stages)
+            return {
+                name: {
+                    "count": stage.count,
+                    "total": stage.total,
+                    "mean": stage.total / stage.count,
+                    "p50": stage.percentile(0.5),
+                    "p95": stage.percentile(0.95),
+                    "max": stage.largest,
+                }
+                for name, stage in sorted(stages.items(), key=lambda item: _order(item[0]))
+            }
+
+    def histogram(self, stage):
+        """[(top of bucket in seconds, count)] for the durations of `stage`."""
+        with self._lock:
+            buckets = self._stages[stage].buckets
+            return [(_bucket_top(bucket), buckets[bucket]) for bucket in sorted(buckets)]
+
+    def table(self):
+        """The summary as a text table, with a line about the requests made."""
+        lines = ["{:<10} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9}".format("stage", "count", "total s", "mean ms", "p50 ms", "p95 ms", "max ms")]
+        for name, stage in self.summary().items():
+            lines.append("{:<10} {:>7} {:>9.2f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+                name, stage["count"], stage["total"], stage["mean"] * 1000, stage["p50"] * 1000, stage["p95"] * 1000, stage["max"] * 1000))
+        with self._lock:
+            requests = list(self.requests)
+        if requests:
+            statuses = Counter(request["status_code"] for request in requests)
+            size = sum(request["bytes"] or 0 for request in requests)
+            elapsed = time.time() - self._started
+            lines.append("{} requests ({} new connections), {:.1f} MB in {:.1f}s; status codes: {}".format(
+                len(requests), sum(request["new_connection"] for request in requests), size / 1e6, elapsed,
+                ", ".join("{}: {}".format(status, count) for status, count in sorted(statuses.items(), key=str))))
+        return "\n".join(lines)
+
+    def save_trace(self, path):
+        """Write the events kept with `trace=True` as a Chrome trace (JSON) file at `path`."""
+        if not self.trace:
+            raise ValueError("no events to save: create the Timings with trace=True")
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+def _order(stage):
+    return STAGES.index(stage) if stage in STAGES else len(STAGES)
+
+
+def timed_call(function, *args):
+    """Call `function(*args)` and return (result, start time, seconds, process id); used for parsing in other processes."""
+    started = time.time()
+    clock = time.perf_counter()
+    result = function(*args)
+    return result, started, time.perf_counter() - clock, os.getpid()
+
+
+def _note(phase, seconds):
+    phases = getattr(_local, "phases", None)
+    if phases is not None:
+        phases[phase] += seconds
+
+
+def _timed_connection(base):
+    # a connection class that notes how long it took to connect (`_new_conn`) and to finish connecting (`connect`)
+    class TimedConnection(base):
+        def _new_conn(self):
+            clock = time.perf_counter()
+            try:
+                return super()._new_conn()
+            finally:
+                _note("connect", time.perf_counter() - clock)
+
+        def connect(self):
+            clock = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                _note("handshake", time.perf_counter() - clock)
+
+    TimedConnection.__name__ = "Timed" + base.__name__
+    return TimedConnection
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _timed_connection(HTTPConnection)
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _timed_connection(HTTPSConnection)
+
+
+class TimedAdapter(HTTPAdapter):
+    """An `HTTPAdapter` whose connections report how long connecting and the https handshake took."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
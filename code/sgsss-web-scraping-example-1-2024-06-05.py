@@ -305,6 +305,9 @@ print(ptext)
 
 import os # module for navigating your machine (e.g., file directories)
 import requests # module for requesting urls
+from scrapetools import ScrapeClient, save_stream # modules for requesting urls and saving large files (see ./scrapetools)
+
+client = ScrapeClient() # one session whose connections are reused by every request below
 
 print("Succesfully imported necessary modules")
 
@@ -318,7 +321,7 @@ url = "https://ccewuksprdoneregsadata1.blob.core.windows.net/data/txt/publicextr
 
 # Request the web page
 
-response = requests.get(url) # request the url
+response = client.get(url, stream=True) # request the url; with stream=True only the headers are read for now
 response.status_code # check if url was requested successfully
 
 
@@ -335,8 +338,12 @@ response.headers
 
 download = "./downloads/ccew-register-of-charities.zip" # specify the name you want the file to have on your machine
 
-with open(download, "wb") as f:
-    f.write(response.content)
+save_stream(response, download) # write the file in 1 MB chunks as they arrive, reporting the download speed
+
+# On an unreliable connection, download the file in pieces over several connections instead;
+# if it is interrupted, running the lines again resumes from the pieces already saved:
+# from scrapetools import download_ranged
+# download_ranged(url, download, get=client.get)
 
 
 # In[ ]:
@@ -347,32 +354,40 @@ with open(download, "wb") as f:
 os.listdir()
 
 
-# Great, the file has been downloaded, all that needs to be done is to extract ('unzip') the file from the its compressed folder. Python can handle this task:
+# Great, the file has been downloaded. It is a compressed ('zipped') folder containing the file we wanted all along, *publicextract.charity.txt*. We could extract ('unzip') the file and then load all of it into Python, but the register is large: the extracted file takes up a lot of disk space, and loading it in one go takes a lot of memory. Instead, we can read the file straight out of the zip folder, a chunk of rows at a time:
 
 # In[ ]:
 
 
-import zipfile # module for compressing/decompressing files
+import pandas as pd # module for working with dataframes
+from scrapetools import RegisterReader # module for reading the register straight out of the zip (see ./scrapetools)
 
-with zipfile.ZipFile(download, "r") as download_zip:
-    download_zip.extractall("./downloads/")
+register = RegisterReader(download, chunksize=100_000) # reads 100,000 rows at a time
 
 
+# To end this tutorial, let's take a quick peek at the dataset itself: five rows chosen at random from the whole register. Badly formed lines are skipped, but counted so that we know how many there were.
+
 # In[ ]:
 
 
-os.listdir("./downloads/")
+df = register.sample(5)
+print("Skipped {} badly formed lines".format(register.bad_lines))
+df
 
 
-# Now we have the file we wanted all along *publicextract.charity.txt*. To end this tutorial, let's take a quick peek at the dataset itself.
+# If you will be analysing the register again and again, it is worth converting it once to a compact columnar (Parquet) format. `convert_register` only converts it again when the register on the website has changed (according to its `Last-Modified` header), and `load_register` reads back only the columns and rows you ask for - much faster than reading the text file each time. (This needs the `pyarrow` module: `pip install pyarrow`.)
 
 # In[ ]:
 
 
-import pandas as pd
+from scrapetools import convert_register, load_register # modules for saving and loading the register in Parquet format (see ./scrapetools)
+
+parquet_folder = "./downloads/ccew-register-of-charities-parquet/"
+convert_register(download, parquet_folder, last_modified=response.headers.get("Last-Modified"))
 
-df = pd.read_csv("./downloads/publicextract.charity.txt", delimiter = "\t", on_bad_lines="skip")
-df.sample(5)
+df = load_register(parquet_folder, columns=["registered_charity_number", "charity_name", "latest_income"],
+                   filters=[("charity_registration_status", "==", "Registered")])
+df.describe()
 
 
 # ## What have we learned?
@@ -463,14 +478,15 @@ print("\r")
 import os # module for navigating your machine (e.g., file directories)
 import requests # module for requesting urls
 from bs4 import BeautifulSoup as soup # module for parsing web pages
+from scrapetools import ScrapeClient, download_file # modules for requesting urls and saving large files (see ./scrapetools)
 
 print("Succesfully imported necessary modules")
 
 # Request web page
 
-#headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.190 Safari/537.36"}
+client = ScrapeClient() # sends a browser-like user-agent header and reuses connections to the website
 url = "https://www.marysmeals.org/what-we-do/our-impact"
-response = requests.get(url) # request the url
+response = client.get(url) # request the url
 response.status_code # check if url was requested successfully
 
 # Parse web page
@@ -489,6 +505,19 @@ text = [p.text for p in paragraphs]
 print(text)
 
 
+# The same extraction can be written down as a *spec*: which element to read, and what to take from it. `compile_spec` turns the spec into an extractor that can be used on many pages; `./scrapetools/spec.py` has specs for this page, the City of Edinburgh Council record pages and the Desert Island Discs episode list.
+
+# In[ ]:
+
+
+from scrapetools import compile_spec # module for declarative extraction (see ./scrapetools)
+from scrapetools.spec import MARYS_MEALS_SPEC
+
+print(MARYS_MEALS_SPEC)
+extractor = compile_spec(MARYS_MEALS_SPEC)
+extractor.extract(response.text)["paragraphs"]
+
+
 # #### Download an annual report
 
 # In[ ]:
@@ -498,12 +527,9 @@ from IPython.display import IFrame
 
 url = "https://www.marysmeals.org/sites/mmi/files/2022-05/Our_Impact_Story_Marys_Meals_Impact_Assessment_Report.pdf"
 
-response = requests.get(url)
-
 outfile = "./downloads/marys-meals-impact-report.pdf"
 
-with open(outfile, "wb") as f:
-    f.write(response.content)
+download_file(url, outfile, get=client.get) # same website as above, so the open connection is reused
     
 IFrame(outfile, width=600, height=300)
 
@@ -69,12 +69,11 @@ print("Hello {}, enjoy learning more about Python and web-scraping!".format(name
 
 import string # module for working with ASCII and other strings
 import os # module for navigating your machine (e.g., file directories)
-import requests # module for requesting urls
-import json # module for working with JSON data structures
 import csv # module for working with csv files
 import pandas as pd  # module for working with dataframes
 from datetime import datetime as dt # module for working with dates and time
 from bs4 import BeautifulSoup as soup # module for parsing web pages
+from scrapetools import FailureLedger, JSONLinesWriter, ScrapeClient, finalize_jsonl, iter_crawl, parse_record, read_jsonl # modules for requesting, parsing and saving urls (see ./scrapetools)
 
 
 # In[ ]:
@@ -107,34 +106,46 @@ ddate = dt.now().strftime("%Y-%m-%d")
 ddate
 
 
+# In[ ]:
+
+
+# HTTP client
+
+header = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36"}
+client = ScrapeClient(headers=header) # one session whose connections are reused by every request below
+
+
 # ### Libraries
 
+# Each directory has an A-Z index spread over 26 pages. Rather than requesting them one after another, we use the `fetch_all` method of our shared `client` to request several at once. The responses come back in letter order, so `org_list` is the same as it would be with a simple `for` loop. If a page cannot be requested at all (for example, the connection fails), its response is `None` and the other letters are still requested.
+
 # In[ ]:
 
 
-header = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36"}
 base = "https://www.edinburgh.gov.uk/directory/10199/a-to-z/"
 abc = list(string.ascii_uppercase)
+urls = [base + str(l) for l in abc]
 
 org_list = []
+responses = client.fetch_all(urls, per_host=4) # request the web addresses, four at a time (None if a request failed)
     
-for l in abc:
-    url = base + str(l)
+for url, response in zip(urls, responses):
     print(url)
-    response = requests.get(url, headers=header) # request the web address
     
-    if response.status_code==200:
+    if response is not None and response.status_code==200:
         orgs = soup(response.text, "html.parser")
-        try:
-            results = orgs.find("ul", class_="list list--record").find_all("li")
-            for el in results:
-                name = el.find("a").text
-                link = el.find("a").get("href")
-                obs = {"org_name": name, "org_url": link}
-                #print(obs)
-                org_list.append(obs)
-        except:
-             print("Could not find list of organisations")
+        results = orgs.find("ul", class_="list list--record")
+        if results is None: # letters without any organisations have no list
+            print("Could not find list of organisations")
+            continue
+        for el in results.find_all("li"):
+            name = el.find("a").text
+            link = el.find("a").get("href")
+            obs = {"org_name": name, "org_url": link}
+            #print(obs)
+            org_list.append(obs)
+    else:
+        print("Could not request webpage")
             
 #print(response.text)
 
@@ -153,43 +164,42 @@ len(org_list)
 org_list
 
 
+# For each organisation we request its record page, then extract the details stored in the `<dl class="list list--definition definition">` element: every `<dt>` tag holds a heading (e.g., *Address*) and the `<dd>` tag after it holds the value. These steps live in the `parse_record` function in `./scrapetools/extract.py`.
+# 
+# Parsing a page keeps the processor busy while the network sits idle, and waiting for a page does the opposite. `iter_crawl` therefore downloads pages in several threads while Python parses the pages that have already arrived, handing back each page as soon as it is ready (so not necessarily in the order of `org_list`: the `.jsonl` file is in the order the pages arrived, and we sort the records back into the order of `org_list` when we read them and save the final `.json` file). (`parse_record` does the same job as the loop above, but with a faster HTML parser than `html.parser` when `lxml` or `selectolax` is installed. For thousands of pages, `iter_crawl(..., parse_workers=4)` parses in four processes at once; a script that does this should keep its code under `if __name__ == "__main__":`.) A page that cannot be requested, or whose details cannot be read, is written to a *ledger* (the file `coe-failures-<ddate>.jsonl`) and the crawl carries on with the other pages.
+
 # In[ ]:
 
 
-org_details = []
 base = "https://www.edinburgh.gov.uk"
-for org in org_list:
-    url = base + org["org_url"]
-    
-    response = requests.get(url, headers=header) # request the web address
-    if response.status_code==200:
-        soup_org = soup(response.text, "html.parser")
-        results = soup_org.find("dl", class_="list list--definition definition")
-        #print(results)
-        
-        dts = results.find_all("dt")
-        dt_list = []
-        for dt in dts:
-            dt_list.append(dt.text.strip())
+urls = [base + org["org_url"] for org in org_list]
+org_names = {base + org["org_url"]: org["org_name"] for org in org_list}
+records = la_data + "coe-library-spaces-" + ddate + ".jsonl" # one line per organisation
+
+if os.path.exists(records): # rerunning after an interruption: skip the organisations already saved
+    saved = {obs["org_url"] for obs in read_jsonl(records)}
+    urls = [url for url in urls if url not in saved]
+
+with JSONLinesWriter(records) as sink, FailureLedger(la_data + "coe-failures-" + ddate + ".jsonl") as ledger: # each record is saved as soon as it is parsed, so a crash loses very little
+    for page in iter_crawl(urls, parse_record, get=client.get, failures=ledger): # download pages in threads while parsing the pages already downloaded
+        if page.data is not None:
+            obs = page.data # dict of dt: dd pairs from the page
+            obs["org_name"] = org_names[page.url]
+            obs["org_url"] = page.url
+            #print(obs)
             
-        dds = results.find_all("dd")
-        dd_list = []
-        for dd in dds:
-            dd_list.append(dd.text.strip())
-        
-        obs = dict(zip(dt_list, dd_list))
-        obs["org_name"] = org["org_name"]
-        obs["org_url"] = url
-        #print(obs)
-        
-        org_details.append(obs)
-    else:
-        print("Could not request webpage")
+            sink.write(obs)
+        else: # could not be requested, or its details could not be read: written to the ledger, and the crawl carries on
+            print("Could not request webpage: {}".format(page.url))
+
+print(ledger.summary()) # pages that failed, by status code or error (details in coe-failures-<ddate>.jsonl)
 
 
 # In[ ]:
 
 
+order = {url: i for i, url in enumerate(org_names)} # position of each organisation in org_list
+org_details = sorted(read_jsonl(records), key=lambda obs: order[obs["org_url"]]) # read the saved records back, in the order of org_list
 org_details[0:4]
 
 
@@ -199,101 +209,122 @@ org_details[0:4]
 
 
 outfile = la_data + "coe-library-spaces-" + ddate + ".json"
-with open(outfile, "w", encoding="utf-8") as f:
-    json.dump(org_details, f)
+finalize_jsonl(records, outfile, key=lambda obs: order[obs["org_url"]]) # copy the records into a JSON array, in the order of org_list
 
 
-# ### Warm Spaces
+# ## Advanced: repeat runs and larger crawls
+
+# *This section is optional, and can be skipped on a first reading: the Libraries section above is all that is needed to collect a directory.*
+# 
+# A scrape that is run every day, or that covers thousands of pages, needs more care: pages that have not changed need not be downloaded again, the website should not be overloaded, and a page that fails should be tried again and, if it still fails, noted rather than lost. The cell below replaces our `client` with one that does all of this, using helpers from `./scrapetools`:
+# 
+# * `cache` keeps the pages from earlier runs, and reuses them if the website says they have not changed;
+# * `limiter` makes at most 5 requests a second to the council website, fewer if it slows down;
+# * `retry` tries timeouts and temporary errors (e.g., 503) up to 4 times, waiting a little longer each time;
+# * `timings` records how long each request, parse and save takes;
+# * `cassette` can record a run, then replay it to rerun the parsing code without the website;
+# * `archive` keeps a compressed copy of every page fetched, day by day, to extract new fields from later;
+# * `ledger` is a file of the pages that still could not be requested or read, and why;
+# * `frontier` remembers which pages today's crawl has finished, so an interrupted crawl picks up where it stopped;
+# * `store` keeps the details read from each distinct page, so a page read before (under another address, or on an earlier day) is not parsed again, and pages that are almost the same are flagged.
 
 # In[ ]:
 
 
-header = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36"}
-base = "https://www.edinburgh.gov.uk/directory/10258/a-to-z/"
-abc = list(string.ascii_uppercase)
+# Advanced HTTP client
 
-org_list = []
-    
-for l in abc:
-    url = base + str(l)
-    response = requests.get(url, headers=header) # request the web address
-    
-    if response.status_code==200:
-        orgs = soup(response.text, "html.parser")
-        try:
-            results = orgs.find("ul", class_="list list--record").find_all("li")
-            for el in results:
-                name = el.find("a").text
-                link = el.find("a").get("href")
-                obs = {"org_name": name, "org_url": link}
-                #print(obs)
-                org_list.append(obs)
-        except:
-             print("Could not find list of organisations")
-            
-#print(response.text)
+from scrapetools import Cassette, ContentStore, DirectoryCrawler, FailureLedger, Frontier, HTTPCache, PageArchive, RateLimiter, RetryPolicy, Timings, reextract # modules for repeat runs (see ./scrapetools)
+
+client.close() # replaced by the client below
+cache = HTTPCache(other_data + "http-cache/")
+limiter = RateLimiter(rate=5, max_concurrency=4)
+retry = RetryPolicy(max_attempts=4)
+timings = Timings(trace=True)
+cassette = Cassette(other_data + "cassette/", mode="off") # set mode="auto" to record this run, then "replay" to rerun it without the website
+archive = PageArchive(la_data + "pages/")
+client = ScrapeClient(headers=header, cache=cache, rate_limiter=limiter, retry=retry, timings=timings, cassette=cassette, archive=archive)
+ledger = FailureLedger(la_data + "coe-failures-" + ddate + ".jsonl")
+frontier = Frontier(la_data + "crawl-" + ddate + ".sqlite")
+store = ContentStore(la_data + "content.sqlite", strip=True, near_threshold=0.8) # kept across days
 
 
-# #### Specific organisations
+# ### Warm Spaces
+
+# The Warm Spaces directory (ID 10258) has exactly the same structure as the Libraries directory (ID 10199), so rather than copying the two loops above we use the `DirectoryCrawler` helper from `./scrapetools/directory.py`. It takes a list of directory IDs and crawls them all in one run over our `client`: first every A-Z index page, then every record page. A record page listed in more than one directory is only requested once. Pages that fail are written to the `ledger`, each page finished is recorded in the `frontier` (so running the cell again after an interruption requests only the pages it had not finished), and pages whose content has been read before are taken from the `store`.
 
 # In[ ]:
 
 
-len(org_list)
+crawler = DirectoryCrawler([10258], client=client, frontier=frontier, failures=ledger, dedupe=store) # Warm Spaces
+details = crawler.crawl() # dict of directory ID: org_details
+
+org_details = details[10258]
+len(org_details)
 
 
 # In[ ]:
 
 
-org_list[0:4]
+org_details[0:4]
+
 
+# #### Save file
 
 # In[ ]:
 
 
-org_details = []
-base = "https://www.edinburgh.gov.uk"
-for org in org_list:
-    url = base + org["org_url"]
-    
-    response = requests.get(url, headers=header) # request the web address
-    if response.status_code==200:
-        soup_org = soup(response.text, "html.parser")
-        results = soup_org.find("dl", class_="list list--definition definition")
-        #print(results)
-        
-        dts = results.find_all("dt")
-        dt_list = []
-        for dt in dts:
-            dt_list.append(dt.text.strip())
-            
-        dds = results.find_all("dd")
-        dd_list = []
-        for dd in dds:
-            dd_list.append(dd.text.strip())
-        
-        obs = dict(zip(dt_list, dd_list))
-        obs["org_name"] = org["org_name"]
-        obs["org_url"] = url
-        #print(obs)
-        
-        org_details.append(obs)
-    else:
-        print("Could not request webpage")
+outfiles = crawler.save(details, la_data, ddate) # writes coe-warm-spaces-<ddate>.json
+outfiles
 
 
+# #### Updating the files on later days
+
+# These directories change slowly, so on later days we do not need to request every record page again. `crawl_incremental` reads the newest snapshot of each directory in `la_data`, requests the A-Z index pages, and then requests the record pages again with `revalidate=True`. Because our `client` has a `cache`, the website answers *Not Modified* (status 304) for a page that has not changed, without sending it again, so only new and edited pages are downloaded and parsed; edits to an existing page (e.g., its address or opening hours) are picked up this way. (Without `revalidate=True`, only pages that are new or whose name has changed in the index are requested.) If an A-Z index page cannot be requested, the organisations listed under that letter are kept from the previous snapshot rather than counted as removed. Alongside the updated snapshot it saves a small *delta* file listing the organisations added, removed and changed since the previous snapshot.
+# 
+# On a later day, run the *Preliminaries*, the advanced client cell and then the cell below, instead of the Libraries and Warm Spaces sections: both directories are updated in one run. On the day they were first collected their files have just been saved above, so the cell leaves them alone.
+
 # In[ ]:
 
 
-org_details[0:4]
+crawler = DirectoryCrawler([10199, 10258], client=client, frontier=frontier, failures=ledger, dedupe=store) # Libraries and Warm Spaces
+outfiles = [crawler.outfile(la_data, directory_id, ddate) for directory_id in crawler.directory_ids]
 
+if any(os.path.exists(outfile) for outfile in outfiles):
+    print("Today's files are already saved; run this cell on a later day to update them")
+else:
+    details, deltas = crawler.crawl_incremental(la_data, revalidate=True) # ask again for every record page: the cache turns unchanged ones into short 304 answers
+    crawler.save(details, la_data, ddate) # writes coe-library-spaces-<ddate>.json and coe-warm-spaces-<ddate>.json
+    crawler.save_deltas(deltas, la_data, ddate) # writes coe-<name>-delta-<ddate>.json
 
-# #### Save file
 
 # In[ ]:
 
 
-outfile = la_data + "coe-warm-spaces-" + ddate + ".json"
-with open(outfile, "w", encoding="utf-8") as f:
-    json.dump(org_details, f)
+# Pages reused from earlier runs (hits) vs downloaded in full (misses)
+
+client.close() # also saves the cache index to disk and closes the page archive
+print(archive.stats()) # pages fetched vs distinct pages stored, and their size before and after compression
+frontier.close()
+ledger.close()
+print(store.stats()) # pages parsed vs reused from the store
+print(store.near_duplicates()[:5]) # pairs of pages that are almost the same
+store.close()
+print(limiter.metrics()) # requests made, throttled and waited for, per website
+print(ledger.summary()) # pages that failed, by status code or error (details in coe-failures-<ddate>.jsonl)
+print(timings.table()) # where the time went: connecting, waiting for the website, downloading, parsing, saving
+timings.save_trace(la_data + "coe-trace-" + ddate + ".json") # a timeline to open at https://ui.perfetto.dev
+print(cassette.stats()) # responses replayed from and recorded to the cassette
+cache.stats()
+
+
+# #### Extracting again from the stored pages
+
+# The `archive` kept a copy of every page requested with the advanced client. To try a change to the extraction (for example to `parse_record`), there is no need to request the pages again: `reextract` runs it over the stored pages, one process per core, each with its own parser, and writes the records to a new file (`.jsonl`, or `.parquet` for a table).
+
+# In[ ]:
+
+
+# Read the newest copy of each record page again, from the archive rather than the website
 
+report = reextract(la_data + "pages/", parse_record, la_data + "coe-records-again-" + ddate + ".jsonl", match="/directory_record/", latest=True)
+print(report["pages"], "pages in", round(report["seconds"], 1), "seconds") # report["workers"] has the pages per second of each process